@@ -1,31 +1,14 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from jose import jwt, JWTError
+from app.core.config import settings
 from app.services.database import get_db
-from app.models.db_models import User
-from app.core.security import SECRET_KEY, ALGORITHM
-from app.services.token_service import decode_token, is_token_revoked
-
-
-
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    try:
-        payload = decode_token(token)
-    except Exception:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    jti = payload.get("jti")
-    if is_token_revoked(db, jti):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
-    sub = payload.get("sub")
-    user_id = sub.get("user_id")
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+from app.models.db_models import Device, User
+from app.services.auth_cache import token_cache, user_cache, revoked_tokens
+from app.services.token_service import decode_token
+from app.services.device_auth import authenticate_device
 
 
 # ─────────────────────────────────────────────
@@ -50,26 +33,95 @@ def get_database() -> Session:
 # ─────────────────────────────────────────────
 # Dependency: Get Current User from JWT
 # ─────────────────────────────────────────────
+def _verify_token(token: str) -> dict:
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    try:
+        payload = decode_token(token)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    # Signature + exp checked once; reuse until the token itself expires
+    token_cache.set(token, payload, expires_at=payload.get("exp"))
+    return payload
+
+
+def _load_user(db: Session, user_id) -> User:
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    # Detach so the cached row can outlive this request's session
+    db.expunge(user)
+    user_cache.set(user_id, user)
+    return user
+
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     """
     Extracts and validates JWT token.
     Returns current authenticated user object.
+
+    Warm path (cached token, user and revocation set) does no DB queries.
+    """
+    payload = _verify_token(token)
+    jti = payload.get("jti")
+    revoked_tokens.sync(db)
+    if not jti or jti in revoked_tokens:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    sub = payload.get("sub")
+    user_id = sub.get("user_id") if isinstance(sub, dict) else payload.get("user_id")
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return _load_user(db, user_id)
+
+
+def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials or token expired",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    Current user, if their email is listed in settings.ADMIN_EMAILS.
+    """
+    admins = {email.lower() for email in settings.ADMIN_EMAILS}
+    if (current_user.email or "").lower() not in admins:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+    return current_user
+
 
+# ─────────────────────────────────────────────
+# Dependency: Current Device from X-Device-Token
+# ─────────────────────────────────────────────
+def get_current_device(x_device_token: str = Header(None), db: Session = Depends(get_db)) -> Device:
+    """
+    Resolves the calling device; warm path is a SHA-256 and a cache hit.
+    """
+    return authenticate_device(db, x_device_token)
+
+
+# ─────────────────────────────────────────────
+# Dependency: Tenant key for inference scheduling
+# ─────────────────────────────────────────────
+def get_optional_user_id(request: Request) -> Optional[int]:
+    """
+    User id from a valid bearer token, else None. For attribution and fair
+    sharing only, never access control (so no revocation / DB check).
+    """
+    scheme, _, token = (request.headers.get("authorization") or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        payload = _verify_token(token)
+    except HTTPException:
+        return None
+    sub = payload.get("sub")
+    return sub.get("user_id") if isinstance(sub, dict) else payload.get("user_id")
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
-    return user
+
+def get_inference_tenant(request: Request, user_id: Optional[int] = Depends(get_optional_user_id)) -> str:
+    """
+    "user:<id>" when the request carries a valid bearer token, else
+    "ip:<client address>". Only used to share inference fairly.
+    """
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
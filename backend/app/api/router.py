@@ -11,6 +11,10 @@ from .routes import (
     integrations,
     llm_agent,
     voice,
+    models,
+    metrics,
+    jobs,
+    farms,
 )
 
 api_router = APIRouter()
@@ -26,3 +30,7 @@ api_router.include_router(iot_webhook.router, prefix="/iot", tags=["IoT"])
 api_router.include_router(integrations.router, prefix="/integrations", tags=["Integrations"])
 api_router.include_router(llm_agent.router, prefix="/agent", tags=["LLM Agent"])
 api_router.include_router(voice.router, prefix="/voice", tags=["Voice"])
+api_router.include_router(models.router, prefix="/models", tags=["Models"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
+api_router.include_router(farms.router, prefix="/farms", tags=["Farms"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
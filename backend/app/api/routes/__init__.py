@@ -3,6 +3,6 @@
 Import route modules so that `from app.api.routes import user` works.
 Add new route modules here when you create them.
 """
-from . import health, disease, crop_recommendation, user, feedback, devices, iot_webhook, integrations, llm_agent, voice  # noqa: F401
+from . import health, disease, crop_recommendation, user, feedback, devices, iot_webhook, integrations, llm_agent, voice, models, metrics, jobs, farms  # noqa: F401
 
 
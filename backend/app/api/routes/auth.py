@@ -2,11 +2,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.services.database import get_db
-from app.models.db_models import User
+from app.services.user_service import _find_user, create_user
 from app.services.token_service import create_access_token, create_refresh_token, revoke_token, decode_token, is_token_revoked
-from app.core.security import get_password_hash, verify_password
+from app.core.security import password_hasher
 from app.models.schemas import TokenResponse  # optional to import your schema
 
 router = APIRouter()
@@ -23,21 +24,17 @@ class LoginRequest(BaseModel):
 class RefreshRequest(BaseModel):
     refresh_token: str
 
+# async handlers: bcrypt runs on password_hasher's pool, DB work on the
+# threadpool, so a login burst only ever occupies the bcrypt workers
 @router.post("/register")
-def register(payload: RegisterRequest, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == payload.email).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="User already exists")
-    user = User(username=payload.username, email=payload.email, password_hash=get_password_hash(payload.password))
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+async def register(payload: RegisterRequest, db: Session = Depends(get_db)):
+    user = await create_user(db, payload.username, payload.email, payload.password)
     return {"message": "User created", "user_id": user.id}
 
 @router.post("/login")
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: LoginRequest, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_find_user, db, payload.email)
+    if not user or not await password_hasher.verify(payload.password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     subject = {"user_id": user.id}
     access = create_access_token(subject)
@@ -99,5 +96,5 @@ def logout(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Invalid token")
 
     jti = payload.get("jti")
-    revoke_token(db, jti, token_type=payload.get("type", "refresh"))
+    revoke_token(db, jti, token_type=payload.get("type", "refresh"), expires_at=payload.get("exp"))
     return {"message": "Logged out (refresh token revoked)"}
@@ -1,15 +1,17 @@
 # backend/app/api/routes/crop_recommendation.py
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.services.database import get_db
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
 from app.models.schemas import CropRecommendRequest, CropRecommendResponse
-from app.ml_services.crop_service import recommend_crop  # wrapper service
+from app.ml_services.crop_services import recommend_crop_top_k, detect_batch_format, stream_batch_recommendations  # wrapper service
+from app.models import ml_crop_model
 from app.services.utils import validate_crop_inputs, log_event
+from app.services.prediction_log_service import prediction_sink
 
 router = APIRouter()
 
 @router.post("/recommend", response_model=CropRecommendResponse)
-async def recommend(request: CropRecommendRequest, db: Session = Depends(get_db)):
+async def recommend(request: CropRecommendRequest):
     """
     Take soil + weather + basic features and return recommended crop.
     This wrapper validates inputs and calls your crop model service.
@@ -19,11 +21,12 @@ async def recommend(request: CropRecommendRequest, db: Session = Depends(get_db)
 
     # The crop_service should accept either the raw features or a normalized dict
     try:
-        crop = await recommend_crop(
+        result = await recommend_crop_top_k(
             soil_type=request.soil_type,
             temperature=request.temperature,
             humidity=request.humidity,
             rainfall=request.rainfall,
+            k=request.top_k or settings.CROP_TOP_K_DEFAULT,
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -31,5 +34,43 @@ async def recommend(request: CropRecommendRequest, db: Session = Depends(get_db)
         log_event("crop_recommendation_error", error=str(e))
         raise HTTPException(status_code=500, detail="Crop recommendation failed")
 
-    log_event("crop_recommendation", soil=request.soil_type, crop=crop)
-    return {"recommended_crop": crop}
+    candidates = result["candidates"]
+    crop = candidates[0]["crop"]
+    log_event("crop_recommendation", soil=request.soil_type, crop=crop, model_version=result["model_version"])
+    prediction_sink.record(
+        "crop",
+        f"{request.soil_type},{request.temperature},{request.humidity},{request.rainfall}",
+        result,
+        confidence=candidates[0]["probability"],
+    )
+    return {"recommended_crop": crop, "candidates": candidates, "model_version": result["model_version"]}
+
+
+@router.post("/recommend/batch")
+async def recommend_batch(request: Request):
+    """
+    Bulk crop recommendation for district-scale scoring.
+
+    Body: JSON array, NDJSON (application/x-ndjson) or CSV (text/csv) with
+    soil_type, temperature, humidity, rainfall. NDJSON/CSV are parsed as
+    they stream in; rows are validated and scored in chunks of
+    CROP_BATCH_CHUNK_SIZE. Response is NDJSON, one line per input row
+    ({"row": i, "recommended_crop": ..., "model_version": ...} or {"row": i, "error": ...}),
+    then a {"summary": ...} line. A JSON array is read whole, so it is capped
+    at CROP_BATCH_JSON_MAX_BYTES (413).
+    """
+    fmt = detect_batch_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Use application/json, application/x-ndjson or text/csv")
+    if fmt == "json" and int(request.headers.get("content-length") or 0) > settings.CROP_BATCH_JSON_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="JSON body too large; send NDJSON or CSV")
+    if not ml_crop_model.model_available():
+        raise HTTPException(status_code=500, detail="Crop recommendation failed")
+
+    log_event("crop_recommendation_batch", format=fmt)
+    return StreamingResponse(
+        stream_batch_recommendations(
+            request.stream(), fmt, settings.CROP_BATCH_CHUNK_SIZE, settings.CROP_BATCH_JSON_MAX_BYTES
+        ),
+        media_type="application/x-ndjson",
+    )
@@ -1,52 +1,83 @@
 # backend/app/api/routes/devices.py
-from fastapi import APIRouter, Depends, HTTPException, Header
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from app.api.deps import get_current_device, get_current_user
+from app.core.config import settings
 from app.services.database import get_db
-from app.models.db_models import Device
-from app.models.schemas import DeviceCreate, DeviceOut
-import secrets
+from app.services.device_auth import issue_device_token, rotate_device_token
+from app.models.db_models import Device, User
+from app.services.telemetry_store import query_series, resolve_resolution, utc_naive
+from app.models.schemas import DeviceCreate, DeviceCredentials, DeviceOut
 
 router = APIRouter()
 
-@router.post("/register", response_model=DeviceOut)
+@router.post("/register", response_model=DeviceCredentials)
 def register_device(payload: DeviceCreate, db: Session = Depends(get_db)):
+    """
+    Register a device. The credential token is returned only here (and on
+    provision); the database keeps its hash.
+    """
     # prevent duplicate registration
     existing = db.query(Device).filter(Device.device_id == payload.device_id).first()
     if existing:
         raise HTTPException(status_code=400, detail="Device already registered")
 
-    token = secrets.token_urlsafe(32)
+    token, token_hash = issue_device_token()
     d = Device(
         device_id=payload.device_id,
         name=payload.name,
         owner_id=payload.owner_id,
         meta=payload.meta,
-        cred_token=token
+        cred_token_hash=token_hash
     )
     db.add(d)
     db.commit()
     db.refresh(d)
-    return d
+    return {**DeviceOut.from_orm(d).dict(), "cred_token": token}
 
 @router.post("/provision/{device_id}")
 def provision_device(device_id: str, db: Session = Depends(get_db)):
+    """
+    Rotate the device's credential token; the old one stops working.
+    """
     device = db.query(Device).filter(Device.device_id == device_id).first()
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
-    new_token = secrets.token_urlsafe(32)
-    device.cred_token = new_token
-    db.commit()
-    db.refresh(device)
+    new_token = rotate_device_token(db, device)
     return {"device_id": device.device_id, "cred_token": new_token}
 
-@router.get("/me")
-def get_my_device(x_device_token: str = Header(None), db: Session = Depends(get_db)):
+@router.get("/me", response_model=DeviceOut)
+def get_my_device(device: Device = Depends(get_current_device)):
     """
     Simple header-based device lookup for debugging.
     """
-    if not x_device_token:
-        raise HTTPException(status_code=401, detail="Missing device token")
-    device = db.query(Device).filter(Device.cred_token == x_device_token).first()
-    if not device:
-        raise HTTPException(status_code=401, detail="Invalid token")
     return device
+
+@router.get("/{device_id}/telemetry")
+def get_device_telemetry(
+    device_id: str,
+    sensor: str,
+    start: datetime,
+    end: datetime,
+    resolution: Optional[int] = Query(None, ge=60, description="Seconds per point (rounded up to a rollup multiple)"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Chart series for one sensor: {"ts", "count", "avg", "min", "max"} per
+    `resolution` seconds over [start, end) (UTC). Without `resolution`,
+    one that fits TELEMETRY_SERIES_MAX_POINTS is picked; either way it is
+    rounded up to a multiple of the rollup it is served from (1m / 1h /
+    1d, never raw readings; see resolve_resolution).
+    """
+    device = db.query(Device).filter(Device.device_id == device_id).first()
+    if not device or device.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Device not found")
+    start, end = utc_naive(start), utc_naive(end)
+    try:
+        resolution = resolve_resolution(start, end, resolution, settings.TELEMETRY_SERIES_MAX_POINTS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"device_id": device_id, **query_series(db, device.id, sensor, start, end, resolution)}
@@ -1,43 +1,89 @@
 # backend/app/api/routes/disease.py
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.services.database import get_db
-from app.services.storage import save_file
-from app.services.utils import validate_image_bytes, log_event
-from app.ml_services.image_service import predict_from_bytes  # wrapper service
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+from typing import Optional
+from app.api.deps import get_inference_tenant, get_optional_user_id
+from app.core.config import settings
+from app.ml.preprocessing import ImageDecodeError
+from app.ml.scheduler import BULK, INTERACTIVE, SchedulerFull
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.database import get_async_db
+from starlette.concurrency import run_in_threadpool
+from app.services.storage import get_storage, ingest_upload
+from app.services.inference_jobs import DISEASE, create_job, dispatch_job
+from app.services.utils import log_event
+from app.services.write_behind import write_behind
+from app.services.prediction_log_service import prediction_sink
+from app.ml_services.image_service import predict_from_bytes, predict_from_bytes_from_url  # wrapper service
 from app.models.schemas import DiseasePredictionResponse
 
 router = APIRouter()
 
+def _busy(e: SchedulerFull) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Inference is busy ({e.priority} queue full), retry shortly",
+        headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER_SECONDS)},
+    )
+
 @router.post("/predict", response_model=DiseasePredictionResponse)
-async def predict_disease(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def predict_disease(
+    file: UploadFile = File(...),
+    tenant: str = Depends(get_inference_tenant),
+    user_id: Optional[int] = Depends(get_optional_user_id),
+):
     """
     Accepts multipart image upload and returns disease prediction.
-    Saves uploaded file, validates image bytes, sends to ML wrapper.
+    The upload is read once (hashed, size/magic-checked) and the same
+    buffer is sent to the ML wrapper; the image file (write-behind queue)
+    and PredictionLog row (batched sink) are persisted after the response.
+    Scheduled as interactive inference, ahead of device / bulk work.
     """
-    try:
-        contents = await file.read()
-        validate_image_bytes(contents)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid image: {e}")
-
-    # Save file (local or S3 depending on storage implementation)
-    saved_path = save_file(file, subfolder="disease_inputs")
+    upload = await ingest_upload(file, subfolder="disease_inputs", persist=False)
+    saved_path = upload.path
+    await write_behind.enqueue_file(upload.key, upload.content)
 
     # Call ML service (should return dict with at least 'prediction')
     try:
-        result = await predict_from_bytes(contents)
+        result = await predict_from_bytes(upload.content, digest=upload.sha256, priority=INTERACTIVE, tenant=tenant)
+    except SchedulerFull as e:
+        raise _busy(e)
+    except ImageDecodeError:
+        raise HTTPException(status_code=400, detail="Could not decode image")
     except Exception as e:
         log_event("disease_inference_error", error=str(e), image_path=saved_path)
         raise HTTPException(status_code=500, detail="Inference failed")
 
-    # Log event for later retraining/analytics
+    # Log event for later retraining/analytics (cache hits are logged too)
     log_event("disease_inference", image_path=saved_path, result=result)
+    prediction_sink.record("disease", saved_path, result, user_id=user_id)
 
-    return {"prediction": result.get("disease", "unknown")}
+    return {"prediction": result.get("disease", "unknown"), "model_version": result.get("model_version")}
+
+@router.post("/predict_async", status_code=202)
+async def predict_disease_async(
+    file: UploadFile = File(...),
+    priority: str = Query(INTERACTIVE, pattern=f"^({INTERACTIVE}|{BULK})$"),
+    db: AsyncSession = Depends(get_async_db),
+    tenant: str = Depends(get_inference_tenant),
+):
+    """
+    Queue the image for a Celery worker and return {"job_id", "status"}
+    immediately; poll GET /jobs/{job_id} for the prediction.
+    Backfills should pass priority=bulk.
+    """
+    upload = await ingest_upload(file, subfolder="disease_inputs", persist=False)
+    # The worker reads the image from storage, so it is written before the job is queued
+    await run_in_threadpool(get_storage().save, upload.key, upload.content)
+    job = await db.run_sync(create_job, DISEASE, input_key=upload.key, priority=priority, tenant=tenant)
+    await dispatch_job(job)
+    return {"job_id": job.id, "status": job.status}
 
 @router.post("/predict_url", response_model=DiseasePredictionResponse)
-async def predict_disease_url(payload: dict, db: Session = Depends(get_db)):
+async def predict_disease_url(
+    payload: dict,
+    tenant: str = Depends(get_inference_tenant),
+    user_id: Optional[int] = Depends(get_optional_user_id),
+):
     """
     Accepts JSON payload {"image_url": "<public_url>"} — downloads image inside ml_service.
     Useful for FlutterFlow + Firebase workflow.
@@ -46,8 +92,13 @@ async def predict_disease_url(payload: dict, db: Session = Depends(get_db)):
     if not image_url:
         raise HTTPException(status_code=400, detail="image_url is required")
     try:
-        result = await predict_from_bytes_from_url(image_url)  # you should implement in image_service
+        result = await predict_from_bytes_from_url(image_url, priority=INTERACTIVE, tenant=tenant)
+    except SchedulerFull as e:
+        raise _busy(e)
+    except ImageDecodeError:
+        raise HTTPException(status_code=400, detail="Could not decode image")
     except Exception as e:
         raise HTTPException(status_code=500, detail="Inference failed")
-    return {"prediction": result.get("disease", "unknown")}
+    prediction_sink.record("disease", image_url, result, user_id=user_id)
+    return {"prediction": result.get("disease", "unknown"), "model_version": result.get("model_version")}
 
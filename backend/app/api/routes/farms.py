@@ -0,0 +1,87 @@
+# backend/app/api/routes/farms.py
+import asyncio
+from typing import List, Tuple
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.integration.soil_client import polygon_cells, prefetch_farm, soil_client
+from app.models.db_models import Farm, User
+from app.models.schemas import FarmCreate, FarmOut
+from app.services.database import get_async_db, get_db
+
+router = APIRouter()
+
+
+@router.post("/", response_model=FarmOut, status_code=201)
+def create_farm(
+    payload: FarmCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Save a farm and, after responding, fetch soil data for every grid
+    cell its polygon covers, so later soil lookups for it hit the cache.
+    """
+    try:
+        cells = polygon_cells(payload.geojson, settings.SOIL_GRID_DEGREES, settings.SOIL_PREFETCH_MAX_CELLS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    farm = Farm(
+        user_id=current_user.id, name=payload.name, geojson=payload.geojson, area=payload.area,
+        grid_cells=[list(cell) for cell in cells], grid_degrees=settings.SOIL_GRID_DEGREES,
+    )
+    db.add(farm)
+    db.commit()
+    db.refresh(farm)
+    background_tasks.add_task(prefetch_farm, farm.id, cells)
+    return {**FarmOut.from_orm(farm).dict(), "soil_cells": len(cells)}
+
+
+@router.get("/", response_model=List[FarmOut])
+def list_farms(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return db.query(Farm).filter(Farm.user_id == current_user.id).order_by(Farm.id).all()
+
+
+async def _farm_cells(db: AsyncSession, farm: Farm) -> List[Tuple[int, int]]:
+    """
+    Cells stored on the farm at creation. Farms from before that (or from
+    another SOIL_GRID_DEGREES) are rasterized once, off the loop, and saved.
+    """
+    if farm.grid_cells is not None and farm.grid_degrees == settings.SOIL_GRID_DEGREES:
+        return [tuple(cell) for cell in farm.grid_cells]
+    try:
+        cells = await asyncio.to_thread(
+            polygon_cells, farm.geojson, settings.SOIL_GRID_DEGREES, settings.SOIL_PREFETCH_MAX_CELLS
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    farm.grid_cells = [list(cell) for cell in cells]
+    farm.grid_degrees = settings.SOIL_GRID_DEGREES
+    await db.commit()
+    return cells
+
+
+@router.get("/{farm_id}/soil")
+async def get_farm_soil(
+    farm_id: int,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Mean soil properties over the farm's cached grid cells (stored on the
+    farm, not re-rasterized). Never fetches inline: cells not cached yet
+    are reported as "pending" and fetched after responding.
+    """
+    farm = await db.get(Farm, farm_id)
+    if farm is None or farm.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Farm not found")
+    cells = await _farm_cells(db, farm)
+    summary = await soil_client.cells_summary(cells)
+    if summary["pending"]:
+        background_tasks.add_task(prefetch_farm, farm.id, cells)
+    return {"farm_id": farm.id, **summary}
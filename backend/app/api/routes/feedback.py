@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from app.services.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.services.database import get_async_db
 from app.models.db_models import Feedback
-from app.services.feedback_service import create_feedback, get_all_feedback
+from app.services.feedback_service import (
+    create_feedback, list_feedback_page, feedback_export_query,
+)
+from app.services.pagination import EXPORT_MEDIA_TYPES, stream_export
 
 router = APIRouter()
 
@@ -19,39 +25,35 @@ class FeedbackRequest(BaseModel):
 # Routes
 # ─────────────────────────────────────────────
 @router.post("/")
-def submit_feedback(data: FeedbackRequest, db: Session = Depends(get_db)):
-    feedback = Feedback(
-        user_id=data.user_id,
-        message=data.message,
-        prediction_result=data.prediction_result
-    )
-    db.add(feedback)
-    db.commit()
-    db.refresh(feedback)
+async def submit_feedback(data: FeedbackRequest, db: AsyncSession = Depends(get_async_db)):
+    feedback = await create_feedback(db, data.user_id, data.message, data.prediction_result)
     return {"message": "Feedback submitted successfully", "feedback_id": feedback.id}
 
 
 @router.get("/")
-def list_feedback(db: Session = Depends(get_db)):
-    feedbacks = db.query(Feedback).all()
-    return [
-        {
-            "id": f.id,
-            "user_id": f.user_id,
-            "message": f.message,
-            "prediction_result": f.prediction_result,
-            "created_at": f.created_at
-        }
-        for f in feedbacks
-    ]
-
-
-
-@router.post("/")
-def submit(data: FeedbackRequest, db: Session = Depends(get_db)):
-    fb = create_feedback(db, data.user_id, data.message, data.prediction_result)
-    return {"message": "Feedback saved", "feedback_id": fb.id}
-
-@router.get("/")
-def list_all(db: Session = Depends(get_db)):
-    return get_all_feedback(db)
+async def list_feedback(
+    response: Response,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Newest feedback first, `limit` rows per page. When more rows exist the
+    `X-Next-Cursor` response header holds the cursor for the next page.
+    """
+    page = await list_feedback_page(db, limit, cursor)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return [dict(row._mapping) for row in page.items]
+
+
+@router.get("/export")
+async def export_feedback(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """
+    Stream every feedback row (oldest first) as NDJSON or CSV.
+    """
+    return StreamingResponse(
+        stream_export(feedback_export_query(), Feedback, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=feedback.{format}"},
+    )
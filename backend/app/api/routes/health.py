@@ -1,5 +1,13 @@
 # backend/app/api/routes/health.py
 from fastapi import APIRouter
+from app.ml_services.image_service import batching_metrics, executor_metrics, cache_metrics
+from app.ml_services.crop_services import memo_metrics
+from app.core.security import password_hasher
+from app.services.auth_cache import auth_cache_metrics
+from app.services.device_auth import device_auth_metrics
+from app.services.write_behind import write_behind
+from app.services.prediction_log_service import prediction_sink
+from app.services.database import pool_metrics
 
 router = APIRouter()
 
@@ -10,3 +18,41 @@ async def health_check():
     """
     return {"status": "ok", "message": "AgroMind backend healthy ✅"}
 
+
+@router.get("/inference")
+async def inference_metrics():
+    """
+    Micro-batching metrics for the disease model (batch sizes, queue waits)
+    inference process pool usage, prediction cache hit/miss counters,
+    the crop memo hit rate, the write-behind file queue and the
+    PredictionLog sink.
+    """
+    return {
+        "disease_batcher": batching_metrics(),
+        "executor": executor_metrics(),
+        "prediction_cache": cache_metrics(),
+        "crop_memo": memo_metrics(),
+        "write_behind": write_behind.metrics(),
+        "prediction_log": prediction_sink.metrics(),
+    }
+
+
+@router.get("/auth")
+async def auth_metrics():
+    """
+    bcrypt pool usage (hash latency, queue depth, 503 rejections) and
+    user / device auth cache hit rates.
+    """
+    return {
+        "password_hasher": password_hasher.metrics(),
+        "auth_cache": auth_cache_metrics(),
+        "device_auth": device_auth_metrics(),
+    }
+
+
+@router.get("/db")
+async def db_metrics():
+    """
+    Connection pool status for the sync and async engines.
+    """
+    return pool_metrics()
@@ -1,6 +1,7 @@
 # backend/app/api/routes/integrations.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
+from app.integration.weather_client import WeatherUnavailable, weather_client
 
 router = APIRouter()
 
@@ -16,3 +17,22 @@ async def integration_webhook(payload: WebhookPayload):
     """
     # For now just accept and ack. Implementation: validate source and enqueue processing.
     return {"status": "accepted", "source": payload.source}
+
+
+@router.get("/weather")
+async def get_weather(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    forecast: bool = False,
+):
+    """
+    Current weather (or the 5-day forecast) for the ~5 km cell around
+    lat/lon. Served from the shared cache; "stale": true means the data is
+    past its TTL and a refresh is under way (or the provider is down).
+    """
+    try:
+        if forecast:
+            return await weather_client.forecast(lat, lon)
+        return await weather_client.current(lat, lon)
+    except WeatherUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
@@ -1,31 +1,103 @@
 # backend/app/api/routes/iot_webhook.py
-from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.services.database import get_db
-from app.services.iot_service import process_telemetry, process_device_image
+from app.api.deps import get_current_device
+from app.models.db_models import Device
+from app.core.config import settings
+from app.services.IOT_services import (
+    TelemetryTooLarge, process_telemetry, process_device_image, detect_telemetry_format, ingest_telemetry_stream,
+)
 from app.models.schemas import TelemetryCreate, DeviceImageCreate
+from app.services.storage import get_storage, normalize_key
+from app.services.inference_jobs import DISEASE, create_job, dispatch_job
+from app.ml.scheduler import DEVICE
+import uuid
 
 router = APIRouter()
 
 @router.post("/telemetry")
-async def ingest_telemetry(payload: TelemetryCreate, x_device_token: str = Header(None), db: Session = Depends(get_db)):
+async def ingest_telemetry(payload: TelemetryCreate, device: Device = Depends(get_current_device), db: Session = Depends(get_db)):
     """
     Ingest telemetry from device. Devices should include X-DEVICE-TOKEN header.
     """
-    # Validate device token (iot_service handles device lookup)
     try:
-        record = process_telemetry(payload.dict(), db)
+        record = await run_in_threadpool(process_telemetry, payload.dict(), db, device)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     return {"status": "ok", "ingest_id": record.id}
 
-@router.post("/image")
-async def ingest_image(payload: DeviceImageCreate, x_device_token: str = Header(None), db: Session = Depends(get_db)):
+@router.post("/telemetry/batch")
+async def ingest_telemetry_batch(request: Request, device: Device = Depends(get_current_device)):
     """
-    Ingest device image. Prefer device to upload to S3 and provide image_url.
+    Bulk telemetry from a gateway: JSON array or NDJSON
+    (application/x-ndjson) of {"sensor", "value", "unit"?, "ts"?} readings.
+    NDJSON is parsed while it streams in; valid readings are bulk-inserted
+    in chunks of TELEMETRY_BATCH_CHUNK_SIZE.
+
+    Returns {"received", "accepted", "rejected", "errors": [{"row", "error"}]};
+    every row not listed in `errors` was stored. Bodies over
+    TELEMETRY_BATCH_MAX_BYTES or NDJSON lines over TELEMETRY_LINE_MAX_BYTES
+    get 413 (chunks parsed before the cap was hit are kept).
+    """
+    fmt = detect_telemetry_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Use application/json or application/x-ndjson")
+    if int(request.headers.get("content-length") or 0) > settings.TELEMETRY_BATCH_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Telemetry body too large")
+    try:
+        return await ingest_telemetry_stream(
+            request.stream(), fmt, device, settings.TELEMETRY_BATCH_CHUNK_SIZE,
+            max_bytes=settings.TELEMETRY_BATCH_MAX_BYTES, max_line_bytes=settings.TELEMETRY_LINE_MAX_BYTES,
+        )
+    except TelemetryTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/image", status_code=202)
+async def ingest_image(payload: DeviceImageCreate, device: Device = Depends(get_current_device), db: Session = Depends(get_db)):
+    """
+    Ingest device image and queue disease inference on it. Prefer device to
+    upload via /iot/upload_url and send its `key` (plus `ref` as image_url);
+    otherwise the worker downloads image_url.
+    Returns {"image_id", "job_id"}; poll GET /jobs/{job_id} for the result.
     """
+    if payload.key:
+        try:
+            payload.key = normalize_key(payload.key)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not payload.key.startswith(f"device_images/{device.device_id}/"):
+            raise HTTPException(status_code=403, detail="key does not belong to this device")
     try:
-        record = process_device_image(payload.dict(), db)
+        record = await run_in_threadpool(process_device_image, payload.dict(), db, device)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
-    return {"status": "ok", "image_id": record.id}
+    job = await run_in_threadpool(
+        create_job, db, DISEASE,
+        input_key=payload.key, input_url=None if payload.key else payload.image_url,
+        device_pk=device.id, device_image_id=record.id, priority=DEVICE, tenant=f"device:{device.id}",
+    )
+    await dispatch_job(job)
+    return {"status": "ok", "image_id": record.id, "job_id": job.id}
+
+
+UPLOAD_CONTENT_TYPES = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+
+@router.post("/upload_url")
+def create_upload_url(content_type: str = "image/jpeg", device: Device = Depends(get_current_device)):
+    """
+    Presigned PUT URL so a device uploads its image straight to object
+    storage (bytes never pass through the API), then reports the returned
+    `ref` as image_url to /iot/image.
+    """
+    extension = UPLOAD_CONTENT_TYPES.get(content_type)
+    if extension is None:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+    key = f"device_images/{device.device_id}/{uuid.uuid4().hex}.{extension}"
+    try:
+        return get_storage().presigned_put_url(key, content_type=content_type)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
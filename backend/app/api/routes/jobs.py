@@ -0,0 +1,19 @@
+# backend/app/api/routes/jobs.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.database import get_async_db
+from app.models.db_models import InferenceJob
+from app.models.schemas import InferenceJobOut
+
+router = APIRouter()
+
+@router.get("/{job_id}", response_model=InferenceJobOut)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Status of a background job; `result` is set once status is "done".
+    The random job id is the only handle to a job, so it is not listed anywhere.
+    """
+    job = await db.get(InferenceJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
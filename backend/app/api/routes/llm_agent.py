@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from app.services.database import get_db
+from app.services.prediction_log_service import prediction_sink
 from app.llm.agent import answer_query  # implement in llm.agent
 
 router = APIRouter()
@@ -22,4 +23,8 @@ async def query_agent(payload: AgentRequest, db: Session = Depends(get_db)):
         answer, sources = await answer_query(payload.user_id, payload.text, db=db, field_id=payload.field_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    prediction_sink.record(
+        "agent", payload.text[:500], {"answer": answer, "sources": sources},
+        user_id=payload.user_id, field_id=payload.field_id,
+    )
     return {"answer": answer, "sources": sources}
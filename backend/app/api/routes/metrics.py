@@ -0,0 +1,17 @@
+# backend/app/api/routes/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.core.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("", include_in_schema=False)
+def metrics():
+    """
+    Prometheus exposition format, aggregated across gunicorn workers when
+    PROMETHEUS_MULTIPROC_DIR is set.
+    """
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
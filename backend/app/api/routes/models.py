@@ -0,0 +1,33 @@
+# backend/app/api/routes/models.py
+from fastapi import APIRouter, Depends, HTTPException
+from app.api.deps import get_admin_user
+from app.ml.registry import model_registry
+from app.services.utils import log_event
+
+router = APIRouter()
+
+@router.get("/")
+def list_models():
+    """
+    Version, checksum and load state of every registered model.
+    """
+    return model_registry.versions()
+
+
+@router.post("/{name}/reload")
+def reload_model(name: str, current_user=Depends(get_admin_user)):
+    """
+    Re-check a model file now instead of at the next version check (admin only).
+    Nothing is loaded here: executor workers swap the new version in with
+    their next task, and requests already running finish on the previous one.
+    """
+    try:
+        info = model_registry.refresh(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown model")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed: {e}")
+    if info is None:
+        raise HTTPException(status_code=404, detail="Model file not found")
+    log_event("model_reload", name=name, version=info.version, user_id=current_user.id)
+    return info.as_dict()
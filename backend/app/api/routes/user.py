@@ -1,13 +1,20 @@
 # backend/app/api/routes/user.py
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.services.database import get_db
+from app.core.config import settings
+from app.services.database import get_db, get_async_db
+from app.services.pagination import EXPORT_MEDIA_TYPES, stream_export
 from app.services import user_service
 from app.models.db_models import User as UserModel
 from app.models.schemas import UserCreate, UserOut, UserLogin
 from app.api.deps import get_current_user
+from app.core.security import password_hasher
+from app.services.auth_cache import user_cache
 
 router = APIRouter()
 
@@ -15,13 +22,15 @@ router = APIRouter()
 # Public endpoints
 # ----------------------
 @router.post("/register", response_model=dict, status_code=status.HTTP_201_CREATED)
-def register_user(payload: UserCreate, db: Session = Depends(get_db)):
+async def register_user(payload: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user.
     Returns: {"message": "User registered successfully", "user_id": <id>}
     """
     try:
-        user = user_service.create_user(db, payload.username, payload.email, payload.password)
+        user = await user_service.create_user(db, payload.username, payload.email, payload.password)
+    except HTTPException:
+        raise
     except Exception as e:
         # user_service raises HTTPException for duplicates; re-raise or wrap
         raise HTTPException(status_code=400, detail=str(e))
@@ -29,13 +38,13 @@ def register_user(payload: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=dict)
-def login_user(payload: UserLogin, db: Session = Depends(get_db)):
+async def login_user(payload: UserLogin, db: Session = Depends(get_db)):
     """
     Authenticate user and return an access token.
     Uses user_service.authenticate_user which returns (token, user).
     """
     try:
-        token, user = user_service.authenticate_user(db, payload.email, payload.password)
+        token, user = await user_service.authenticate_user(db, payload.email, payload.password)
     except HTTPException:
         raise
     except Exception as e:
@@ -56,14 +65,38 @@ def read_own_profile(current_user: UserModel = Depends(get_current_user)):
 
 
 @router.get("/", response_model=List[UserOut])
-def list_users(current_user: UserModel = Depends(get_current_user), db: Session = Depends(get_db)):
+async def list_users(
+    response: Response,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    current_user: UserModel = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    List all users.
+    List users, newest first, `limit` per page; the next page's cursor is
+    returned in the `X-Next-Cursor` header.
 
-    NOTE: This endpoint is protected. In a real app you'd check role/permissions and paginate.
+    NOTE: This endpoint is protected. In a real app you'd check role/permissions.
     """
-    users = db.query(UserModel).all()
-    return users
+    page = await user_service.list_users_page(db, limit, cursor)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
+
+
+@router.get("/export")
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: UserModel = Depends(get_current_user),
+):
+    """
+    Stream every user's public profile (oldest first) as NDJSON or CSV. Protected.
+    """
+    return StreamingResponse(
+        stream_export(user_service.user_export_query(), UserModel, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=users.{format}"},
+    )
 
 
 @router.get("/{user_id}", response_model=UserOut)
@@ -78,7 +111,7 @@ def get_user(user_id: int, current_user: UserModel = Depends(get_current_user),
 
 
 @router.put("/{user_id}", response_model=UserOut)
-def update_user(
+async def update_user(
     user_id: int,
     username: Optional[str] = Body(None),
     email: Optional[str] = Body(None),
@@ -93,6 +126,14 @@ def update_user(
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this user")
 
+    # bcrypt runs on the dedicated hashing pool, not the shared threadpool
+    password_hash = await password_hasher.hash(password) if password else None
+    user = await run_in_threadpool(_apply_user_update, db, user_id, username, email, password_hash)
+    user_cache.invalidate(user_id)
+    return user
+
+
+def _apply_user_update(db: Session, user_id: int, username, email, password_hash):
     user = db.query(UserModel).filter(UserModel.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -105,10 +146,8 @@ def update_user(
         if existing:
             raise HTTPException(status_code=400, detail="Email already in use")
         user.email = email
-    if password:
-        # delegate hashing to core.security or user_service
-        from app.core.security import get_password_hash
-        user.password_hash = get_password_hash(password)
+    if password_hash:
+        user.password_hash = password_hash
 
     db.add(user)
     db.commit()
@@ -131,5 +170,6 @@ def delete_user(user_id: int, current_user: UserModel = Depends(get_current_user
 
     db.delete(user)
     db.commit()
+    user_cache.invalidate(user_id)
     return {"message": "User deleted successfully", "user_id": user_id}
 
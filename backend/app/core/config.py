@@ -1,5 +1,5 @@
 from pydantic import BaseSettings, AnyHttpUrl, Field
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -15,27 +15,144 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = "sqlite:///./agromind.db"  # swap to postgres in prod
+    ASYNC_DATABASE_URL: Optional[str] = None  # derived from DATABASE_URL (aiosqlite / asyncpg) if unset
+    DB_POOL_SIZE: int = 10  # per engine, per worker process
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # drop connections before server-side idle timeouts
+    DB_POOL_PRE_PING: bool = True
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
+    # Listings (keyset pages) and streaming exports
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 500
+    EXPORT_FETCH_SIZE: int = 1000  # rows per server-side cursor fetch
 
     # Models
     MODEL_PATH: str = "app/ml/Dieases_model.pkl"
     CROP_MODEL_PATH: str = "app/ml/crop_model.pkl"
+    MODEL_CHECK_INTERVAL_SECONDS: float = 5.0  # how often workers re-stat model files
+
+    # Inference batching
+    DISEASE_BATCH_MAX_SIZE: int = 32
+    DISEASE_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # Inference scheduling: weighted fair share between priority classes,
+    # round-robin between tenants (user / device) inside a class
+    INFERENCE_CLASS_WEIGHTS: Dict[str, float] = {"interactive": 8.0, "device": 2.0, "bulk": 1.0}
+    INFERENCE_CLASS_QUEUE_LIMITS: Dict[str, int] = {"interactive": 256, "device": 1024, "bulk": 4096}  # full -> 503
+    INFERENCE_RETRY_AFTER_SECONDS: int = 1
+
+    # Inference process pool
+    INFERENCE_POOL_SIZE: int = 2
+    INFERENCE_MAX_IN_FLIGHT: int = 64
+
+    # Bulk crop scoring
+    CROP_BATCH_CHUNK_SIZE: int = 5000
+    CROP_BATCH_JSON_MAX_BYTES: int = 32 * 1024 * 1024  # a JSON array is read whole; larger -> NDJSON/CSV
+
+    # Crop top-k + quantized memo (grid: °C, %RH, mm)
+    CROP_TOP_K_DEFAULT: int = 3
+    CROP_TOP_K_MAX: int = 5
+    CROP_MEMO_SIZE: int = 50_000
+    CROP_GRID_TEMPERATURE: float = 0.5
+    CROP_GRID_HUMIDITY: float = 1.0
+    CROP_GRID_RAINFALL: float = 5.0
+    CROP_LUT_ENABLED: bool = False  # dense top-k table over the valid input ranges
+
+    # Uploads
+    UPLOAD_MAX_BYTES: int = 15 * 1024 * 1024  # larger photos are rejected with 413
+
+    # Write-behind persistence (uploaded images + prediction logs)
+    WRITE_BEHIND_MAX_QUEUE: int = 1000  # handlers wait when the writer is this far behind
+    WRITE_BEHIND_MAX_BYTES: int = 256 * 1024 * 1024  # ...or this many bytes of images are buffered
+    WRITE_BEHIND_BATCH_SIZE: int = 100
+
+    # Prediction log sink (ring buffer -> bulk insert, JSONL spool if DB is down)
+    PREDICTION_LOG_BUFFER_SIZE: int = 10_000
+    PREDICTION_LOG_FLUSH_SIZE: int = 200
+    PREDICTION_LOG_FLUSH_INTERVAL_MS: float = 500.0
+    PREDICTION_LOG_SPOOL_PATH: str = "logs/prediction_spool.jsonl"  # shared by all workers (flock-guarded)
+
+    # Prediction cache
+    PREDICTION_CACHE_SIZE: int = 10_000
+    PREDICTION_CACHE_USE_REDIS: bool = False  # shared tier on REDIS_URL
+    PREDICTION_CACHE_REDIS_TTL_SECONDS: int = 7 * 24 * 3600
 
     # Security / JWT
     SECRET_KEY: str = Field(..., env="SECRET_KEY")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 1 day
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    ADMIN_EMAILS: List[str] = []  # may trigger model reloads (JSON list in env)
+
+    # Password hashing (bcrypt runs on its own bounded pool)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_LIMIT: int = 32  # waiting beyond this -> 503
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+
+    # Auth caches (verified tokens live until their own exp)
+    AUTH_TOKEN_CACHE_SIZE: int = 10_000
+    AUTH_USER_CACHE_SIZE: int = 10_000
+    AUTH_USER_CACHE_TTL_SECONDS: float = 30.0
+    AUTH_REVOCATION_SYNC_SECONDS: float = 5.0  # max delay before other workers see a logout
+    AUTH_REVOCATION_OVERLAP_SECONDS: float = 60.0  # re-read window for late commits / clock skew
+    AUTH_REVOCATION_RELOAD_SECONDS: float = 300.0  # full reload (drops expired / un-revoked jtis)
+
+    # Device auth (verified token hash -> device, per worker)
+    DEVICE_AUTH_CACHE_SIZE: int = 50_000
+    DEVICE_AUTH_CACHE_TTL_SECONDS: float = 60.0  # max time a rotated token still works on other workers
+
+    # Telemetry batch ingest
+    TELEMETRY_BATCH_CHUNK_SIZE: int = 5000  # readings per bulk INSERT
+    TELEMETRY_BATCH_MAX_BYTES: int = 32 * 1024 * 1024  # whole body (a JSON array is read whole) -> 413
+    TELEMETRY_LINE_MAX_BYTES: int = 64 * 1024  # one NDJSON reading -> 413
+
+    # Telemetry store (raw rows + 1m/1h/1d rollups; 0 = keep forever)
+    TELEMETRY_RAW_RETENTION_DAYS: int = 14
+    TELEMETRY_1M_RETENTION_DAYS: int = 90
+    TELEMETRY_1H_RETENTION_DAYS: int = 0
+    TELEMETRY_RETENTION_INTERVAL_SECONDS: float = 3600.0
+    TELEMETRY_PRUNE_BATCH_SIZE: int = 10_000  # rows deleted per transaction
+    TELEMETRY_SERIES_MAX_POINTS: int = 1000
 
     # Cloud / Integrations
     OPENWEATHER_API_KEY: Optional[str] = None
+    OPENWEATHER_BASE_URL: str = "https://api.openweathermap.org"
     SOIL_API_KEY: Optional[str] = None
     MARKET_API_KEY: Optional[str] = None
 
+    # Weather client (cache cells are geohashes; 5 chars ~ 5 km)
+    WEATHER_GEOHASH_PRECISION: int = 5
+    WEATHER_CACHE_TTL_SECONDS: float = 600.0
+    WEATHER_STALE_TTL_SECONDS: float = 3600.0  # served while a refresh runs / upstream is down
+    WEATHER_CACHE_SIZE: int = 20_000
+    WEATHER_TIMEOUT_SECONDS: float = 5.0
+    WEATHER_MAX_CONNECTIONS: int = 20
+    WEATHER_BREAKER_FAILURES: int = 5  # consecutive failures before skipping upstream
+    WEATHER_BREAKER_RESET_SECONDS: float = 30.0
+
+    # Soil grid cache (static soil properties per lat/lon cell, kept on disk)
+    SOIL_API_URL: str = "https://rest.isric.org/soilgrids/v2.0"
+    SOIL_GRID_DEGREES: float = 0.0025  # ~250 m, the SoilGrids resolution
+    SOIL_CACHE_PATH: str = "data/soil_cache.sqlite"
+    SOIL_MEMORY_CACHE_SIZE: int = 200_000
+    SOIL_FETCH_CONCURRENCY: int = 2  # the public SoilGrids API is heavily rate limited
+    SOIL_TIMEOUT_SECONDS: float = 20.0
+    SOIL_PREFETCH_MAX_CELLS: int = 2000  # ~125 km2 at the default grid
+
     # S3 / Storage
     S3_ENDPOINT: Optional[str] = None
     S3_BUCKET: Optional[str] = None
     AWS_ACCESS_KEY_ID: Optional[str] = None
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
     S3_REGION: Optional[str] = None
+    STORAGE_BACKEND: str = "local"  # "local" (static/uploads) or "s3"
+    S3_MAX_POOL_CONNECTIONS: int = 32  # shared client, per process
+    S3_MULTIPART_THRESHOLD_MB: int = 8
+    S3_MULTIPART_CHUNK_MB: int = 8
+    S3_MULTIPART_CONCURRENCY: int = 4
+    S3_PRESIGN_EXPIRES_SECONDS: int = 900
 
     # MQTT / IoT
     MQTT_HOST: str = "localhost"
@@ -43,15 +160,35 @@ class Settings(BaseSettings):
     MQTT_USER: Optional[str] = None
     MQTT_PASS: Optional[str] = None
     MQTT_TOPIC_PREFIX: str = "agromind/"
+    MQTT_CLIENT_ID: Optional[str] = None
+    MQTT_SHARED_GROUP: Optional[str] = None  # e.g. "ingest": consumers share $share/ingest/<topic>
+    MQTT_INGEST_QUEUE_SIZE: int = 5000  # messages awaiting a batch; full -> pause the connection
+    MQTT_BATCH_MAX_READINGS: int = 2000
+    MQTT_BATCH_MAX_WAIT_MS: float = 250.0
+    MQTT_INSERT_RETRIES: int = 3
+    MQTT_RECONNECT_SECONDS: float = 5.0
 
     # Celery / Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     CELERY_BROKER_URL: Optional[str] = None  # e.g. redis://...
     CELERY_BACKEND_URL: Optional[str] = None
+    CELERY_TASK_ALWAYS_EAGER: bool = False  # run tasks inline (tests / single-process dev)
+    CELERY_WORKER_PREFETCH: int = 4
+
+    # Background inference jobs (results live in inference_jobs, not the Celery backend)
+    INFERENCE_JOB_BATCH_SIZE: int = 32  # queued jobs a worker claims per model call
+    INFERENCE_JOB_STALE_SECONDS: float = 600.0  # running jobs older than this are claimed again
 
     # Vector DB
     VECTOR_DB_URL: Optional[str] = None
 
+    # Request logging
+    LOG_REQUEST_SAMPLE_RATE: float = 1.0  # fraction of successful requests logged
+    LOG_SLOW_REQUEST_MS: float = 1000.0  # slower requests are always logged
+
+    # Metrics (set PROMETHEUS_MULTIPROC_DIR in the environment under gunicorn)
+    METRICS_REFRESH_SECONDS: float = 5.0
+
     # Misc
     LOG_LEVEL: str = "INFO"
 
@@ -1,47 +1,93 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
-from pathlib import Path
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Optional
 
 LOG_DIR = Path("logs")
-LOG_DIR.mkdir(parents=True, exist_ok=True)
 LOG_FILE = LOG_DIR / "agromind.log"
 
 logger = logging.getLogger("agromind")
-logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
 
-# Avoid adding handlers multiple times (useful with reloads)
-if not logger.handlers:
-    # Console handler
-    ch = logging.StreamHandler()
-    ch.setLevel(os.getenv("LOG_LEVEL", "INFO"))
-
-    # Rotating file handler
-    fh = RotatingFileHandler(
-        filename=str(LOG_FILE),
-        maxBytes=2 * 1024 * 1024,  # 2MB
-        backupCount=5,
-        encoding="utf-8",
-    )
-    fh.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+_listener: Optional[QueueListener] = None
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that hands the record over untouched.
+
+    The stock prepare() renders msg % args in the caller's thread (it is
+    meant for multiprocessing queues); with an in-process queue the
+    listener thread can do all formatting, so the event loop only pays
+    for creating the record and a queue put.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
+
+def setup_logging(level: Optional[str] = None, log_file: Optional[Path] = LOG_FILE) -> QueueListener:
+    """
+    Route the "agromind" logger through a queue: console and rotating file
+    I/O (and message formatting) happen on a QueueListener thread, never on
+    the event loop. Idempotent; call once at startup.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = level or os.getenv("LOG_LEVEL", "INFO")
     formatter = logging.Formatter(
         fmt="%(asctime)s | %(levelname)s | %(name)s | %(module)s | %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
-    ch.setFormatter(formatter)
-    fh.setFormatter(formatter)
+    # Console handler
+    handlers = [logging.StreamHandler()]
+    if log_file is not None:
+        # Rotating file handler
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        handlers.append(RotatingFileHandler(
+            filename=str(log_file),
+            maxBytes=2 * 1024 * 1024,  # 2MB
+            backupCount=5,
+            encoding="utf-8",
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # Replace whatever was attached before (reloads, ad-hoc StreamHandlers)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.setLevel(level)
+    logger.addHandler(DeferredQueueHandler(queue.SimpleQueue()))
+    logger.propagate = False
+
+    _listener = QueueListener(logger.handlers[0].queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
 
-    logger.addHandler(ch)
-    logger.addHandler(fh)
+def shutdown_logging():
+    """
+    Flush queued records and stop the listener thread.
+    """
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
 
 
 def log_event(event: str, **meta):
     """
-    Helper to log structured events.
+    Helper to log structured events (formatted lazily, off the event loop).
     """
     if meta:
-        logger.info(f"{event} | {meta}")
+        logger.info("%s | %s", event, meta)
     else:
         logger.info(event)
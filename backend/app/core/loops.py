@@ -0,0 +1,17 @@
+import asyncio
+from typing import Optional, Tuple
+
+
+def rebind_loop(bound: Optional[asyncio.AbstractEventLoop]) -> Tuple[asyncio.AbstractEventLoop, bool]:
+    """
+    (running loop, whether it is not `bound`).
+
+    Process-wide singletons (batchers, write-behind queues, HTTP clients)
+    hold asyncio state -- queues, events, semaphores, worker tasks, pooled
+    connections -- that only works on the loop that created it. A server
+    process runs one loop, but tests and scripts call asyncio.run() many
+    times, so owners rebuild that state whenever this reports a new loop.
+    Raises RuntimeError outside a running loop.
+    """
+    loop = asyncio.get_running_loop()
+    return loop, loop is not bound
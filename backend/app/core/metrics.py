@@ -0,0 +1,204 @@
+"""
+Prometheus metrics.
+
+Latency is recorded in histograms at the point of work (route, inference
+stages, DB session, bcrypt). Queue depths, cache hit/miss counters and
+model versions live in the objects that own them; `refresh_runtime_metrics`
+copies them into Prometheus gauges/counters (every METRICS_REFRESH_SECONDS
+and on each scrape).
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR (developement/gunicorn_conf.py
+does) so every worker writes its samples to a shared directory and
+/metrics aggregates all of them, whichever worker answers the scrape.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+logger = logging.getLogger("agromind")
+
+# Tuned for an API whose requests range from <1 ms (cache hits) to seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "agromind_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+INFERENCE_STAGE_SECONDS = Histogram(
+    "agromind_inference_stage_seconds",
+    "Time per inference batch stage (decode / preprocess / predict)",
+    ["model", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+INFERENCE_QUEUE_WAIT_SECONDS = Histogram(
+    "agromind_inference_queue_wait_seconds",
+    "Time an inference request waited for a batch, by priority class",
+    ["queue", "priority"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_SESSION_SECONDS = Histogram(
+    "agromind_db_session_seconds",
+    "Lifetime of a request-scoped DB session",
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "agromind_password_hash_seconds",
+    "bcrypt time on the password hashing pool",
+    ["op"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.5),
+)
+QUEUE_DEPTH = Gauge(
+    "agromind_queue_depth",
+    "Items waiting in an in-process queue",
+    ["queue"],
+    multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter(
+    "agromind_cache_requests",
+    "Cache lookups by result (hit ratio = hit / (hit + miss))",
+    ["cache", "result"],
+)
+MODEL_INFO = Gauge(
+    "agromind_model_info",
+    "1 for the model version currently served",
+    ["model", "version"],
+    multiprocess_mode="livemax",
+)
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Exposition-format payload (aggregated across workers in multiprocess mode).
+    """
+    refresh_runtime_metrics()
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+# -------------------------
+# Runtime sources
+# -------------------------
+# name -> fn() returning the current queue depth
+_queue_sources: Dict[str, Callable[[], int]] = {}
+# name -> fn() returning {"hits": int, "misses": int} (monotonic totals)
+_cache_sources: Dict[str, Callable[[], dict]] = {}
+_cache_seen: Dict[Tuple[str, str], int] = {}
+# fn() returning {model: version}
+_version_sources: List[Callable[[], dict]] = []
+_versions_seen: Dict[str, str] = {}
+
+
+def register_queue(name: str, depth_fn: Callable[[], int]):
+    _queue_sources[name] = depth_fn
+
+
+def register_cache(name: str, stats_fn: Callable[[], dict]):
+    _cache_sources[name] = stats_fn
+
+
+def register_model_versions(versions_fn: Callable[[], dict]):
+    _version_sources.append(versions_fn)
+
+
+def refresh_runtime_metrics():
+    for name, depth_fn in _queue_sources.items():
+        try:
+            QUEUE_DEPTH.labels(name).set(depth_fn())
+        except Exception:
+            logger.debug("queue depth source %s failed", name, exc_info=True)
+
+    for name, stats_fn in _cache_sources.items():
+        try:
+            stats = stats_fn()
+        except Exception:
+            logger.debug("cache stats source %s failed", name, exc_info=True)
+            continue
+        for result, key in (("hit", "hits"), ("miss", "misses")):
+            total = int(stats.get(key, 0))
+            seen = _cache_seen.get((name, result), 0)
+            # caches may be cleared (counters reset) -> start over from 0
+            delta = total - seen if total >= seen else total
+            if delta:
+                CACHE_REQUESTS.labels(name, result).inc(delta)
+            _cache_seen[(name, result)] = total
+
+    for versions_fn in _version_sources:
+        try:
+            versions = versions_fn()
+        except Exception:
+            logger.debug("model version source failed", exc_info=True)
+            continue
+        for model, version in versions.items():
+            previous = _versions_seen.get(model)
+            if previous is not None and previous != version:
+                MODEL_INFO.labels(model, previous).set(0)
+            MODEL_INFO.labels(model, version).set(1)
+            _versions_seen[model] = version
+
+
+async def refresh_periodically(interval: float):
+    """
+    Background task: keep this worker's gauges fresh between scrapes.
+    """
+    while True:
+        refresh_runtime_metrics()
+        await asyncio.sleep(interval)
+
+
+# -------------------------
+# ASGI middleware
+# -------------------------
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware recording request latency per route template
+    (`/users/{user_id}`, not the raw path, to bound label cardinality).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"],
+                getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched",
+                str(status_code),
+            ).observe(time.perf_counter() - start)
@@ -1,40 +1,81 @@
-
 import time
 import logging
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request, Response
+import random
+from typing import Optional
+
+from app.core.config import settings
 
 logger = logging.getLogger("agromind")
 
-SENSITIVE_HEADERS = {"authorization", "cookie", "set-cookie", "x-api-key", "x-device-token"}
+SENSITIVE_HEADERS = {b"authorization", b"cookie", b"set-cookie", b"x-api-key", b"x-device-token"}
+
+
+class _MaskedHeaders:
+    """
+    Raw ASGI headers rendered (with secrets masked) only if the record
+    is actually formatted — i.e. on the logging thread, at DEBUG level.
+    """
+
+    __slots__ = ("headers",)
+
+    def __init__(self, headers):
+        self.headers = headers
+
+    def __repr__(self):
+        return repr({
+            k.decode("latin-1"): "****" if k.lower() in SENSITIVE_HEADERS else v.decode("latin-1")
+            for k, v in self.headers
+        })
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
+
+class RequestLoggingMiddleware:
     """
-    Logs method, path, status, processing time and masked headers.
+    Pure ASGI middleware: logs method, path, status and processing time
+    (and masked headers at DEBUG). No per-request task or body streaming
+    wrapper as with BaseHTTPMiddleware; messages use %-style args so they
+    are formatted by the QueueListener thread, not on the event loop.
+
+    Successful requests are logged with probability `sample_rate`;
+    4xx/5xx, exceptions and requests slower than `slow_ms` always are.
+
     Add to FastAPI app with:
         app.add_middleware(RequestLoggingMiddleware)
     """
-    async def dispatch(self, request: Request, call_next):
-        start = time.time()
-        try:
-            masked_headers = self._mask_headers(request.headers)
-            logger.info(f"REQUEST START -> {request.method} {request.url.path} headers={masked_headers}")
 
-            response: Response = await call_next(request)
-            process_time = (time.time() - start) * 1000
-            logger.info(f"REQUEST END   <- {request.method} {request.url.path} status={response.status_code} time_ms={process_time:.2f}")
-            return response
+    def __init__(self, app, sample_rate: Optional[float] = None, slow_ms: Optional[float] = None):
+        self.app = app
+        self.sample_rate = settings.LOG_REQUEST_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.slow_ms = settings.LOG_SLOW_REQUEST_MS if slow_ms is None else slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
         except Exception as exc:
-            process_time = (time.time() - start) * 1000
-            logger.exception(f"REQUEST ERROR  !! {request.method} {request.url.path} time_ms={process_time:.2f} error={exc}")
+            logger.exception(
+                "REQUEST ERROR  !! %s %s time_ms=%.2f error=%s",
+                scope["method"], scope["path"], (time.perf_counter() - start) * 1000, exc,
+            )
             raise
 
-    def _mask_headers(self, headers):
-        out = {}
-        for k, v in headers.items():
-            key = k.lower()
-            if key in SENSITIVE_HEADERS:
-                out[key] = "****"
-            else:
-                out[key] = v
-        return out
+        process_time = (time.perf_counter() - start) * 1000
+        if status_code >= 400 or process_time >= self.slow_ms or random.random() < self.sample_rate:
+            logger.info(
+                "REQUEST %s %s status=%d time_ms=%.2f",
+                scope["method"], scope["path"], status_code, process_time,
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("REQUEST HEADERS %s %s headers=%r",
+                             scope["method"], scope["path"], _MaskedHeaders(scope["headers"]))
@@ -1,9 +1,15 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from fastapi import HTTPException, status
 from jose import jwt, JWTError
 from app.core.config import settings
+from app.core.metrics import PASSWORD_HASH_SECONDS, register_queue
 
 # Crypt context for password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -25,6 +31,104 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class PasswordHasher:
+    """
+    Runs bcrypt on its own small thread pool so a login burst cannot take
+    over Starlette's shared threadpool (and starve DB-bound handlers).
+
+    At most `max_workers` hashes run at once and `queue_limit` more may
+    wait; beyond that callers get 503 + Retry-After immediately.
+    """
+
+    def __init__(self, max_workers: int, queue_limit: int, retry_after: int = 1):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._hash_ms_total = 0.0
+        self._hash_ms_max = 0.0
+        self._wait_ms_total = 0.0
+
+    async def run(self, fn, *args, op: str = "other"):
+        with self._lock:
+            if self._pending >= self.max_workers + self.queue_limit:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication is busy, retry shortly",
+                    headers={"Retry-After": str(self.retry_after)},
+                )
+            self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            future = self._executor.submit(self._timed, submitted, op, fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        # a cancelled caller does not stop the bcrypt thread, so the slot is
+        # only freed once the thread is done with it
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def _timed(self, submitted, op, fn, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            PASSWORD_HASH_SECONDS.labels(op).observe(elapsed)
+            elapsed_ms = elapsed * 1000
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+                self._hash_ms_total += elapsed_ms
+                self._hash_ms_max = max(self._hash_ms_max, elapsed_ms)
+                self._wait_ms_total += (started - submitted) * 1000
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password, op="hash")
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password, op="verify")
+
+    def metrics(self) -> dict:
+        with self._lock:
+            done = self.completed
+            return {
+                "max_workers": self.max_workers,
+                "queue_limit": self.queue_limit,
+                "running": self._running,
+                "queue_depth": self._pending - self._running,
+                "completed": done,
+                "rejected": self.rejected,
+                "avg_hash_ms": round(self._hash_ms_total / done, 2) if done else 0.0,
+                "max_hash_ms": round(self._hash_ms_max, 2),
+                "avg_queue_wait_ms": round(self._wait_ms_total / done, 2) if done else 0.0,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT,
+    retry_after=settings.PASSWORD_HASH_RETRY_AFTER_SECONDS,
+)
+register_queue("password_hash", lambda: password_hasher.metrics()["queue_depth"])
+
+
 # -------------------------
 # JWT helpers
 # -------------------------
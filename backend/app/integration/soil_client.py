@@ -0,0 +1,472 @@
+# backend/app/integration/soil_client.py
+"""
+Soil properties (SoilGrids-style, effectively static) per fixed grid cell.
+
+- the world is cut into SOIL_GRID_DEGREES cells (0.0025 deg ~ 250 m,
+  the SoilGrids resolution); a cell is fetched once, for its centre
+- fetched cells are kept forever in a local SQLite file
+  (SOIL_CACHE_PATH) with an in-process LRU in front, so a warm lookup is
+  a dict hit and a cold-process lookup one indexed SQLite read; neither
+  touches the network
+- `lookup_many` maps points to cells, dedupes them, reads every cached
+  cell in one query and fetches only the missing ones (at most
+  SOIL_FETCH_CONCURRENCY at a time; concurrent misses for a cell share
+  one request), then stores them in one transaction
+- `prefetch_polygon` / `prefetch_cells` warm every cell a farm's GeoJSON
+  polygon covers; `cells_summary` only reads what is already cached and
+  reports the rest as pending
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.core.loops import rebind_loop
+from app.core.metrics import register_cache
+
+logger = logging.getLogger("agromind")
+
+Cell = Tuple[int, int]
+
+# SoilGrids property -> our name (values are divided by the layer's d_factor)
+SOIL_PROPERTIES = {
+    "phh2o": "ph",
+    "soc": "organic_carbon",  # g/kg
+    "nitrogen": "nitrogen",  # g/kg
+    "clay": "clay",  # %
+    "sand": "sand",
+    "silt": "silt",
+    "cec": "cec",  # cmol(c)/kg
+    "bdod": "bulk_density",  # kg/dm3
+}
+SOIL_DEPTH = "0-5cm"
+
+
+class SoilUnavailable(Exception):
+    """
+    A cell is not cached and could not be fetched.
+    """
+
+
+# ─────────────────────────────────────────────
+# Grid
+# ─────────────────────────────────────────────
+def cell_of(lat: float, lon: float, size: float) -> Cell:
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("lat must be in [-90, 90] and lon in [-180, 180]")
+    return math.floor(lat / size), math.floor(lon / size)
+
+
+def cell_center(cell: Cell, size: float) -> Tuple[float, float]:
+    return (cell[0] + 0.5) * size, (cell[1] + 0.5) * size
+
+
+def _polygons(geojson: dict) -> List[list]:
+    """
+    Rings of every polygon in a Polygon / MultiPolygon / Feature / FeatureCollection.
+    """
+    kind = geojson.get("type") if isinstance(geojson, dict) else None
+    if kind == "FeatureCollection":
+        return [p for feature in geojson.get("features") or [] for p in _polygons(feature)]
+    if kind == "Feature":
+        return _polygons(geojson.get("geometry") or {})
+    if kind == "Polygon":
+        return [geojson["coordinates"]]
+    if kind == "MultiPolygon":
+        return list(geojson["coordinates"])
+    raise ValueError("geojson must be a Polygon or MultiPolygon (or a Feature of one)")
+
+
+def _inside(lat: float, lon: float, rings: list) -> bool:
+    # even-odd rule over all rings, so holes are excluded
+    inside = False
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+            if (y1 > lat) != (y2 > lat) and lon < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+    return inside
+
+
+def polygon_cells(geojson: dict, size: float, max_cells: int = 0) -> List[Cell]:
+    """
+    Cells whose centre lies in the polygon; a polygon too small or thin to
+    contain a centre gets the cells of its vertices. GeoJSON is [lon, lat].
+    Raises ValueError for bad geometry or more than `max_cells` cells.
+    """
+    cells = set()
+    try:
+        for rings in _polygons(geojson):
+            rings = [[(float(lon), float(lat)) for lon, lat, *_ in ring] for ring in rings]
+            if not rings or len(rings[0]) < 3:
+                raise ValueError("polygon needs at least 3 points")
+            lons = [lon for lon, _ in rings[0]]
+            lats = [lat for _, lat in rings[0]]
+            low, high = cell_of(min(lats), min(lons), size), cell_of(max(lats), max(lons), size)
+            span = (high[0] - low[0] + 1) * (high[1] - low[1] + 1)
+            if max_cells and span > max_cells * 4:
+                raise ValueError(f"polygon covers more than {max_cells} soil cells")
+            covered = {
+                (i, j)
+                for i in range(low[0], high[0] + 1)
+                for j in range(low[1], high[1] + 1)
+                if _inside(*cell_center((i, j), size), rings)
+            }
+            cells.update(covered or {cell_of(lat, lon, size) for lon, lat in rings[0]})
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"invalid geojson: {e}")
+    if max_cells and len(cells) > max_cells:
+        raise ValueError(f"polygon covers more than {max_cells} soil cells")
+    return sorted(cells)
+
+
+# ─────────────────────────────────────────────
+# On-disk store
+# ─────────────────────────────────────────────
+class SoilStore:
+    """
+    SQLite file of cell -> properties (JSON). Tied to one grid size: a
+    file written with another SOIL_GRID_DEGREES is emptied on open.
+    """
+
+    def __init__(self, path: str, grid_degrees: float):
+        self.path = path
+        self.grid_degrees = grid_degrees
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS soil_cells ("
+                " i INTEGER NOT NULL, j INTEGER NOT NULL, props TEXT NOT NULL, fetched_at REAL NOT NULL,"
+                " PRIMARY KEY (i, j)) WITHOUT ROWID"
+            )
+            row = conn.execute("SELECT value FROM meta WHERE key = 'grid_degrees'").fetchone()
+            if row is None or float(row[0]) != self.grid_degrees:
+                if row is not None:
+                    logger.warning("soil cache %s was built for a %s deg grid; clearing", self.path, row[0])
+                conn.execute("DELETE FROM soil_cells")
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('grid_degrees', ?)", (repr(self.grid_degrees),))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, cells: Sequence[Cell], chunk: int = 400) -> Dict[Cell, dict]:
+        found: Dict[Cell, dict] = {}
+        with self._lock:
+            db = self._db()
+            for start in range(0, len(cells), chunk):
+                part = cells[start:start + chunk]
+                where = " OR ".join(["(i = ? AND j = ?)"] * len(part))
+                args = [value for cell in part for value in cell]
+                for i, j, props in db.execute(f"SELECT i, j, props FROM soil_cells WHERE {where}", args):
+                    found[(i, j)] = json.loads(props)
+        return found
+
+    def put_many(self, values: Dict[Cell, dict]):
+        if not values:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                "INSERT OR REPLACE INTO soil_cells (i, j, props, fetched_at) VALUES (?, ?, ?, ?)",
+                [(i, j, json.dumps(props), now) for (i, j), props in values.items()],
+            )
+            db.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM soil_cells").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# ─────────────────────────────────────────────
+# Client
+# ─────────────────────────────────────────────
+def parse_soilgrids(payload: dict) -> dict:
+    props = {}
+    for layer in (payload.get("properties") or {}).get("layers") or []:
+        name = SOIL_PROPERTIES.get(layer.get("name"))
+        if name is None:
+            continue
+        factor = (layer.get("unit_measure") or {}).get("d_factor") or 1
+        for depth in layer.get("depths") or []:
+            if depth.get("label") == SOIL_DEPTH:
+                mean = (depth.get("values") or {}).get("mean")
+                props[name] = None if mean is None else mean / factor
+    return props
+
+
+class SoilClient:
+    """
+    Grid-cell soil lookups backed by a SoilStore; see the module docstring.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        store: SoilStore,
+        grid_degrees: float = 0.0025,
+        max_entries: int = 200_000,
+        concurrency: int = 2,
+        timeout: float = 20.0,
+        max_prefetch_cells: int = 2000,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.store = store
+        self.grid_degrees = grid_degrees
+        self.max_entries = max_entries
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_prefetch_cells = max_prefetch_cells
+
+        self._entries: "OrderedDict[Cell, dict]" = OrderedDict()
+        self._inflight: Dict[Cell, asyncio.Future] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+
+    @classmethod
+    def from_settings(cls) -> "SoilClient":
+        return cls(
+            base_url=settings.SOIL_API_URL,
+            store=SoilStore(settings.SOIL_CACHE_PATH, settings.SOIL_GRID_DEGREES),
+            grid_degrees=settings.SOIL_GRID_DEGREES,
+            max_entries=settings.SOIL_MEMORY_CACHE_SIZE,
+            concurrency=settings.SOIL_FETCH_CONCURRENCY,
+            timeout=settings.SOIL_TIMEOUT_SECONDS,
+            max_prefetch_cells=settings.SOIL_PREFETCH_MAX_CELLS,
+        )
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def cached(self, lat: float, lon: float) -> Optional[dict]:
+        """
+        Memory-only lookup (no I/O); None if the cell is not warm in this process.
+        """
+        cell = cell_of(lat, lon, self.grid_degrees)
+        props = self._entries.get(cell)
+        if props is not None:
+            self.hits += 1
+            self._entries.move_to_end(cell)
+        return props
+
+    async def lookup(self, lat: float, lon: float) -> dict:
+        props = self.cached(lat, lon)
+        if props is not None:
+            return props
+        result = (await self.lookup_many([(lat, lon)]))[0]
+        if result is None:
+            raise SoilUnavailable("soil data unavailable for this location")
+        return result
+
+    async def lookup_many(self, points: Iterable[Tuple[float, float]]) -> List[Optional[dict]]:
+        """
+        Properties for each (lat, lon), None where the cell could not be fetched.
+        """
+        cells = [cell_of(lat, lon, self.grid_degrees) for lat, lon in points]
+        found = await self._resolve(set(cells))
+        return [found.get(cell) for cell in cells]
+
+    async def prefetch_polygon(self, geojson: dict) -> dict:
+        """
+        Warm every cell the polygon covers -> {"cells", "fetched", "failed"}.
+        """
+        return await self.prefetch_cells(polygon_cells(geojson, self.grid_degrees, self.max_prefetch_cells))
+
+    async def prefetch_cells(self, cells: Sequence[Cell]) -> dict:
+        """
+        Warm already-rasterized cells -> {"cells", "fetched", "failed"}.
+        """
+        fetched_before = self.upstream_calls - self.upstream_errors
+        found = await self._resolve(set(cells))
+        return {
+            "cells": len(cells),
+            "fetched": self.upstream_calls - self.upstream_errors - fetched_before,
+            "failed": len(cells) - len(found),
+        }
+
+    async def cells_summary(self, cells: Sequence[Cell]) -> dict:
+        """
+        Mean of each property over the cached cells; never touches the network.
+        Cells not cached yet are only counted as "pending".
+        """
+        found = await self._cached(set(cells))
+        summary: Dict[str, float] = {}
+        for name in SOIL_PROPERTIES.values():
+            values = [props[name] for props in found.values() if props.get(name) is not None]
+            if values:
+                summary[name] = round(sum(values) / len(values), 3)
+        return {
+            "cells": len(cells),
+            "cells_with_data": len(found),
+            "pending": len(cells) - len(found),
+            "properties": summary,
+        }
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+            "in_flight": len(self._inflight),
+        }
+
+    async def aclose(self):
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+        self.store.close()
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    def _remember(self, cell: Cell, props: dict):
+        self._entries[cell] = props
+        self._entries.move_to_end(cell)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _cached(self, cells: set) -> Dict[Cell, dict]:
+        # memory, then one SQLite query for the rest; no network
+        found: Dict[Cell, dict] = {}
+        missing = []
+        for cell in cells:
+            props = self._entries.get(cell)
+            if props is None:
+                missing.append(cell)
+            else:
+                self.hits += 1
+                found[cell] = props
+        if not missing:
+            return found
+
+        on_disk = await asyncio.to_thread(self.store.get_many, missing)
+        self.disk_hits += len(on_disk)
+        for cell, props in on_disk.items():
+            self._remember(cell, props)
+        found.update(on_disk)
+        return found
+
+    async def _resolve(self, cells: set) -> Dict[Cell, dict]:
+        found = await self._cached(cells)
+        missing = [cell for cell in cells if cell not in found]
+        if not missing:
+            return found
+
+        self.misses += len(missing)
+        owned, waits = [], []
+        loop = asyncio.get_running_loop()
+        for cell in missing:
+            future = self._inflight.get(cell)
+            if future is None:
+                future = self._inflight[cell] = loop.create_future()
+                owned.append(cell)
+            waits.append((cell, future))
+
+        if owned:
+            results = [None] * len(owned)
+            try:
+                results = await asyncio.gather(*(self._fetch(cell) for cell in owned))
+                for cell, props in zip(owned, results):
+                    if props is not None:
+                        self._remember(cell, props)
+                fetched = {cell: props for cell, props in zip(owned, results) if props is not None}
+                try:
+                    await asyncio.to_thread(self.store.put_many, fetched)
+                except Exception:
+                    logger.exception("could not persist %d soil cells", len(fetched))
+            finally:
+                # waiters are released even if this caller is cancelled
+                for cell, props in zip(owned, results):
+                    future = self._inflight.pop(cell)
+                    if not future.done():
+                        future.set_result(props)
+
+        for cell, future in waits:
+            props = await future
+            if props is not None:
+                found[cell] = props
+        return found
+
+    async def _fetch(self, cell: Cell) -> Optional[dict]:
+        lat, lon = cell_center(cell, self.grid_degrees)
+        params = [("lat", round(lat, 6)), ("lon", round(lon, 6)), ("depth", SOIL_DEPTH), ("value", "mean")]
+        params += [("property", name) for name in SOIL_PROPERTIES]
+        client, slots = self._http()
+        async with slots:
+            self.upstream_calls += 1
+            try:
+                response = await client.get("/properties/query", params=params)
+                response.raise_for_status()
+                return parse_soilgrids(response.json())
+            except (httpx.HTTPError, ValueError) as e:
+                self.upstream_errors += 1
+                logger.warning("soil request for cell %s failed: %s", cell, e)
+                return None
+
+    def _http(self) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        loop, moved = rebind_loop(self._loop)
+        if moved or self._client is None:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+            self._slots = asyncio.Semaphore(self.concurrency)
+        return self._client, self._slots
+
+
+soil_client = SoilClient.from_settings()
+register_cache("soil", soil_client.stats)
+
+
+async def prefetch_farm(farm_id: int, cells: Sequence[Cell], client: Optional[SoilClient] = None):
+    """
+    Background task run after a farm is created (with the cells its polygon
+    was rasterized to) or when a summary found pending cells; failures are
+    only logged and the cells stay pending.
+    """
+    client = client or soil_client
+    try:
+        result = await client.prefetch_cells(cells)
+    except Exception:
+        logger.exception("soil prefetch for farm %s failed", farm_id)
+        return
+    logger.info("soil prefetch for farm %s: cells=%d fetched=%d failed=%d",
+                farm_id, result["cells"], result["fetched"], result["failed"])
@@ -0,0 +1,353 @@
+# backend/app/integration/weather_client.py
+"""
+Async OpenWeather client shared by crop recommendations and the agent.
+
+- one pooled httpx.AsyncClient per process (keep-alive connections,
+  bounded by WEATHER_MAX_CONNECTIONS)
+- results are cached per geohash cell (WEATHER_GEOHASH_PRECISION, 5 =
+  ~5 km) and fetched for the cell centre, so every farm in a cell shares
+  one upstream response
+- single-flight: concurrent misses for one cell await the same request
+- stale-while-revalidate: an entry older than WEATHER_CACHE_TTL_SECONDS
+  is still served (flagged "stale") for WEATHER_STALE_TTL_SECONDS while
+  one background refresh runs
+- circuit breaker: after WEATHER_BREAKER_FAILURES consecutive failures
+  upstream is skipped for WEATHER_BREAKER_RESET_SECONDS (stale data is
+  served if there is any), then a single probe decides whether to close
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.core.loops import rebind_loop
+from app.core.metrics import register_cache
+
+logger = logging.getLogger("agromind")
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+class WeatherUnavailable(Exception):
+    """
+    No usable weather data: upstream failed (or the breaker is open) and nothing is cached.
+    """
+
+
+# ─────────────────────────────────────────────
+# Geohash cells
+# ─────────────────────────────────────────────
+def geohash_encode(lat: float, lon: float, precision: int) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def geohash_center(cell: str) -> Tuple[float, float]:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = _GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+# ─────────────────────────────────────────────
+# Circuit breaker
+# ─────────────────────────────────────────────
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half-open after `reset_timeout` seconds, letting one probe
+    through; the probe's outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                logger.warning("weather circuit breaker open after %d failures", self.failures)
+            self.state = "open"
+            self.opened_at = self.clock()
+
+    def as_dict(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.times_opened}
+
+
+# ─────────────────────────────────────────────
+# Client
+# ─────────────────────────────────────────────
+def _parse_current(payload: dict) -> dict:
+    main = payload.get("main") or {}
+    rain = payload.get("rain") or {}
+    return {
+        "temperature": main.get("temp"),
+        "humidity": main.get("humidity"),
+        "rainfall": rain.get("1h", rain.get("3h", 0.0)),
+        "conditions": [w.get("main") for w in payload.get("weather") or []],
+        "observed_at": payload.get("dt"),
+    }
+
+
+def _parse_forecast(payload: dict) -> dict:
+    return {
+        "points": [
+            {
+                "ts": item.get("dt"),
+                "temperature": (item.get("main") or {}).get("temp"),
+                "humidity": (item.get("main") or {}).get("humidity"),
+                "rainfall": (item.get("rain") or {}).get("3h", 0.0),
+            }
+            for item in payload.get("list") or []
+        ],
+    }
+
+
+# kind -> (OpenWeather path, parser)
+ENDPOINTS = {
+    "current": ("/data/2.5/weather", _parse_current),
+    "forecast": ("/data/2.5/forecast", _parse_forecast),
+}
+
+
+class WeatherClient:
+    """
+    Cached, coalescing OpenWeather client; see the module docstring.
+    `current(lat, lon)` / `forecast(lat, lon)` return the parsed data plus
+    "cell", "fetched_at" (epoch seconds) and "stale".
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        precision: int = 5,
+        ttl: float = 600.0,
+        stale_ttl: float = 3600.0,
+        max_entries: int = 20_000,
+        timeout: float = 5.0,
+        max_connections: int = 20,
+        breaker: Optional[CircuitBreaker] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.precision = precision
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.clock = clock
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+
+        # (kind, cell) -> (data, fetched at by `clock`, fetched at epoch)
+        self._entries: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.short_circuited = 0
+
+    @classmethod
+    def from_settings(cls) -> "WeatherClient":
+        return cls(
+            base_url=settings.OPENWEATHER_BASE_URL,
+            api_key=settings.OPENWEATHER_API_KEY,
+            precision=settings.WEATHER_GEOHASH_PRECISION,
+            ttl=settings.WEATHER_CACHE_TTL_SECONDS,
+            stale_ttl=settings.WEATHER_STALE_TTL_SECONDS,
+            max_entries=settings.WEATHER_CACHE_SIZE,
+            timeout=settings.WEATHER_TIMEOUT_SECONDS,
+            max_connections=settings.WEATHER_MAX_CONNECTIONS,
+            breaker=CircuitBreaker(settings.WEATHER_BREAKER_FAILURES, settings.WEATHER_BREAKER_RESET_SECONDS),
+        )
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    async def current(self, lat: float, lon: float) -> dict:
+        return await self._get("current", lat, lon)
+
+    async def forecast(self, lat: float, lon: float) -> dict:
+        return await self._get("forecast", lat, lon)
+
+    def cell(self, lat: float, lon: float) -> str:
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError("lat must be in [-90, 90] and lon in [-180, 180]")
+        return geohash_encode(lat, lon, self.precision)
+
+    async def aclose(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+            "short_circuited": self.short_circuited,
+            "in_flight": len(self._inflight),
+            "breaker": self.breaker.as_dict(),
+        }
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    async def _get(self, kind: str, lat: float, lon: float) -> dict:
+        key = (kind, self.cell(lat, lon))
+        entry = self._entries.get(key)
+        if entry is not None:
+            data, fetched, fetched_epoch = entry
+            age = self.clock() - fetched
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._result(key, data, fetched_epoch, stale=False)
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._refresh(key)  # in the background; errors are only logged
+                return self._result(key, data, fetched_epoch, stale=True)
+
+        self.misses += 1
+        try:
+            data, fetched_epoch = await asyncio.shield(self._refresh(key))
+        except WeatherUnavailable:
+            if entry is not None:
+                # expired, but better than nothing while upstream is down
+                return self._result(key, entry[0], entry[2], stale=True)
+            raise
+        return self._result(key, data, fetched_epoch, stale=False)
+
+    @staticmethod
+    def _result(key, data: dict, fetched_epoch: float, stale: bool) -> dict:
+        return {**data, "cell": key[1], "fetched_at": fetched_epoch, "stale": stale}
+
+    def _refresh(self, key) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = asyncio.get_running_loop().create_task(self._fetch(key))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._settle(key, t))
+        return task
+
+    def _settle(self, key, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            # Retrieved here so background refresh failures are not reported as unhandled
+            logger.debug("weather refresh for %s failed: %s", key, task.exception())
+
+    async def _fetch(self, key) -> Tuple[dict, float]:
+        if not self.api_key:
+            raise WeatherUnavailable("OPENWEATHER_API_KEY is not configured")
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise WeatherUnavailable("weather provider unavailable (circuit open)")
+        kind, cell = key
+        path, parse = ENDPOINTS[kind]
+        lat, lon = geohash_center(cell)
+        self.upstream_calls += 1
+        try:
+            response = await self._http().get(
+                path, params={"lat": round(lat, 5), "lon": round(lon, 5), "appid": self.api_key, "units": "metric"},
+            )
+            response.raise_for_status()
+            data = parse(response.json())
+        except (httpx.HTTPError, ValueError) as e:
+            self.upstream_errors += 1
+            self.breaker.record_failure()
+            logger.warning("weather %s request for %s failed: %s", kind, cell, e)
+            raise WeatherUnavailable(f"weather provider error: {e}") from e
+        self.breaker.record_success()
+        fetched_epoch = time.time()
+        self._entries[key] = (data, self.clock(), fetched_epoch)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return data, fetched_epoch
+
+    def _http(self) -> httpx.AsyncClient:
+        loop, moved = rebind_loop(self._loop)
+        if moved or self._client is None:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+
+weather_client = WeatherClient.from_settings()
+register_cache("weather", weather_client.stats)
@@ -4,10 +4,15 @@ from app.core.config import settings
 from app.api.routes import disease, health, user, feedback
 from app.api.routes import disease, health, user, feedback, crop_recommendation
 from app.core.middleware import RequestLoggingMiddleware
+from app.core.logger import setup_logging, shutdown_logging
+from app.core.metrics import PrometheusMiddleware, refresh_periodically
 from app.api.routes import auth
 #from app.api.routes import devices, iot_webhook, integrations, llm_agent, voice
 
 from app.api.router import api_router
+# Log I/O runs on a QueueListener thread, off the event loop
+setup_logging(settings.LOG_LEVEL)
+
 # ─────────────────────────────────────────────
 # Initialize FastAPI App
 # ─────────────────────────────────────────────
@@ -28,6 +33,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.add_middleware(RequestLoggingMiddleware)
+app.add_middleware(PrometheusMiddleware)
 
 # ─────────────────────────────────────────────
 # Include API Routers
@@ -35,6 +41,67 @@ app.add_middleware(RequestLoggingMiddleware)
 app.include_router(api_router)
 
 
+# ─────────────────────────────────────────────
+# Lifecycle
+# ─────────────────────────────────────────────
+@app.on_event("startup")
+async def hash_model_files():
+    import asyncio
+    from app.ml.registry import model_registry
+    # Checksums are never computed on the loop; have them ready before traffic
+    await asyncio.to_thread(model_registry.refresh)
+
+
+@app.on_event("startup")
+async def warm_crop_lookup_table():
+    if settings.CROP_LUT_ENABLED:
+        import asyncio
+        from app.models.ml_crop_model import build_crop_lut
+        # Build in the background; lookups fall back to the memo until ready
+        asyncio.get_running_loop().run_in_executor(None, build_crop_lut)
+
+
+@app.on_event("startup")
+async def start_metrics_refresh():
+    import asyncio
+    # Keep this worker's queue-depth / cache / model-version series current
+    app.state.metrics_task = asyncio.get_running_loop().create_task(
+        refresh_periodically(settings.METRICS_REFRESH_SECONDS)
+    )
+
+
+@app.on_event("startup")
+async def start_telemetry_retention():
+    import asyncio
+    from app.services.telemetry_store import prune_periodically
+    # Idempotent batched deletes, so running it in every worker is harmless
+    app.state.telemetry_retention_task = asyncio.get_running_loop().create_task(
+        prune_periodically(settings.TELEMETRY_RETENTION_INTERVAL_SECONDS)
+    )
+
+
+@app.on_event("shutdown")
+async def stop_inference_batchers():
+    from app.models.ml_model import disease_batcher
+    from app.ml.executor import get_inference_executor
+    from app.core.security import password_hasher
+    from app.services.write_behind import write_behind
+    from app.services.prediction_log_service import prediction_sink
+    from app.services.database import async_engine
+    from app.integration.weather_client import weather_client
+    from app.integration.soil_client import soil_client
+    await disease_batcher.stop()
+    # Flush queued image files / prediction logs before exiting
+    await write_behind.stop()
+    await prediction_sink.stop()
+    await async_engine.dispose()
+    await weather_client.aclose()
+    await soil_client.aclose()
+    get_inference_executor().shutdown()
+    password_hasher.shutdown()
+    shutdown_logging()
+
+
 # ─────────────────────────────────────────────
 # Root Endpoint
 # ─────────────────────────────────────────────
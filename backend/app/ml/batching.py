@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Hashable, List, Optional, Sequence
+
+from app.core.loops import rebind_loop
+from app.ml.scheduler import FairQueue
+
+logger = logging.getLogger("agromind")
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class BatchStats:
+    """
+    Running counters for a MicroBatcher (batch sizes and queue waits).
+    """
+
+    def __init__(self):
+        self.batches = 0
+        self.requests = 0
+        self.errors = 0
+        self.max_batch_size = 0
+        self.queue_wait_ms_total = 0.0
+        self.queue_wait_ms_max = 0.0
+        self.batch_size_histogram = {b: 0 for b in BATCH_SIZE_BUCKETS}
+        self.batch_size_histogram["+Inf"] = 0
+
+    def record(self, batch_size: int, waits_ms: Sequence[float]):
+        self.batches += 1
+        self.requests += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.queue_wait_ms_total += sum(waits_ms)
+        self.queue_wait_ms_max = max(self.queue_wait_ms_max, max(waits_ms))
+        for bucket in BATCH_SIZE_BUCKETS:
+            if batch_size <= bucket:
+                self.batch_size_histogram[bucket] += 1
+                break
+        else:
+            self.batch_size_histogram["+Inf"] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "batch_size_histogram": {str(k): v for k, v in self.batch_size_histogram.items()},
+            "avg_queue_wait_ms": round(self.queue_wait_ms_total / self.requests, 3) if self.requests else 0.0,
+            "max_queue_wait_ms": round(self.queue_wait_ms_max, 3),
+        }
+
+
+class MicroBatcher:
+    """
+    Gathers concurrent requests into a single batched call.
+
+    Callers `await submit(item)` and get back their own row of the result.
+    The worker task collects up to `max_batch_size` items, waiting at most
+    `max_wait_ms` after the first one arrives, then runs
+    `predict_batch(items)` once. Plain functions run in the default
+    executor; coroutine functions are awaited directly. Up to
+    `max_concurrency` batches may be in flight at the same time.
+
+    `predict_batch` must return a sequence with one result per item. An
+    Exception instance in place of a result fails only that caller;
+    raising fails the whole batch.
+
+    By default requests are batched first come, first served. Pass
+    `queue_factory` returning a FairQueue to batch by priority class and
+    tenant instead (`submit(item, priority, tenant)`); a full class raises
+    SchedulerFull from submit. A batch is only formed once a concurrency
+    slot is free, so late high-priority arrivals make the next batch.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        name: str = "batcher",
+        max_concurrency: int = 1,
+        queue_factory: Callable[[], Any] = asyncio.Queue,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.name = name
+        self.queue_factory = queue_factory
+        self.stats = BatchStats()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: set = set()
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    async def submit(self, item: Any, priority: Optional[str] = None, tenant: Hashable = None) -> Any:
+        """
+        Queue one item and wait for its result (`priority` / `tenant`
+        only matter with a FairQueue).
+        """
+        loop = self._ensure_worker()
+        future = loop.create_future()
+        entry = (item, future, time.perf_counter())
+        if isinstance(self._queue, FairQueue):
+            self._queue.put_nowait(entry, priority, tenant)
+        else:
+            self._queue.put_nowait(entry)
+        return await future
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def metrics(self) -> dict:
+        data = self.stats.as_dict()
+        data.update({
+            "name": self.name,
+            "max_batch_size_config": self.max_batch_size,
+            "max_wait_ms_config": self.max_wait * 1000.0,
+            "queue_depth": self.queue_depth(),
+        })
+        if isinstance(self._queue, FairQueue):
+            data["classes"] = self._queue.metrics()
+        return data
+
+    async def stop(self):
+        """
+        Cancel the worker task. Pending callers receive CancelledError.
+        """
+        worker, self._worker = self._worker, None
+        if worker is not None and not worker.done():
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    def _ensure_worker(self) -> asyncio.AbstractEventLoop:
+        loop, moved = rebind_loop(self._loop)
+        if moved or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = self.queue_factory()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._in_flight = set()
+            self._worker = loop.create_task(self._run())
+        return loop
+
+    async def _collect(self) -> list:
+        first = await self._queue.get()
+        batch = [first]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            # Wait for a free slot before picking the batch, so whatever
+            # is most urgent by then goes next
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            # Drop callers that went away while queued
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                self._slots.release()
+                continue
+            task = self._loop.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._release)
+
+    def _release(self, task: asyncio.Task):
+        self._in_flight.discard(task)
+        self._slots.release()
+
+    async def _dispatch(self, batch: list):
+        started = time.perf_counter()
+        waits_ms = [(started - enqueued) * 1000 for _, _, enqueued in batch]
+        self.stats.record(len(batch), waits_ms)
+
+        items = [item for item, _, _ in batch]
+        try:
+            if asyncio.iscoroutinefunction(self.predict_batch):
+                results = await self.predict_batch(items)
+            else:
+                results = await self._loop.run_in_executor(None, self.predict_batch, items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name}: predict_batch returned {len(results)} rows for {len(items)} items"
+                )
+        except Exception as exc:
+            self.stats.errors += 1
+            logger.exception("%s batch of %d failed", self.name, len(items))
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                self.stats.errors += 1
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        logger.debug(
+            "%s batch size=%d predict_ms=%.2f max_wait_ms=%.2f",
+            self.name, len(items), (time.perf_counter() - started) * 1000, max(waits_ms),
+        )
@@ -0,0 +1,146 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("agromind")
+
+# (label, probability) pairs, best first
+Ranking = List[Tuple[str, float]]
+GridKey = Tuple[int, int, int, int]
+
+
+class QuantizedMemo:
+    """
+    LRU memo for crop rankings keyed on soil code + inputs snapped to a grid.
+
+    Requests whose temperature / humidity / rainfall fall in the same grid
+    cell (e.g. 0.5 °C, 1 %RH, 5 mm) share one cache entry. The model is
+    always evaluated at the snapped values, so a cached answer is exactly
+    what a fresh prediction for that cell would return.
+    """
+
+    def __init__(self, steps: Sequence[float] = (0.5, 1.0, 5.0), max_entries: int = 50_000):
+        if any(step <= 0 for step in steps):
+            raise ValueError("grid steps must be > 0")
+        self.steps = tuple(float(s) for s in steps)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[GridKey, Ranking]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, soil_code: int, temperature: float, humidity: float, rainfall: float):
+        """
+        Returns (key, snapped_values) for the grid cell containing the inputs.
+        """
+        cells = tuple(int(round(v / step)) for v, step in zip((temperature, humidity, rainfall), self.steps))
+        snapped = tuple(c * step for c, step in zip(cells, self.steps))
+        return (int(soil_code),) + cells, snapped
+
+    def snap(self, values: np.ndarray) -> np.ndarray:
+        """
+        Vectorized `quantize` values for an (n, 3) [temperature, humidity,
+        rainfall] matrix, so bulk scoring sees the same inputs as single lookups.
+        """
+        steps = np.asarray(self.steps)
+        return np.round(values / steps) * steps
+
+    def get(self, key: GridKey) -> Optional[Ranking]:
+        with self._lock:
+            ranking = self._entries.get(key)
+            if ranking is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ranking
+
+    def set(self, key: GridKey, ranking: Ranking):
+        with self._lock:
+            self._entries[key] = ranking
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "grid": dict(zip(("temperature", "humidity", "rainfall"), self.steps)),
+        }
+
+
+class CropLookupTable:
+    """
+    Dense precomputed top-k table over the full valid input range.
+
+    Stores class indices (uint8) and probabilities (float16) for every
+    (soil, temperature, humidity, rainfall) grid cell, so a lookup is a
+    single array index. Memory is n_soils * n_t * n_h * n_r * k * 3 bytes
+    (~184 MB for 5 soils, the default grid and k=CROP_TOP_K_MAX=5) —
+    opt-in only.
+    """
+
+    def __init__(self, memo: QuantizedMemo, n_soils: int, ranges: Sequence[Tuple[float, float]], k: int):
+        self.memo = memo
+        self.k = k
+        self.n_soils = n_soils
+        self.lows = [int(round(low / step)) for (low, _), step in zip(ranges, memo.steps)]
+        self.shape = tuple(
+            int(round(high / step)) - low + 1
+            for (_, high), step, low in zip(ranges, memo.steps, self.lows)
+        )
+        self.classes: Optional[np.ndarray] = None
+        self.version: Optional[str] = None  # model version the table was built from
+        self._idx: Optional[np.ndarray] = None
+        self._proba: Optional[np.ndarray] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._idx is not None
+
+    def build(self, classes: Sequence[str], proba_fn: Callable[[np.ndarray], np.ndarray]):
+        """
+        Fill the table. `proba_fn(features)` must return predict_proba output
+        for an (n, 4) feature matrix, columns ordered like `classes`.
+        """
+        n_t, n_h, n_r = self.shape
+        idx = np.empty((self.n_soils, n_t, n_h, n_r, self.k), dtype=np.uint8)
+        proba = np.empty(idx.shape, dtype=np.float16)
+        step_t, step_h, step_r = self.memo.steps
+        hh, rr = np.meshgrid(
+            (np.arange(n_h) + self.lows[1]) * step_h,
+            (np.arange(n_r) + self.lows[2]) * step_r,
+            indexing="ij",
+        )
+        for soil in range(self.n_soils):
+            for ti in range(n_t):
+                features = np.column_stack([
+                    np.full(hh.size, soil), np.full(hh.size, (ti + self.lows[0]) * step_t),
+                    hh.ravel(), rr.ravel(),
+                ])
+                p = proba_fn(features)
+                top = np.argsort(-p, axis=1)[:, :self.k]
+                idx[soil, ti] = top.reshape(n_h, n_r, self.k)
+                proba[soil, ti] = np.take_along_axis(p, top, axis=1).reshape(n_h, n_r, self.k)
+        self.classes = np.asarray(classes)
+        self._idx, self._proba = idx, proba
+        logger.info("crop lookup table built: shape=%s (%.1f MB)", idx.shape, (idx.nbytes + proba.nbytes) / 2**20)
+
+    def lookup(self, key: GridKey) -> Optional[Ranking]:
+        if not self.ready:
+            return None
+        soil, *cells = key
+        pos = [c - low for c, low in zip(cells, self.lows)]
+        if not (0 <= soil < self.n_soils) or any(not (0 <= p < n) for p, n in zip(pos, self.shape)):
+            return None
+        top = self._idx[(soil, *pos)]
+        probs = self._proba[(soil, *pos)]
+        return [(str(self.classes[i]), float(p)) for i, p in zip(top, probs)]
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.loops import rebind_loop
+from app.core.metrics import INFERENCE_STAGE_SECONDS, register_queue
+from app.ml.preprocessing import ImageDecodeError, preprocess_valid
+from app.ml.registry import ModelRegistry, model_registry
+
+logger = logging.getLogger("agromind")
+
+# ─────────────────────────────────────────────
+# Worker side (runs inside the pool processes)
+# ─────────────────────────────────────────────
+# Each worker has its own registry and follows the version the parent
+# sends with every task, so a hot reload in the parent propagates on the
+# next call without restarting the pool.
+_worker_registry = ModelRegistry(check_interval=float("inf"))
+
+# (name, path, version) as seen by the parent registry
+ModelSpec = Tuple[str, str, str]
+
+
+def _init_worker(specs: Sequence[ModelSpec]):
+    """
+    Pool initializer: preload every available model once per worker process.
+    """
+    for name, path, version in specs:
+        try:
+            _worker_registry.ensure(name, path, version)
+        except Exception as e:
+            logger.warning("inference worker could not load %s model from %s: %s", name, path, e)
+
+
+def _get_worker_model(spec: ModelSpec):
+    return _worker_registry.ensure(*spec)
+
+
+def _predict_images_from_shm(spec: ModelSpec, shm_name: str, spans: Sequence[tuple]) -> tuple:
+    """
+    Decode the images packed in shared memory block `shm_name` and
+    predict the decodable ones with one model.predict call.
+    Returns (labels of the good images, per-image errors, version, stage_seconds).
+    """
+    shm = SharedMemory(name=shm_name)
+    # The parent owns (and unlinks) the block; don't let this worker's
+    # resource tracker claim it too.
+    resource_tracker.unregister(shm._name, "shared_memory")
+    views = [shm.buf[start:end] for start, end in spans]
+    stages = {}
+    try:
+        batch, errors = preprocess_valid(views, timings=stages)
+    finally:
+        for view in views:
+            view.release()
+        shm.close()
+    loaded = _get_worker_model(spec)
+    labels = []
+    if len(batch):
+        started = time.perf_counter()
+        labels = loaded.model.predict(batch).tolist()
+        stages["predict"] = time.perf_counter() - started
+    return labels, errors, loaded.version, stages
+
+
+def _predict_features(spec: ModelSpec, features: np.ndarray) -> tuple:
+    loaded = _get_worker_model(spec)
+    return loaded.model.predict(features).tolist(), loaded.version
+
+
+def rank_with_model(model, features: np.ndarray, k: int) -> list:
+    """
+    Top-k (label, probability) pairs per row from predict_proba.
+    Models without predict_proba fall back to predict with probability 1.0.
+    """
+    if not hasattr(model, "predict_proba"):
+        return [[(label, 1.0)] for label in model.predict(features).tolist()]
+    proba = model.predict_proba(features)
+    top = np.argsort(-proba, axis=1)[:, :k]
+    classes = model.classes_
+    return [
+        [(classes[i].item() if hasattr(classes[i], "item") else classes[i], float(row[i])) for i in order]
+        for row, order in zip(proba, top)
+    ]
+
+
+def _rank_features(spec: ModelSpec, features: np.ndarray, k: int) -> tuple:
+    loaded = _get_worker_model(spec)
+    return rank_with_model(loaded.model, features, k), loaded.version
+
+
+# ─────────────────────────────────────────────
+# Parent side
+# ─────────────────────────────────────────────
+class InferenceExecutor:
+    """
+    Process pool that runs image decoding and model.predict off the event loop.
+
+    - every worker loads the models once (pool initializer) and reloads
+      only when the parent registry reports a new version
+    - image bytes are copied into a SharedMemory block; only its name and
+      the byte spans cross the process boundary
+    - `max_in_flight` bounds how many calls may be queued on the pool
+    - if a worker dies the pool is broken: calls in flight fail and the
+      next call starts a fresh pool
+
+    Every call returns `(result, model_version)`.
+    """
+
+    def __init__(self, registry: ModelRegistry, model_names: Sequence[str], max_workers: int = 2, max_in_flight: int = 64):
+        self.registry = registry
+        self.model_names = list(model_names)
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self.respawns = 0
+
+    def _spec(self, name: str) -> ModelSpec:
+        info = self.registry.info(name)
+        if info is None:
+            raise RuntimeError(f"{name} model not loaded")
+        return (name, info.path, info.version)
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            specs = [self._spec(name) for name in self.model_names if self.registry.available(name)]
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                # spawn: never fork a process that already runs event loop threads
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(specs,),
+            )
+        return self._pool
+
+    def _ensure_slots(self) -> asyncio.Semaphore:
+        loop, moved = rebind_loop(self._loop)
+        if moved:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        return self._slots
+
+    async def _submit(self, fn, *args):
+        async with self._ensure_slots():
+            self._in_flight += 1
+            pool = self._ensure_pool()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+            except BrokenProcessPool:
+                # a worker died (e.g. OOM); requests in flight on it fail,
+                # the next call spawns a fresh pool
+                self._discard_pool(pool)
+                raise
+            finally:
+                self._in_flight -= 1
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        if self._pool is not pool:
+            return  # another caller already replaced it
+        logger.error("inference process pool broke; respawning on next request")
+        self._pool = None
+        self.respawns += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def predict_images(self, images: List[bytes], name: str = "disease") -> tuple:
+        """
+        Decode + predict a batch of encoded images. Returns (labels, model_version);
+        an image that could not be decoded gets an ImageDecodeError in place
+        of its label, so it does not fail the rest of the batch.
+        """
+        spec = self._spec(name)
+        total = sum(len(img) for img in images)
+        shm = SharedMemory(create=True, size=max(total, 1))
+        try:
+            spans = []
+            offset = 0
+            for img in images:
+                shm.buf[offset:offset + len(img)] = img
+                spans.append((offset, offset + len(img)))
+                offset += len(img)
+            good, errors, version, stages = await self._submit(_predict_images_from_shm, spec, shm.name, spans)
+        finally:
+            shm.close()
+            shm.unlink()
+        # Stage timings come back from the worker and are recorded here, so
+        # they land in this (gunicorn worker) process's metrics
+        for stage, seconds in stages.items():
+            INFERENCE_STAGE_SECONDS.labels(name, stage).observe(seconds)
+        good = iter(good)
+        labels = [next(good) if error is None else ImageDecodeError(error) for error in errors]
+        return labels, version
+
+    async def predict_features(self, name: str, features: np.ndarray) -> tuple:
+        """
+        Predict a small tabular feature matrix (e.g. crop inputs) with model `name`.
+        Returns (labels, model_version).
+        """
+        return await self._submit(_predict_features, self._spec(name), features)
+
+    async def rank_features(self, name: str, features: np.ndarray, k: int) -> tuple:
+        """
+        Top-k (label, probability) pairs per row of `features` with model `name`.
+        Returns (rankings, model_version).
+        """
+        return await self._submit(_rank_features, self._spec(name), features, k)
+
+    def metrics(self) -> dict:
+        return {
+            "pool_size": self.max_workers,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "started": self._pool is not None,
+            "respawns": self.respawns,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+_executor: Optional[InferenceExecutor] = None
+register_queue("inference_in_flight", lambda: _executor._in_flight if _executor is not None else 0)
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """
+    Process-wide executor over the shared model registry, sized from Settings.
+    """
+    global _executor
+    if _executor is None:
+        from app.core.config import settings
+
+        _executor = InferenceExecutor(
+            model_registry,
+            ["disease", "crop"],
+            max_workers=settings.INFERENCE_POOL_SIZE,
+            max_in_flight=settings.INFERENCE_MAX_IN_FLIGHT,
+        )
+    return _executor
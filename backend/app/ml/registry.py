@@ -0,0 +1,283 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import joblib
+
+from app.core.metrics import register_model_versions
+
+logger = logging.getLogger("agromind")
+
+
+class ModelInfo:
+    """
+    Identity of a model file on disk (no weights loaded).
+    """
+
+    def __init__(self, name: str, path: str, checksum: str, size: int, mtime: float):
+        self.name = name
+        self.path = path
+        self.checksum = checksum
+        self.version = checksum[:12]
+        self.size = size
+        self.mtime = mtime
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "path": self.path,
+            "version": self.version,
+            "checksum": self.checksum,
+            "size": self.size,
+            "mtime": self.mtime,
+        }
+
+
+class LoadedModel:
+    def __init__(self, info: ModelInfo, model):
+        self.info = info
+        self.model = model
+        self.loaded_at = time.time()
+
+    @property
+    def version(self) -> str:
+        return self.info.version
+
+
+def file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _stat(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    # An empty file is a placeholder, not a model
+    return (st.st_size, st.st_mtime) if st.st_size > 0 else None
+
+
+class ModelRegistry:
+    """
+    Lazy, versioned model store.
+
+    - `info(name)` identifies the file (sha256 checksum -> version) without
+      loading weights; it re-stats the file at most every `check_interval`
+      seconds, so a model deployed with an atomic rename is picked up by
+      every worker process without a restart. Called on an event loop it
+      never hashes inline: a changed file is hashed in a thread and the
+      previous info (None for a file never hashed) is served meanwhile;
+      `refresh()` hashes up front (run it off the loop at startup).
+    - `get(name)` loads the weights on first use with
+      joblib.load(mmap_mode="r"): numpy arrays of uncompressed dumps are
+      memory-mapped, so all workers share one page-cache copy.
+    - reloads build the new LoadedModel first and then swap a single
+      reference, so in-flight requests finish on the model they started
+      with and nothing is dropped.
+    """
+
+    def __init__(self, mmap_mode: Optional[str] = "r", check_interval: float = 5.0):
+        self.mmap_mode = mmap_mode
+        self.check_interval = check_interval
+        self._paths: Dict[str, str] = {}
+        self._info: Dict[str, ModelInfo] = {}
+        self._loaded: Dict[str, LoadedModel] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._hashing: Dict[str, tuple] = {}  # name -> stat being hashed in a thread
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[ModelInfo], None]] = []
+
+    # -------------------------
+    # Registration
+    # -------------------------
+    def register(self, name: str, path: str):
+        with self._lock:
+            if self._paths.get(name) != path:
+                self._paths[name] = path
+                self._info.pop(name, None)
+                self._checked_at.pop(name, None)
+
+    def add_reload_listener(self, fn: Callable[[ModelInfo], None]):
+        """
+        `fn(info)` is called after a model version changes.
+        """
+        self._listeners.append(fn)
+
+    # -------------------------
+    # Lookup
+    # -------------------------
+    def info(self, name: str) -> Optional[ModelInfo]:
+        """
+        Current ModelInfo for `name`, or None if its file is missing/empty.
+        """
+        now = time.monotonic()
+        current = self._info.get(name)
+        if current is not None and now - self._checked_at.get(name, 0.0) < self.check_interval:
+            return current
+
+        with self._lock:
+            path = self._paths.get(name)
+            if path is None:
+                raise KeyError(f"model {name!r} is not registered")
+            self._checked_at[name] = now
+            stat = _stat(path)
+            current = self._info.get(name)
+            if stat is None:
+                self._info.pop(name, None)
+                return None
+            if current is not None and (current.size, current.mtime) == stat:
+                return current
+            if _on_event_loop():
+                self._hash_in_background(name, path, stat)
+                return current
+        return self._store(name, ModelInfo(name, path, file_checksum(path), *stat))
+
+    def refresh(self, name: Optional[str] = None) -> Optional[ModelInfo]:
+        """
+        Re-stat (and if changed, re-hash) `name`, or every model, now.
+        Blocking: call it from a thread, not the event loop.
+        """
+        names = [name] if name is not None else list(self._paths)
+        info = None
+        for model in names:
+            with self._lock:
+                if model not in self._paths:
+                    raise KeyError(f"model {model!r} is not registered")
+                self._checked_at.pop(model, None)
+            info = self.info(model)
+        return info
+
+    def available(self, name: str) -> bool:
+        return self.info(name) is not None
+
+    def version(self, name: str) -> str:
+        info = self.info(name)
+        return info.version if info is not None else "unloaded"
+
+    def get(self, name: str) -> LoadedModel:
+        """
+        Loaded model for the current version of `name` (lazy).
+        """
+        info = self.info(name)
+        if info is None:
+            raise RuntimeError(f"{name} model not loaded")
+        loaded = self._loaded.get(name)
+        if loaded is not None and loaded.info.checksum == info.checksum:
+            return loaded
+        with self._lock:
+            loaded = self._loaded.get(name)
+            if loaded is None or loaded.info.checksum != info.checksum:
+                loaded = self._load(info)
+                self._loaded[name] = loaded
+            return loaded
+
+    def ensure(self, name: str, path: str, version: str) -> LoadedModel:
+        """
+        Return `name` at `version`, (re)loading from `path` when the loaded
+        copy differs. Used by pool workers that follow the parent's version.
+        """
+        loaded = self._loaded.get(name)
+        if loaded is not None and loaded.version == version:
+            return loaded
+        self.register(name, path)
+        with self._lock:
+            self._checked_at.pop(name, None)
+        return self.get(name)
+
+    def reload(self, name: str) -> Optional[ModelInfo]:
+        """
+        Force a re-read of `name` from its registered path and swap it in.
+        """
+        with self._lock:
+            self._checked_at.pop(name, None)
+            previous = self._info.pop(name, None)
+        info = self.info(name)
+        if info is None:
+            return None
+        loaded = self._load(info)
+        with self._lock:
+            self._loaded[name] = loaded
+        if previous is None or previous.checksum != info.checksum:
+            self._notify(info)
+        return info
+
+    def versions(self) -> dict:
+        out = {}
+        for name in list(self._paths):
+            info = self.info(name)
+            out[name] = {
+                **(info.as_dict() if info else {"path": self._paths[name], "version": "unloaded"}),
+                "loaded": name in self._loaded and info is not None
+                and self._loaded[name].info.checksum == info.checksum,
+            }
+        return out
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    def _load(self, info: ModelInfo) -> LoadedModel:
+        started = time.perf_counter()
+        model = joblib.load(info.path, mmap_mode=self.mmap_mode)
+        logger.info(
+            "loaded %s model version=%s from %s in %.1f ms",
+            info.name, info.version, info.path, (time.perf_counter() - started) * 1000,
+        )
+        return LoadedModel(info, model)
+
+    def _store(self, name: str, new: ModelInfo) -> ModelInfo:
+        with self._lock:
+            if self._paths.get(name) != new.path:
+                return new  # re-registered meanwhile
+            current = self._info.get(name)
+            self._info[name] = new
+        if current is not None and current.checksum != new.checksum:
+            logger.info("model %s changed on disk: %s -> %s", name, current.version, new.version)
+            self._notify(new)
+        return new
+
+    def _hash_in_background(self, name: str, path: str, stat: tuple):
+        # caller holds the lock
+        if self._hashing.get(name) == stat:
+            return
+        self._hashing[name] = stat
+
+        def run():
+            try:
+                self._store(name, ModelInfo(name, path, file_checksum(path), *stat))
+            except Exception:
+                logger.exception("could not hash %s model at %s", name, path)
+            finally:
+                with self._lock:
+                    if self._hashing.get(name) == stat:
+                        del self._hashing[name]
+
+        threading.Thread(target=run, name=f"hash-{name}", daemon=True).start()
+
+    def _notify(self, info: ModelInfo):
+        for fn in self._listeners:
+            try:
+                fn(info)
+            except Exception:
+                logger.exception("model reload listener failed for %s", info.name)
+
+
+# Process-wide registry used by the API process (models are registered by
+# app.models.ml_model / ml_crop_model from Settings)
+model_registry = ModelRegistry()
+register_model_versions(lambda: {name: v["version"] for name, v in model_registry.versions().items()})
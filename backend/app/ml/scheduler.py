@@ -0,0 +1,207 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from app.core.metrics import INFERENCE_QUEUE_WAIT_SECONDS
+
+# Priority classes, most latency-sensitive first
+INTERACTIVE, DEVICE, BULK = "interactive", "device", "bulk"
+PRIORITY_CLASSES = (INTERACTIVE, DEVICE, BULK)
+
+# Recent waits kept per class for the percentile metrics
+WAIT_SAMPLE_SIZE = 1024
+
+
+class SchedulerFull(Exception):
+    """
+    A priority class is at its queue limit.
+    """
+
+    def __init__(self, priority: str):
+        super().__init__(f"{priority} inference queue is full")
+        self.priority = priority
+
+
+class WaitStats:
+    """
+    Queue-wait counters for one priority class.
+    """
+
+    def __init__(self):
+        self.dequeued = 0
+        self.rejected = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.recent: Deque[float] = deque(maxlen=WAIT_SAMPLE_SIZE)
+
+    def record(self, wait_ms: float):
+        self.dequeued += 1
+        self.wait_ms_total += wait_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        self.recent.append(wait_ms)
+
+    def percentile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def as_dict(self) -> dict:
+        return {
+            "dequeued": self.dequeued,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_ms_total / self.dequeued, 3) if self.dequeued else 0.0,
+            "p50_wait_ms": round(self.percentile(0.50), 3),
+            "p95_wait_ms": round(self.percentile(0.95), 3),
+            "max_wait_ms": round(self.wait_ms_max, 3),
+        }
+
+
+class _ClassQueue:
+    def __init__(self, weight: float, limit: int):
+        if weight <= 0:
+            raise ValueError("class weights must be > 0")
+        self.weight = weight
+        self.limit = limit
+        self.size = 0
+        self.pass_ = 0.0  # virtual finish time of the last item served
+        self.tenants: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self.stats = WaitStats()
+
+
+class FairQueue:
+    """
+    Weighted fair queue between priority classes, round-robin between
+    tenants inside a class.
+
+    - classes are served by stride scheduling: each dequeue advances the
+      class's virtual time by 1 / weight and the non-empty class with the
+      smallest virtual time goes next, so under contention class shares
+      follow the weights and an idle class's share goes to the others
+    - a class that was idle restarts at the current virtual time (no
+      credit is saved up while idle)
+    - within a class each tenant (user / device) gets one item per round,
+      so one device's burst does not delay another device
+    - `limits[class]` bounds each class; put_nowait raises SchedulerFull
+
+    Exposes the subset of asyncio.Queue a MicroBatcher uses. With
+    name=None no wait metrics are recorded (see fair_pick).
+    """
+
+    def __init__(
+        self,
+        weights: Dict[str, float],
+        limits: Optional[Dict[str, int]] = None,
+        default_class: str = INTERACTIVE,
+        name: Optional[str] = "inference",
+    ):
+        limits = limits or {}
+        self._classes = {cls: _ClassQueue(weight, limits.get(cls, 0)) for cls, weight in weights.items()}
+        if default_class not in self._classes:
+            raise ValueError(f"default class {default_class!r} has no weight")
+        self.default_class = default_class
+        self.name = name
+        self._size = 0
+        self._vtime = 0.0
+        self._getters: Deque[asyncio.Future] = deque()
+
+    # -------------------------
+    # asyncio.Queue subset
+    # -------------------------
+    def put_nowait(self, entry: Any, priority: Optional[str] = None, tenant: Hashable = None):
+        priority = priority or self.default_class
+        queue = self._classes.get(priority)
+        if queue is None:
+            raise ValueError(f"unknown priority class {priority!r}")
+        if queue.limit and queue.size >= queue.limit:
+            queue.stats.rejected += 1
+            raise SchedulerFull(priority)
+        if queue.size == 0:
+            queue.pass_ = max(queue.pass_, self._vtime)
+        items = queue.tenants.get(tenant)
+        if items is None:
+            items = queue.tenants[tenant] = deque()
+        items.append((entry, time.perf_counter()))
+        queue.size += 1
+        self._size += 1
+        self._wake_next()
+
+    def get_nowait(self) -> Any:
+        if self._size == 0:
+            raise asyncio.QueueEmpty
+        priority, queue = min(
+            ((cls, q) for cls, q in self._classes.items() if q.size),
+            key=lambda pair: pair[1].pass_,
+        )
+        tenant, items = next(iter(queue.tenants.items()))
+        entry, enqueued = items.popleft()
+        if items:
+            queue.tenants.move_to_end(tenant)
+        else:
+            del queue.tenants[tenant]
+        queue.size -= 1
+        self._size -= 1
+        self._vtime = queue.pass_
+        queue.pass_ += 1.0 / queue.weight
+
+        if self.name is not None:
+            wait = time.perf_counter() - enqueued
+            queue.stats.record(wait * 1000)
+            INFERENCE_QUEUE_WAIT_SECONDS.labels(self.name, priority).observe(wait)
+        return entry
+
+    async def get(self) -> Any:
+        while self._size == 0:
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except BaseException:
+                getter.cancel()
+                if self._size and not getter.cancelled():
+                    self._wake_next()
+                raise
+        return self.get_nowait()
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def qsize(self) -> int:
+        return self._size
+
+    # -------------------------
+    # Introspection
+    # -------------------------
+    def depth(self, priority: str) -> int:
+        return self._classes[priority].size
+
+    def metrics(self) -> dict:
+        return {
+            cls: {
+                "weight": queue.weight,
+                "queue_limit": queue.limit,
+                "queue_depth": queue.size,
+                "tenants": len(queue.tenants),
+                **queue.stats.as_dict(),
+            }
+            for cls, queue in self._classes.items()
+        }
+
+    def _wake_next(self):
+        while self._getters:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+                break
+
+
+def fair_pick(candidates: Iterable[Tuple[str, Hashable, Any]], weights: Dict[str, float], n: int) -> List[Any]:
+    """
+    The first `n` values FairQueue would serve from (priority, tenant, value)
+    candidates given in arrival order; unknown classes count as the lowest weight.
+    """
+    queue = FairQueue(weights, default_class=min(weights, key=weights.get), name=None)
+    for priority, tenant, value in candidates:
+        queue.put_nowait(value, priority if priority in weights else None, tenant)
+    return [queue.get_nowait() for _ in range(min(n, queue.qsize()))]
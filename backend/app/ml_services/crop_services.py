@@ -0,0 +1,218 @@
+# backend/app/ml_services/crop_services.py
+"""
+Thin async wrapper around the crop recommendation model used by the API routes.
+"""
+import csv
+import json
+from typing import AsyncIterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.metrics import register_cache
+from app.models import ml_crop_model
+from app.services.prediction_log_service import prediction_sink
+from app.services.utils import validate_crop_inputs_batch
+
+CROP_COLUMNS = ["soil_type", "temperature", "humidity", "rainfall"]
+
+BATCH_FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+register_cache("crop_memo", ml_crop_model.crop_memo.stats)
+
+
+async def recommend_crop_top_k(soil_type: str, temperature: float, humidity: float, rainfall: float, k: int) -> dict:
+    """
+    Ranked crops with probabilities, best first, plus the serving model version.
+    Raises ValueError on unknown soil type.
+    """
+    return await ml_crop_model.recommend_crop_top_k(soil_type, temperature, humidity, rainfall, k)
+
+
+def memo_metrics() -> dict:
+    """
+    Hit-rate stats of the quantized crop memo (+ lookup table state).
+    """
+    return {**ml_crop_model.crop_memo.stats(), "lookup_table_ready": ml_crop_model.crop_lut.ready}
+
+
+# ─────────────────────────────────────────────
+# Bulk scoring
+# ─────────────────────────────────────────────
+def detect_batch_format(content_type: Optional[str]) -> Optional[str]:
+    """
+    Map a Content-Type header to "json" / "ndjson" / "csv" (None if unsupported).
+    """
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+    return BATCH_FORMATS.get(media_type)
+
+
+async def _iter_lines(body: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    """
+    Lines of a streamed body; None for a line that is not valid UTF-8
+    (b"\n" never occurs inside a multi-byte sequence, so lines are split on bytes).
+    """
+    buffer = bytearray()
+    async for chunk in body:
+        scan = len(buffer)
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", scan)
+            if end < 0:
+                break
+            yield _decode_line(buffer, start, end)
+            start = scan = end + 1
+        del buffer[:start]
+    if buffer:
+        yield _decode_line(buffer, 0, len(buffer))
+
+
+def _decode_line(buffer: bytearray, start: int, end: int) -> Optional[str]:
+    try:
+        return buffer[start:end].decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError:
+        return None
+
+
+async def iter_record_frames(
+    body: AsyncIterator[bytes], fmt: str, chunk_size: int, max_json_bytes: int = 0
+) -> AsyncIterator[pd.DataFrame]:
+    """
+    Parse a JSON array, NDJSON or CSV body into DataFrames of at most
+    `chunk_size` rows. NDJSON/CSV are parsed incrementally as bytes arrive;
+    a JSON array is read whole, so it is refused past `max_json_bytes` (0 = no cap).
+    Rows that cannot be parsed carry a `_parse_error` column.
+    """
+    if fmt == "json":
+        raw = bytearray()
+        async for chunk in body:
+            raw += chunk
+            if max_json_bytes and len(raw) > max_json_bytes:
+                yield _to_frame([{"_parse_error": f"JSON body over {max_json_bytes} bytes; send NDJSON or CSV"}])
+                return
+        try:
+            records = json.loads(raw or b"[]")
+        except ValueError:
+            records = [{"_parse_error": "Invalid JSON body"}]
+        if not isinstance(records, list):
+            records = [{"_parse_error": "Expected a JSON array of rows"}]
+        for start in range(0, len(records), chunk_size):
+            yield _to_frame(records[start:start + chunk_size])
+        return
+
+    if fmt == "csv":
+        lines = _iter_lines(body)
+        header = None
+        async for line in lines:
+            if line is None:
+                yield _to_frame([{"_parse_error": "CSV header is not valid UTF-8"}])
+                return
+            if line.strip():
+                header = [h.strip().lower() for h in next(csv.reader([line]))]
+                break
+        pending: List[Optional[str]] = []
+        async for line in lines:
+            if line is None or line.strip():
+                pending.append(line)
+            if len(pending) >= chunk_size:
+                yield _csv_frame(header, pending)
+                pending = []
+        if pending:
+            yield _csv_frame(header, pending)
+        return
+
+    rows: List[dict] = []
+    async for line in _iter_lines(body):
+        if line is None:
+            rows.append({"_parse_error": "Invalid UTF-8"})
+        elif not line.strip():
+            continue
+        else:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                rows.append({"_parse_error": "Invalid JSON line"})
+        if len(rows) >= chunk_size:
+            yield _to_frame(rows)
+            rows = []
+    if rows:
+        yield _to_frame(rows)
+
+
+def _csv_frame(header: List[str], lines: List[Optional[str]]) -> pd.DataFrame:
+    records = []
+    for line in lines:
+        values = None if line is None else next(csv.reader([line]), [])
+        if values is None:
+            records.append({"_parse_error": "Invalid UTF-8"})
+        elif len(values) == len(header):
+            records.append(dict(zip(header, values)))
+        else:
+            records.append({"_parse_error": "Wrong number of CSV fields"})
+    return _to_frame(records)
+
+
+def _to_frame(records: list) -> pd.DataFrame:
+    records = [r if isinstance(r, dict) else {"_parse_error": "Row must be an object"} for r in records]
+    frame = pd.DataFrame.from_records(records)
+    for column in CROP_COLUMNS + ["_parse_error"]:
+        if column not in frame:
+            frame[column] = None
+    return frame
+
+
+async def score_frame(frame: pd.DataFrame) -> List[dict]:
+    """
+    Encode, validate and score one chunk with a single model call.
+    Returns one result dict per row, in order.
+    """
+    temperature = pd.to_numeric(frame["temperature"], errors="coerce").to_numpy(dtype=float)
+    humidity = pd.to_numeric(frame["humidity"], errors="coerce").to_numpy(dtype=float)
+    rainfall = pd.to_numeric(frame["rainfall"], errors="coerce").to_numpy(dtype=float)
+    soil_codes = ml_crop_model.encode_soil_types(frame["soil_type"].fillna("").astype(str).to_numpy())
+
+    errors = validate_crop_inputs_batch(temperature, humidity, rainfall)
+    errors[(soil_codes < 0) & (errors == "")] = "Invalid soil type"
+    parse_errors = frame["_parse_error"].to_numpy(dtype=object)
+    has_parse_error = pd.notna(parse_errors)
+    errors[has_parse_error] = parse_errors[has_parse_error]
+
+    valid = errors == ""
+    features = np.column_stack([soil_codes, temperature, humidity, rainfall])[valid]
+    labels, version = await ml_crop_model.recommend_crops_batch(features)
+    predictions = iter(labels)
+
+    return [
+        {"recommended_crop": str(next(predictions)), "model_version": version} if ok else {"error": err}
+        for ok, err in zip(valid, errors)
+    ]
+
+
+async def stream_batch_recommendations(
+    body: AsyncIterator[bytes], fmt: str, chunk_size: int, max_json_bytes: int = 0
+) -> AsyncIterator[str]:
+    """
+    NDJSON output: one line per input row
+    ({"row", "recommended_crop", "model_version"} or {"row", "error"})
+    followed by a {"summary": ...} line.
+    """
+    row = ok = 0
+    async for frame in iter_record_frames(body, fmt, chunk_size, max_json_bytes):
+        results = await score_frame(frame)
+        lines = []
+        for result in results:
+            ok += "recommended_crop" in result
+            lines.append(json.dumps({"row": row, **result}))
+            row += 1
+        yield "\n".join(lines) + "\n"
+    summary = {"rows": row, "ok": ok, "errors": row - ok}
+    # One log row per bulk request (per-row logs would flood the ring buffer)
+    prediction_sink.record("crop_batch", fmt, summary)
+    yield json.dumps({"summary": summary}) + "\n"
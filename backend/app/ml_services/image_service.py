@@ -0,0 +1,78 @@
+# backend/app/ml_services/image_service.py
+"""
+Thin async wrapper around the disease model used by the API routes.
+"""
+import asyncio
+from typing import Optional
+
+import requests
+
+from app.core.config import settings
+from app.core.metrics import register_cache
+from app.ml.executor import get_inference_executor
+from app.ml.scheduler import INTERACTIVE
+from app.ml_services.prediction_cache import PredictionCache, make_key
+from app.models import ml_model
+
+prediction_cache = PredictionCache(
+    max_entries=settings.PREDICTION_CACHE_SIZE,
+    redis_url=settings.REDIS_URL if settings.PREDICTION_CACHE_USE_REDIS else None,
+    redis_ttl_seconds=settings.PREDICTION_CACHE_REDIS_TTL_SECONDS,
+)
+register_cache("prediction", prediction_cache.stats)
+
+
+async def predict_from_bytes(
+    contents: bytes, digest: Optional[str] = None, priority: str = INTERACTIVE, tenant=None,
+) -> dict:
+    """
+    Predict disease for an uploaded image (`contents` may be a bytearray;
+    pass its sha256 `digest` if already computed). `priority` / `tenant`
+    place the request in the batcher's fair queue.
+    Identical bytes under the same model version are served from cache.
+    Returns: {"disease": <label>, "model_version": <str>, "cache_hit": <bool>}
+    """
+    if not ml_model.model_available():
+        raise RuntimeError("Disease model not loaded")
+
+    cached = await prediction_cache.get(make_key(contents, ml_model.model_version(), digest))
+    if cached is not None:
+        return {**cached, "cache_hit": True}
+
+    result = await ml_model.predict_disease_from_bytes(contents, priority, tenant)
+    # Key on the version that actually served it (a reload may have raced us)
+    await prediction_cache.set(make_key(contents, result["model_version"], digest), result)
+    return {**result, "cache_hit": False}
+
+
+async def predict_from_bytes_from_url(image_url: str, priority: str = INTERACTIVE, tenant=None) -> dict:
+    """
+    Download the image at `image_url` and predict disease.
+    Returns the same shape as predict_from_bytes.
+    """
+    if not ml_model.model_available():
+        raise RuntimeError("Disease model not loaded")
+    response = await asyncio.to_thread(requests.get, image_url, timeout=15)
+    response.raise_for_status()
+    return await predict_from_bytes(response.content, priority=priority, tenant=tenant)
+
+
+def batching_metrics() -> dict:
+    """
+    Batch-size and queue-wait counters of the disease micro-batcher.
+    """
+    return ml_model.disease_batcher.metrics()
+
+
+def executor_metrics() -> dict:
+    """
+    Pool size and in-flight count of the inference process pool.
+    """
+    return get_inference_executor().metrics()
+
+
+def cache_metrics() -> dict:
+    """
+    Hit/miss counters of the prediction cache.
+    """
+    return prediction_cache.stats()
@@ -0,0 +1,126 @@
+# backend/app/ml_services/prediction_cache.py
+"""
+Content-addressed cache for disease predictions.
+
+Key = sha256(image bytes) + model version, so re-uploads of the same
+photo (retries, forwards, client re-submits) skip decode and inference,
+and a model swap naturally invalidates every entry.
+
+Tier 1 is an in-process LRU bounded by entry count. Tier 2 is an
+optional Redis shared by all workers.
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger("agromind")
+
+
+def make_key(image_bytes: bytes, model_version: str, digest: Optional[str] = None) -> str:
+    """
+    `digest` skips re-hashing when the sha256 is already known (ingest_upload).
+    """
+    return f"{digest or hashlib.sha256(image_bytes).hexdigest()}:{model_version}"
+
+
+class PredictionCache:
+    """
+    Two-tier (LRU + optional Redis) prediction cache with hit/miss counters.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        redis_url: Optional[str] = None,
+        redis_ttl_seconds: int = 7 * 24 * 3600,
+        namespace: str = "agromind:pred:",
+    ):
+        self.max_entries = max_entries
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        if redis_url:
+            try:
+                import redis.asyncio as aioredis
+                self._redis = aioredis.from_url(redis_url)
+            except Exception as e:
+                logger.warning("prediction cache: redis tier disabled (%s)", e)
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
+    # -------------------------
+    # Local LRU
+    # -------------------------
+    def _get_local(self, key: str) -> Optional[dict]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value: dict):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    async def get(self, key: str) -> Optional[dict]:
+        value = self._get_local(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(self.namespace + key)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning("prediction cache: redis get failed: %s", e)
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self._set_local(key, value)
+                self.hits += 1
+                self.redis_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict):
+        self._set_local(key, value)
+        if self._redis is not None:
+            try:
+                await self._redis.set(self.namespace + key, json.dumps(value), ex=self.redis_ttl_seconds)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning("prediction cache: redis set failed: %s", e)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "redis_enabled": self._redis is not None,
+            "redis_errors": self.redis_errors,
+        }
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import declared_attr, relationship
 from datetime import datetime
 from app.services.database import Base
 from sqlalchemy.types import Float, JSON, Boolean
@@ -15,6 +15,9 @@ class User(Base):
 
     feedbacks = relationship("Feedback", back_populates="user")
 
+    # keyset pagination / exports walk (created_at, id)
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
+
 class Feedback(Base):
     __tablename__ = "feedback"
 
@@ -25,6 +28,8 @@ class Feedback(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="feedbacks")
+
+    __table_args__ = (Index("ix_feedback_created_at_id", "created_at", "id"),)
     
 class Farm(Base):
     __tablename__ = "farms"
@@ -33,7 +38,96 @@ class Farm(Base):
     name = Column(String)
     geojson = Column(JSON)
     area = Column(Float)
+    # soil grid cells the polygon covers ([[i, j], ...] at grid_degrees), rasterized once
+    grid_cells = Column(JSON)
+    grid_degrees = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Device(Base):
+    __tablename__ = "devices"
+
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(String(64), unique=True, index=True, nullable=False)
+    name = Column(String(120))
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    meta = Column(JSON)
+    # SHA-256 of the credential token; the token itself is only shown once
+    cred_token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    token_rotated_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Telemetry(Base):
+    __tablename__ = "telemetry"
+
+    id = Column(Integer, primary_key=True)
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
+    sensor = Column(String(64), nullable=False)
+    value = Column(Float, nullable=False)
+    unit = Column(String(16))
+    recorded_at = Column(DateTime, nullable=False)  # device clock (UTC), or receive time
+    received_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_telemetry_device_sensor_recorded", "device_id", "sensor", "recorded_at"),
+        Index("ix_telemetry_recorded_at", "recorded_at"),  # retention pruning
+    )
+
+class TelemetryRollupMixin:
+    """
+    Per (device, sensor, bucket) aggregates, maintained on ingest; avg = sum / count.
+    """
+    device_id = Column(Integer, primary_key=True)
+    sensor = Column(String(64), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False)
+    sum = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+
+    @declared_attr
+    def __table_args__(cls):
+        return (Index(f"ix_{cls.__tablename__}_bucket_start", "bucket_start"),)  # retention pruning
+
+class TelemetryRollup1m(TelemetryRollupMixin, Base):
+    __tablename__ = "telemetry_rollup_1m"
+
+class TelemetryRollup1h(TelemetryRollupMixin, Base):
+    __tablename__ = "telemetry_rollup_1h"
+
+class TelemetryRollup1d(TelemetryRollupMixin, Base):
+    __tablename__ = "telemetry_rollup_1d"
+
+class DeviceImage(Base):
+    __tablename__ = "device_images"
+
+    id = Column(Integer, primary_key=True)
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False, index=True)
+    image_url = Column(String(1024), nullable=False)
+    meta = Column(JSON)
+    captured_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class InferenceJob(Base):
+    __tablename__ = "inference_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, also the Celery task id
+    kind = Column(String(32), nullable=False)  # "disease"
+    status = Column(String(16), nullable=False, default="queued")  # queued / running / done / failed
+    priority = Column(String(16), nullable=False, default="interactive")  # interactive / device / bulk
+    tenant = Column(String(64))  # "user:<id>", "device:<id>" or "ip:<addr>"; fair share key
+    input_key = Column(String(512))  # storage key of the image
+    input_url = Column(String(1024))  # or a URL the worker downloads
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=True)
+    device_image_id = Column(Integer, ForeignKey("device_images.id"), nullable=True)
+    result = Column(JSON)
+    error = Column(String(500))
+    claim = Column(String(32))  # batch that picked the job up
     created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    # workers claim the oldest queued jobs of a kind
+    __table_args__ = (Index("ix_inference_jobs_kind_status_created_at", "kind", "status", "created_at"),)
 
 class MarketPrice(Base):
     __tablename__ = "market_prices"
@@ -62,7 +156,8 @@ class TokenBlocklist(Base):
     id = Column(Integer, primary_key=True, index=True)
     jti = Column(String(256), unique=True, index=True)   # JWT ID
     token_type = Column(String(50))                      # "access" or "refresh"
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, nullable=True)          # the token's own exp; row is moot after it
     revoked = Column(Boolean, default=True)
 
     def __repr__(self):
@@ -1,15 +1,25 @@
-import joblib
+from typing import Tuple
+
 import numpy as np
-import pandas as pd
 
-MODEL_PATH = "app/ml/crop_model.pkl"
+from app.core.config import settings
+from app.ml.crop_memo import CropLookupTable, QuantizedMemo
+from app.ml.executor import get_inference_executor
+from app.ml.registry import model_registry
+from app.services.utils import CROP_INPUT_RANGES
+
+# Weights are loaded lazily (and memory-mapped) by the registry / pool workers
+MODEL_NAME = "crop"
+model_registry.register(MODEL_NAME, settings.CROP_MODEL_PATH)
+
+
+def model_available() -> bool:
+    return model_registry.available(MODEL_NAME)
 
-try:
-    crop_model = joblib.load(MODEL_PATH)
-    print("✅ Crop recommendation model loaded successfully")
-except Exception as e:
-    crop_model = None
-    print(f"⚠️ Failed to load crop model: {e}")
+
+def model_version() -> str:
+    """Version (checksum prefix) of the crop model currently on disk"""
+    return model_registry.version(MODEL_NAME)
 
 # Soil encoding for categorical variable
 SOIL_MAP = {
@@ -20,20 +30,97 @@ SOIL_MAP = {
     "clay": 4
 }
 
-async def recommend_crop(soil_type: str, temperature: float, humidity: float, rainfall: float) -> str:
+# Sorted lookup arrays for vectorized SOIL_MAP encoding
+_SOIL_KEYS = np.array(sorted(SOIL_MAP))
+_SOIL_CODES = np.array([SOIL_MAP[k] for k in _SOIL_KEYS])
+
+
+def encode_soil_types(soil_types) -> np.ndarray:
+    """
+    Vectorized SOIL_MAP lookup (case/whitespace-insensitive).
+    Returns an int array with -1 for unknown soil types.
+    """
+    soil = np.char.lower(np.char.strip(np.asarray(soil_types, dtype=str)))
+    idx = np.searchsorted(_SOIL_KEYS, soil).clip(max=len(_SOIL_KEYS) - 1)
+    return np.where(_SOIL_KEYS[idx] == soil, _SOIL_CODES[idx], -1)
+
+
+# Nearby inputs (same soil, same grid cell, same model version) share one ranking
+crop_memo = QuantizedMemo(
+    steps=(settings.CROP_GRID_TEMPERATURE, settings.CROP_GRID_HUMIDITY, settings.CROP_GRID_RAINFALL),
+    max_entries=settings.CROP_MEMO_SIZE,
+)
+crop_lut = CropLookupTable(
+    crop_memo,
+    n_soils=len(SOIL_MAP),
+    ranges=[(low, high) for _, low, high, _ in CROP_INPUT_RANGES],
+    k=settings.CROP_TOP_K_MAX,
+)
+
+
+def build_crop_lut():
     """
-    Predict best crop using trained model.
-    - soil_type: categorical input (mapped to numeric)
-    - temperature, humidity, rainfall: continuous features
+    Precompute the dense top-k table (CROP_LUT_ENABLED). CPU heavy; run off the loop.
     """
-    if crop_model is None:
+    if not model_available():
+        return
+    loaded = model_registry.get(MODEL_NAME)
+    if not hasattr(loaded.model, "predict_proba"):
+        return
+    crop_lut.build([str(c) for c in loaded.model.classes_], loaded.model.predict_proba)
+    crop_lut.version = loaded.version
+
+
+def _on_model_reload(info):
+    # Rankings of the previous version are keyed by version and age out of
+    # the LRU; the dense table has to be rebuilt for the new weights.
+    if info.name == MODEL_NAME and settings.CROP_LUT_ENABLED:
+        build_crop_lut()
+
+
+model_registry.add_reload_listener(_on_model_reload)
+
+
+async def recommend_crop_top_k(soil_type: str, temperature: float, humidity: float, rainfall: float, k: int = 3) -> dict:
+    """
+    Top-k crops with class probabilities:
+    {"candidates": [{"crop": str, "probability": float}, ...], "model_version": str}.
+    Served from the lookup table / quantized memo when possible.
+    """
+    if not model_available():
         raise Exception("Model not loaded")
 
     soil_encoded = SOIL_MAP.get(soil_type.lower())
     if soil_encoded is None:
         raise ValueError(f"Invalid soil type: {soil_type}")
 
-    # Input vector for model prediction
-    features = np.array([[soil_encoded, temperature, humidity, rainfall]])
-    prediction = crop_model.predict(features)
-    return prediction[0]
+    k = max(1, min(k, settings.CROP_TOP_K_MAX))
+    version = model_version()
+    key, (t, h, r) = crop_memo.quantize(soil_encoded, temperature, humidity, rainfall)
+    ranking = crop_lut.lookup(key) if crop_lut.version == version else None
+    if ranking is None:
+        ranking = crop_memo.get((version, key))
+    if ranking is None:
+        features = np.array([[soil_encoded, t, h, r]])
+        rankings, version = await get_inference_executor().rank_features(MODEL_NAME, features, settings.CROP_TOP_K_MAX)
+        ranking = rankings[0]
+        crop_memo.set((version, key), ranking)
+    return {
+        "candidates": [{"crop": str(label), "probability": round(float(p), 4)} for label, p in ranking[:k]],
+        "model_version": version,
+    }
+
+
+async def recommend_crops_batch(features: np.ndarray) -> Tuple[list, str]:
+    """
+    Predict crops for an (n, 4) matrix of already encoded + validated rows
+    [soil_encoded, temperature, humidity, rainfall] with one predict call.
+    Inputs are snapped to the memo grid first, as /recommend does, so a row
+    gets the same crop from both endpoints. Returns (labels, model_version).
+    """
+    if not model_available():
+        raise Exception("Model not loaded")
+    if len(features) == 0:
+        return [], model_version()
+    features = np.column_stack([features[:, 0], crop_memo.snap(features[:, 1:])])
+    return await get_inference_executor().predict_features(MODEL_NAME, features)
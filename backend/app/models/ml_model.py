@@ -1,35 +1,69 @@
-import joblib
-from PIL import Image
-import numpy as np
+import asyncio
 import requests
-from io import BytesIO
 
-# Load model once at startup
-MODEL_PATH = "app/ml/model.pkl"
+from app.core.config import settings
+from app.core.metrics import register_queue
+from app.ml.batching import MicroBatcher
+from app.ml.executor import get_inference_executor
+from app.ml.registry import model_registry
+from app.ml.scheduler import FairQueue, INTERACTIVE
 
-try:
-    model = joblib.load(MODEL_PATH)
-except Exception as e:
-    model = None
-    print(f"⚠️ Model not loaded: {e}")
+# Weights are loaded lazily (and memory-mapped) by the registry / pool workers
+MODEL_NAME = "disease"
+model_registry.check_interval = settings.MODEL_CHECK_INTERVAL_SECONDS
+model_registry.register(MODEL_NAME, settings.MODEL_PATH)
 
-async def predict_disease_from_file(file):
+
+def model_available() -> bool:
+    return model_registry.available(MODEL_NAME)
+
+
+def model_version() -> str:
+    """Version (checksum prefix) of the disease model currently on disk"""
+    return model_registry.version(MODEL_NAME)
+
+
+async def _predict_batch(images):
+    """Decode + predict all queued images in one call on the process pool"""
+    labels, version = await get_inference_executor().predict_images(images, name=MODEL_NAME)
+    # undecodable images come back as exceptions and fail only their own request
+    return [
+        label if isinstance(label, Exception) else {"disease": str(label), "model_version": version}
+        for label in labels
+    ]
+
+
+def _disease_queue() -> FairQueue:
+    return FairQueue(settings.INFERENCE_CLASS_WEIGHTS, settings.INFERENCE_CLASS_QUEUE_LIMITS, name="disease")
+
+
+# Concurrent requests share one model.predict call; batches are filled
+# by priority class and tenant, not arrival order
+disease_batcher = MicroBatcher(
+    _predict_batch,
+    max_batch_size=settings.DISEASE_BATCH_MAX_SIZE,
+    max_wait_ms=settings.DISEASE_BATCH_MAX_WAIT_MS,
+    name="disease",
+    max_concurrency=settings.INFERENCE_POOL_SIZE,
+    queue_factory=_disease_queue,
+)
+register_queue("disease_batcher", disease_batcher.queue_depth)
+
+
+async def predict_disease_from_bytes(contents: bytes, priority: str = INTERACTIVE, tenant=None) -> dict:
+    """Predict disease from raw image bytes -> {"disease", "model_version"}"""
+    if not model_available():
+        raise RuntimeError("Disease model not loaded")
+    return await disease_batcher.submit(contents, priority, tenant)
+
+
+async def predict_disease_from_file(file) -> dict:
     """Predict disease from uploaded image"""
-    if model is None:
-        return "Model not loaded"
-    img = Image.open(file.file).resize((128, 128))
-    arr = np.array(img) / 255.0
-    arr = arr.reshape(1, -1)
-    result = model.predict(arr)[0]
-    return result
-
-async def predict_disease_from_url(image_url: str):
+    return await predict_disease_from_bytes(file.file.read())
+
+
+async def predict_disease_from_url(image_url: str) -> dict:
     """Predict disease from image URL"""
-    if model is None:
-        return "Model not loaded"
-    response = requests.get(image_url)
-    img = Image.open(BytesIO(response.content)).resize((128, 128))
-    arr = np.array(img) / 255.0
-    arr = arr.reshape(1, -1)
-    result = model.predict(arr)[0]
-    return result
+    response = await asyncio.to_thread(requests.get, image_url, timeout=15)
+    response.raise_for_status()
+    return await predict_disease_from_bytes(response.content)
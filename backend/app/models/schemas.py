@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+from app.core.config import settings
 
 # ─────────────────────────────────────────────
 # Base Schemas — common shared properties
@@ -70,12 +71,88 @@ class FeedbackOut(FeedbackBase, TimestampMixin):
         orm_mode = True
 
 
+# ─────────────────────────────────────────────
+# Device Schemas
+# ─────────────────────────────────────────────
+
+class DeviceCreate(BaseModel):
+    device_id: str = Field(..., min_length=1, max_length=64)
+    name: Optional[str] = None
+    owner_id: Optional[int] = None
+    meta: Optional[dict] = None
+
+
+class DeviceOut(TimestampMixin):
+    id: int
+    device_id: str
+    name: Optional[str] = None
+    owner_id: Optional[int] = None
+    meta: Optional[dict] = None
+
+    class Config:
+        orm_mode = True
+
+
+class DeviceCredentials(DeviceOut):
+    cred_token: str  # returned once, at registration / rotation
+
+
+# ─────────────────────────────────────────────
+# Farm Schemas
+# ─────────────────────────────────────────────
+
+class FarmCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=128)
+    geojson: dict = Field(..., description="GeoJSON Polygon / MultiPolygon (or a Feature of one), [lon, lat]")
+    area: Optional[float] = Field(None, ge=0)
+
+
+class FarmOut(TimestampMixin):
+    id: int
+    name: str
+    geojson: dict
+    area: Optional[float] = None
+    soil_cells: Optional[int] = None  # grid cells being prefetched
+
+    class Config:
+        orm_mode = True
+
+
+# ─────────────────────────────────────────────
+# IoT Schemas
+# ─────────────────────────────────────────────
+
+class TelemetryCreate(BaseModel):
+    sensor: str = Field(..., min_length=1, max_length=64)
+    value: float
+    unit: Optional[str] = Field(None, max_length=16)
+    ts: Optional[datetime] = Field(None, description="Reading time (UTC); defaults to receive time")
+
+
+class DeviceImageCreate(BaseModel):
+    image_url: str = Field(..., max_length=1024)
+    key: Optional[str] = Field(None, max_length=512)  # storage key from /iot/upload_url
+    captured_at: Optional[datetime] = None
+    meta: Optional[dict] = None
+
+
 # ─────────────────────────────────────────────
 # Disease Prediction Schemas
 # ─────────────────────────────────────────────
 
 class DiseasePredictionResponse(BaseModel):
     prediction: str
+    model_version: Optional[str] = None
+
+
+class InferenceJobOut(TimestampMixin):
+    id: str
+    kind: str
+    status: str
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 
 class DiseaseURLRequest(BaseModel):
@@ -91,7 +168,15 @@ class CropRecommendRequest(BaseModel):
     temperature: float
     humidity: float
     rainfall: float
+    top_k: Optional[int] = Field(None, ge=1, le=settings.CROP_TOP_K_MAX, description="Number of ranked crops to return")
+
+
+class CropCandidate(BaseModel):
+    crop: str
+    probability: float
 
 
 class CropRecommendResponse(BaseModel):
     recommended_crop: str
+    candidates: List[CropCandidate] = []
+    model_version: Optional[str] = None
@@ -0,0 +1,270 @@
+# backend/app/services/IOT_services.py
+"""
+Device telemetry and image ingestion.
+
+`process_telemetry` / `process_device_image` store one record per call.
+Gateways use `ingest_telemetry_stream`: a JSON array or NDJSON body is
+parsed as it arrives, each reading is checked with plain type tests (no
+per-record model objects), and valid readings are bulk-inserted
+TELEMETRY_BATCH_CHUNK_SIZE at a time (with their rollups, see
+telemetry_store). The insert of one chunk runs in a thread while the
+next chunk is parsed. Bodies are capped in total bytes and NDJSON line
+length (TelemetryTooLarge, 413).
+"""
+import asyncio
+import json
+import logging
+import math
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.db_models import Device, DeviceImage, Telemetry
+from app.services.database import SessionLocal
+from app.services.telemetry_store import apply_rollups, utc_naive
+
+logger = logging.getLogger("agromind")
+
+TELEMETRY_FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+SENSOR_MAX_LENGTH = 64
+UNIT_MAX_LENGTH = 16
+
+
+# ─────────────────────────────────────────────
+# Single records
+# ─────────────────────────────────────────────
+def process_telemetry(payload: dict, db: Session, device: Device) -> Telemetry:
+    ts = payload.get("ts")
+    record = Telemetry(
+        device_id=device.id,
+        sensor=payload["sensor"],
+        value=payload["value"],
+        unit=payload.get("unit"),
+        recorded_at=utc_naive(ts) if ts else datetime.utcnow(),
+    )
+    db.add(record)
+    db.flush()
+    apply_rollups(db.connection(), [{
+        "device_id": record.device_id, "sensor": record.sensor,
+        "value": record.value, "recorded_at": record.recorded_at,
+    }])
+    db.commit()
+    db.refresh(record)
+    return record
+
+
+def process_device_image(payload: dict, db: Session, device: Device) -> DeviceImage:
+    captured_at = payload.get("captured_at")
+    record = DeviceImage(
+        device_id=device.id,
+        image_url=payload["image_url"],
+        meta=payload.get("meta"),
+        captured_at=utc_naive(captured_at) if captured_at else None,
+    )
+    db.add(record)
+    db.commit()
+    db.refresh(record)
+    return record
+
+
+# ─────────────────────────────────────────────
+# Batch ingestion
+# ─────────────────────────────────────────────
+def detect_telemetry_format(content_type: Optional[str]) -> Optional[str]:
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+    return TELEMETRY_FORMATS.get(media_type)
+
+
+class TelemetryTooLarge(ValueError):
+    """
+    Body over the byte cap, or an NDJSON line over the line cap.
+    """
+
+
+class _ParseError:
+    __slots__ = ("message",)
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+async def _capped(body: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    total = 0
+    async for chunk in body:
+        total += len(chunk)
+        if max_bytes and total > max_bytes:
+            raise TelemetryTooLarge(f"Body over {max_bytes} bytes")
+        yield chunk
+
+
+async def iter_reading_chunks(
+    body: AsyncIterator[bytes], fmt: str, chunk_size: int, max_bytes: int = 0, max_line_bytes: int = 0
+) -> AsyncIterator[list]:
+    """
+    Decoded readings in lists of at most `chunk_size`; undecodable NDJSON
+    lines are kept in place as _ParseError so row numbers stay aligned.
+    Raises TelemetryTooLarge past `max_bytes` / `max_line_bytes` (0 = no cap).
+    """
+    body = _capped(body, max_bytes)
+    if fmt == "json":
+        raw = bytearray()
+        async for chunk in body:
+            raw += chunk
+        try:
+            records = json.loads(raw or b"[]")
+        except ValueError:
+            raise ValueError("Invalid JSON body")
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON array of readings")
+        for start in range(0, len(records), chunk_size):
+            yield records[start:start + chunk_size]
+        return
+
+    records: list = []
+    pending = bytearray()
+    async for data in body:
+        scan = len(pending)
+        pending += data
+        start = 0
+        while True:
+            end = pending.find(b"\n", scan)
+            if end < 0:
+                break
+            line = pending[start:end]
+            start = scan = end + 1
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    records.append(_ParseError("Invalid JSON line"))
+            if len(records) >= chunk_size:
+                yield records
+                records = []
+        del pending[:start]
+        if max_line_bytes and len(pending) > max_line_bytes:
+            raise TelemetryTooLarge(f"NDJSON line over {max_line_bytes} bytes")
+    if pending.strip():
+        try:
+            records.append(json.loads(pending))
+        except ValueError:
+            records.append(_ParseError("Invalid JSON line"))
+    if records:
+        yield records
+
+
+def _parse_ts(ts, received_at: datetime) -> datetime:
+    if ts is None:
+        return received_at
+    if isinstance(ts, (int, float)) and not isinstance(ts, bool):
+        return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None)
+    if isinstance(ts, str):
+        return utc_naive(datetime.fromisoformat(ts.replace("Z", "+00:00")))
+    raise ValueError
+
+
+def validate_readings(records: list, device_pk: int, received_at: datetime, first_row: int = 0) -> Tuple[List[dict], List[dict]]:
+    """
+    Split decoded readings into insert-ready rows and {"row", "error"} entries.
+    """
+    rows: List[dict] = []
+    errors: List[dict] = []
+    for row, record in enumerate(records, first_row):
+        if isinstance(record, _ParseError):
+            errors.append({"row": row, "error": record.message})
+            continue
+        if not isinstance(record, dict):
+            errors.append({"row": row, "error": "Reading must be an object"})
+            continue
+        sensor = record.get("sensor")
+        if not isinstance(sensor, str) or not sensor or len(sensor) > SENSOR_MAX_LENGTH:
+            errors.append({"row": row, "error": "sensor must be a non-empty string (max 64 chars)"})
+            continue
+        value = record.get("value")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            errors.append({"row": row, "error": "value must be a finite number"})
+            continue
+        unit = record.get("unit")
+        if unit is not None and (not isinstance(unit, str) or len(unit) > UNIT_MAX_LENGTH):
+            errors.append({"row": row, "error": "unit must be a string (max 16 chars)"})
+            continue
+        try:
+            recorded_at = _parse_ts(record.get("ts"), received_at)
+        except (ValueError, TypeError, OverflowError, OSError):
+            errors.append({"row": row, "error": "ts must be epoch seconds or an ISO 8601 timestamp"})
+            continue
+        rows.append({
+            "device_id": device_pk, "sensor": sensor, "value": float(value), "unit": unit,
+            "recorded_at": recorded_at, "received_at": received_at,
+        })
+    return rows, errors
+
+
+def insert_readings(session_factory: Callable, rows: List[dict]):
+    db = session_factory()
+    try:
+        # Core executemany on the table (skips ORM bulk bookkeeping);
+        # raw rows and their rollups commit together, once per chunk
+        conn = db.connection()
+        conn.execute(insert(Telemetry.__table__), rows)
+        apply_rollups(conn, rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def ingest_telemetry_stream(
+    body: AsyncIterator[bytes],
+    fmt: str,
+    device: Device,
+    chunk_size: int,
+    session_factory: Callable = SessionLocal,
+    max_bytes: int = 0,
+    max_line_bytes: int = 0,
+) -> dict:
+    """
+    Returns {"received", "accepted", "rejected", "errors": [{"row", "error"}]};
+    rows not listed in `errors` were stored. Row numbers are 0-based input order.
+    On TelemetryTooLarge, chunks parsed before the cap was hit are still stored.
+    """
+    received_at = datetime.utcnow()
+    received = accepted = 0
+    errors: List[dict] = []
+    in_flight = None  # (insert future, stored row numbers)
+
+    async def settle(job):
+        nonlocal accepted
+        future, row_numbers = job
+        try:
+            await future
+            accepted += len(row_numbers)
+        except Exception:
+            logger.exception("telemetry insert of %d readings failed", len(row_numbers))
+            errors.extend({"row": row, "error": "Storage failure"} for row in row_numbers)
+
+    try:
+        async for records in iter_reading_chunks(body, fmt, chunk_size, max_bytes, max_line_bytes):
+            rows, chunk_errors = validate_readings(records, device.id, received_at, first_row=received)
+            errors.extend(chunk_errors)
+            if in_flight is not None:
+                await settle(in_flight)
+                in_flight = None
+            if rows:
+                rejected = {e["row"] for e in chunk_errors}
+                row_numbers = [r for r in range(received, received + len(records)) if r not in rejected]
+                in_flight = (asyncio.ensure_future(asyncio.to_thread(insert_readings, session_factory, rows)), row_numbers)
+            received += len(records)
+    finally:
+        # never leave an insert running unobserved, even when parsing fails
+        if in_flight is not None:
+            await settle(in_flight)
+
+    errors.sort(key=lambda e: e["row"])
+    return {"received": received, "accepted": accepted, "rejected": received - accepted, "errors": errors}
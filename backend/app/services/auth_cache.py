@@ -0,0 +1,207 @@
+"""
+In-process caches for the authenticated request path.
+
+- `token_cache`: verified JWT payloads keyed by the raw token, each entry
+  expiring at the token's own `exp`, so signature checks run once per token.
+- `revoked_tokens`: revoked, unexpired jtis, loaded from TokenBlocklist
+  and synced incrementally every few seconds (fully reloaded every few
+  minutes); revocations made in this process are added immediately.
+- `user_cache`: User rows (detached from their session) with a short TTL.
+
+Together they remove both database round trips from a warm request.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import register_cache
+from app.models.db_models import TokenBlocklist
+
+
+class TTLCache:
+    """
+    Thread-safe LRU with a per-entry expiry (wall-clock epoch seconds).
+    """
+
+    def __init__(self, max_entries: int, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, expires_at: Optional[float] = None):
+        if expires_at is None:
+            expires_at = time.time() + (self.ttl or 0)
+        if self.max_entries <= 0 or expires_at <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _epoch(value: datetime) -> float:
+    # DateTime columns hold naive UTC
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RevocationSet:
+    """
+    Revoked jtis mirrored from TokenBlocklist, each kept until its token's
+    own expiry (rows without `expires_at` count as created_at +
+    `default_ttl`). Rows with revoked=False are ignored.
+
+    `sync(db)` runs at most once per `sync_interval`:
+
+    - normally it reads rows created since the newest one seen, minus
+      `overlap` seconds: created_at is set before commit (and by each
+      worker's clock), so a row may become visible after newer ones
+    - every `reload_interval` it rebuilds the set from all live rows,
+      which drops expired and un-revoked jtis and catches any row older
+      than the overlap window
+    """
+
+    def __init__(
+        self,
+        sync_interval: float = 5.0,
+        overlap: float = 60.0,
+        reload_interval: float = 300.0,
+        default_ttl: float = 30 * 86400,
+    ):
+        self.sync_interval = sync_interval
+        self.overlap = overlap
+        self.reload_interval = reload_interval
+        self.default_ttl = default_ttl
+        self._jtis: Dict[str, float] = {}  # jti -> expiry (epoch seconds)
+        self._newest: Optional[datetime] = None
+        self._synced_at = float("-inf")
+        self._reloaded_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def __contains__(self, jti) -> bool:
+        expires = self._jtis.get(jti)
+        return expires is not None and expires > time.time()
+
+    def add(self, jti: str, expires_at: Optional[float] = None):
+        with self._lock:
+            self._jtis[jti] = expires_at if expires_at is not None else time.time() + self.default_ttl
+
+    def sync(self, db: Session, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if not force and now - self._synced_at < self.sync_interval:
+                return
+            full = force or self._newest is None or now - self._reloaded_at >= self.reload_interval
+            columns = (TokenBlocklist.jti, TokenBlocklist.revoked, TokenBlocklist.created_at, TokenBlocklist.expires_at)
+            if full:
+                rows = (
+                    db.query(*columns)
+                    .filter(TokenBlocklist.revoked.isnot(False))
+                    .filter((TokenBlocklist.expires_at.is_(None)) | (TokenBlocklist.expires_at > datetime.utcnow()))
+                    .all()
+                )
+                jtis: Dict[str, float] = {}
+            else:
+                since = self._newest - timedelta(seconds=self.overlap)
+                rows = db.query(*columns).filter(TokenBlocklist.created_at >= since).all()
+                jtis = self._jtis
+
+            wall = time.time()
+            for jti, revoked, created_at, expires_at in rows:
+                if created_at is not None and (self._newest is None or created_at > self._newest):
+                    self._newest = created_at
+                if expires_at is not None:
+                    expires = _epoch(expires_at)
+                elif created_at is not None:
+                    expires = _epoch(created_at) + self.default_ttl
+                else:
+                    expires = wall + self.default_ttl
+                if revoked is False or expires <= wall:
+                    jtis.pop(jti, None)
+                else:
+                    jtis[jti] = expires
+            if full:
+                self._jtis = jtis
+                self._reloaded_at = now
+                if self._newest is None:
+                    # empty table: incremental syncs start from now
+                    self._newest = datetime.utcnow()
+            self._synced_at = now
+
+    def clear(self):
+        with self._lock:
+            self._jtis = {}
+            self._newest = None
+            self._synced_at = float("-inf")
+            self._reloaded_at = float("-inf")
+
+    def stats(self) -> dict:
+        return {"revoked": len(self._jtis), "newest": self._newest.isoformat() if self._newest else None}
+
+
+token_cache = TTLCache(max_entries=settings.AUTH_TOKEN_CACHE_SIZE)
+user_cache = TTLCache(max_entries=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL_SECONDS)
+revoked_tokens = RevocationSet(
+    sync_interval=settings.AUTH_REVOCATION_SYNC_SECONDS,
+    overlap=settings.AUTH_REVOCATION_OVERLAP_SECONDS,
+    reload_interval=settings.AUTH_REVOCATION_RELOAD_SECONDS,
+    default_ttl=settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+)
+register_cache("auth_token", token_cache.stats)
+register_cache("auth_user", user_cache.stats)
+
+
+def clear_auth_caches():
+    token_cache.clear()
+    user_cache.clear()
+    revoked_tokens.clear()
+
+
+def auth_cache_metrics() -> dict:
+    return {
+        "tokens": token_cache.stats(),
+        "users": user_cache.stats(),
+        "revocations": revoked_tokens.stats(),
+    }
@@ -1,20 +1,119 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import DB_SESSION_SECONDS
 
 Base = declarative_base()
 
+# Sync drivers -> their asyncio counterparts
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def async_url(url: str) -> str:
+    """
+    Async form of a sync DATABASE_URL (sqlite:// -> sqlite+aiosqlite://,
+    postgresql[+psycopg2]:// -> postgresql+asyncpg://).
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def engine_options(url: str) -> dict:
+    """
+    Pool / connect arguments shared by the sync and async engines.
+    """
+    parsed = make_url(url)
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if _is_memory_sqlite(url):
+            return options  # single shared connection (StaticPool/SingletonThreadPool)
+        if parsed.get_driver_name() == "aiosqlite":
+            # aiosqlite defaults to NullPool (a new thread + connection per session)
+            options["poolclass"] = AsyncAdaptedQueuePool
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    )
+    return options
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer; NORMAL skips the
+    # fsync per commit (still durable at checkpoints, safe with WAL)
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+
+def install_sqlite_pragmas(engine):
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _sqlite_pragmas)
+
+
+# -------------------------
+# Sync engine (threadpool routes, background flushers)
+# -------------------------
 # SQLite default, can swap to PostgreSQL later
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+install_sqlite_pragmas(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
+    started = time.perf_counter()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+        DB_SESSION_SECONDS.observe(time.perf_counter() - started)
+
+
+# -------------------------
+# Async engine (async def routes)
+# -------------------------
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_url(settings.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+install_sqlite_pragmas(async_engine.sync_engine)
+
+# expire_on_commit=False: attributes stay readable after commit without
+# an implicit (and in async, illegal) lazy refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    """
+    AsyncSession dependency for `async def` routes: queries await the
+    driver instead of blocking the event loop.
+    """
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        finally:
+            DB_SESSION_SECONDS.observe(time.perf_counter() - started)
+
+
+def pool_metrics() -> dict:
+    return {"sync": engine.pool.status(), "async": async_engine.pool.status()}
@@ -0,0 +1,74 @@
+"""
+Device credential verification.
+
+Devices authenticate with an opaque random token (X-Device-Token). Only
+its SHA-256 is stored (`Device.cred_token_hash`, unique index), so a
+leaked database does not leak working credentials; a fast hash is enough
+because the tokens are 256-bit random, not passwords.
+
+Verified hash -> Device entries are kept in an LRU with a TTL, so a
+device streaming telemetry costs one hash per message and no query.
+Rotating a token (`/devices/provision/{device_id}`) evicts the old hash
+in this worker immediately; other workers drop it within
+DEVICE_AUTH_CACHE_TTL_SECONDS.
+"""
+import hashlib
+import secrets
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import register_cache
+from app.models.db_models import Device
+from app.services.auth_cache import TTLCache
+
+device_cache = TTLCache(max_entries=settings.DEVICE_AUTH_CACHE_SIZE, ttl=settings.DEVICE_AUTH_CACHE_TTL_SECONDS)
+register_cache("device_auth", device_cache.stats)
+
+
+def hash_device_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_device_token() -> Tuple[str, str]:
+    """
+    New (token, token_hash) pair; hand the token to the device, store the hash.
+    """
+    token = secrets.token_urlsafe(32)
+    return token, hash_device_token(token)
+
+
+def authenticate_device(db: Session, token: Optional[str]) -> Device:
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing device token")
+    token_hash = hash_device_token(token)
+    device = device_cache.get(token_hash)
+    if device is not None:
+        return device
+    device = db.query(Device).filter(Device.cred_token_hash == token_hash).first()
+    if device is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid device token")
+    # Detach so the cached row can outlive this request's session
+    db.expunge(device)
+    device_cache.set(token_hash, device)
+    return device
+
+
+def rotate_device_token(db: Session, device: Device) -> str:
+    """
+    Replace the device's credential and evict the old one from the cache.
+    """
+    token, token_hash = issue_device_token()
+    old_hash = device.cred_token_hash
+    device.cred_token_hash = token_hash
+    device.token_rotated_at = datetime.utcnow()
+    db.commit()
+    device_cache.invalidate(old_hash)
+    return token
+
+
+def device_auth_metrics() -> dict:
+    return device_cache.stats()
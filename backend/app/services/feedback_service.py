@@ -1,17 +1,31 @@
-from sqlalchemy.orm import Session
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.db_models import Feedback
+from app.services.pagination import Page, keyset_page
+
+# Columns returned by listings / exports (plain rows, no ORM identity map)
+FEEDBACK_COLUMNS = (Feedback.id, Feedback.user_id, Feedback.message, Feedback.prediction_result, Feedback.created_at)
 
-def create_feedback(db: Session, user_id: int, message: str, prediction_result: str = None):
+async def create_feedback(db: AsyncSession, user_id: int, message: str, prediction_result: str = None):
     feedback = Feedback(
         user_id=user_id,
         message=message,
         prediction_result=prediction_result
     )
     db.add(feedback)
-    db.commit()
-    db.refresh(feedback)
+    await db.commit()
+    await db.refresh(feedback)
     return feedback
 
 
-def get_all_feedback(db: Session):
-    return db.query(Feedback).order_by(Feedback.created_at.desc()).all()
+async def list_feedback_page(db: AsyncSession, limit: int, cursor: Optional[str] = None) -> Page:
+    """
+    Newest feedback first, one keyset page at a time.
+    """
+    return await keyset_page(db, select(*FEEDBACK_COLUMNS), Feedback, limit, cursor)
+
+
+def feedback_export_query():
+    return select(*FEEDBACK_COLUMNS)
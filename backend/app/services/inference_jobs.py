@@ -0,0 +1,209 @@
+# backend/app/services/inference_jobs.py
+"""
+Background disease inference (images nobody is waiting on).
+
+The API stores the image, inserts an `inference_jobs` row and enqueues a
+Celery task carrying only the job id, then returns the id at once
+(`GET /jobs/{id}` polls the row).
+
+Each task claims up to INFERENCE_JOB_BATCH_SIZE queued jobs of its kind
+in one UPDATE, so a worker answers a backlog with one model.predict per
+batch. The batch is chosen like the API's fair queue: priority classes
+share it by INFERENCE_CLASS_WEIGHTS and tenants (user / device) take
+turns inside a class, so a camera burst cannot hold back other jobs.
+A task whose own job was already claimed still serves the next batch;
+with one task per job every job is claimed eventually. Jobs left
+`running` by a dead worker are claimed again after
+INFERENCE_JOB_STALE_SECONDS.
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.ml.preprocessing import FEATURES, preprocess_into
+from app.ml.registry import ModelRegistry, model_registry
+from app.ml.scheduler import INTERACTIVE, fair_pick
+from app.models.db_models import InferenceJob, PredictionLog
+from app.services.database import SessionLocal
+from app.services.storage import StorageBackend, download_image, get_storage
+
+logger = logging.getLogger("agromind")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+DISEASE = "disease"
+
+
+# ─────────────────────────────────────────────
+# API side
+# ─────────────────────────────────────────────
+def create_job(
+    db: Session,
+    kind: str,
+    input_key: Optional[str] = None,
+    input_url: Optional[str] = None,
+    device_pk: Optional[int] = None,
+    device_image_id: Optional[int] = None,
+    priority: str = INTERACTIVE,
+    tenant: Optional[str] = None,
+) -> InferenceJob:
+    job = InferenceJob(
+        id=uuid.uuid4().hex, kind=kind, status=QUEUED, input_key=input_key, input_url=input_url,
+        device_id=device_pk, device_image_id=device_image_id, priority=priority, tenant=tenant,
+        created_at=datetime.utcnow(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def enqueue_job(job: InferenceJob):
+    """
+    Publish the job's task (blocking broker I/O; in eager mode the job runs here).
+    """
+    from app.workers.tasks import TASKS
+
+    TASKS[job.kind].apply_async(args=[job.id], task_id=job.id)
+
+
+async def dispatch_job(job: InferenceJob, session_factory: Callable = SessionLocal):
+    """
+    enqueue_job off the event loop; an unreachable broker fails the job and raises 503.
+    """
+    try:
+        await run_in_threadpool(enqueue_job, job)
+    except Exception:
+        logger.exception("could not enqueue inference job %s", job.id)
+        await run_in_threadpool(_finish, session_factory, [job.id], FAILED, None, "Could not enqueue job")
+        raise HTTPException(status_code=503, detail="Job queue unavailable")
+
+
+def _finish(session_factory: Callable, job_ids: List[str], status: str, result: Optional[dict], error: Optional[str]):
+    db = session_factory()
+    try:
+        db.execute(
+            update(InferenceJob).where(InferenceJob.id.in_(job_ids))
+            .values(status=status, result=result, error=error, finished_at=datetime.utcnow())
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+# ─────────────────────────────────────────────
+# Worker side
+# ─────────────────────────────────────────────
+def claim_jobs(db: Session, kind: str, limit: int, stale_seconds: float) -> List[InferenceJob]:
+    """
+    Atomically mark up to `limit` claimable jobs of `kind`, picked fairly
+    by priority class and tenant, as running under a fresh claim; returns
+    the claimed rows.
+    """
+    now = datetime.utcnow()
+    claimable = or_(
+        InferenceJob.status == QUEUED,
+        and_(InferenceJob.status == RUNNING, InferenceJob.started_at < now - timedelta(seconds=stale_seconds)),
+    )
+    # Per class: each tenant's oldest job first, then their second, ...
+    turn = func.row_number().over(partition_by=InferenceJob.tenant, order_by=InferenceJob.created_at)
+    candidates = []
+    for priority in settings.INFERENCE_CLASS_WEIGHTS:
+        ranked = (
+            select(InferenceJob.id, InferenceJob.tenant, InferenceJob.created_at, turn.label("turn"))
+            .where(InferenceJob.kind == kind, InferenceJob.priority == priority, claimable)
+            .subquery()
+        )
+        rows = db.execute(
+            select(ranked.c.id, ranked.c.tenant).order_by(ranked.c.turn, ranked.c.created_at).limit(limit)
+        ).all()
+        candidates.extend((priority, tenant, job_id) for job_id, tenant in rows)
+    chosen = fair_pick(candidates, settings.INFERENCE_CLASS_WEIGHTS, limit)
+    if not chosen:
+        return []
+
+    claim = uuid.uuid4().hex
+    db.execute(
+        update(InferenceJob)
+        # re-check: another worker may have claimed some of them meanwhile
+        .where(InferenceJob.id.in_(chosen), claimable)
+        .values(status=RUNNING, claim=claim, started_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return list(db.scalars(select(InferenceJob).where(InferenceJob.claim == claim).order_by(InferenceJob.created_at)))
+
+
+def _load_image(job: InferenceJob, storage: StorageBackend) -> bytes:
+    if job.input_key:
+        data = storage.read(job.input_key)
+        if data is None:
+            raise FileNotFoundError(f"{job.input_key} not found in storage")
+        return data
+    return download_image(job.input_url)
+
+
+def process_disease_jobs(
+    job_id: str,
+    session_factory: Callable = SessionLocal,
+    storage: Optional[StorageBackend] = None,
+    registry: ModelRegistry = model_registry,
+    batch_size: Optional[int] = None,
+) -> int:
+    """
+    Claim the next fair batch of disease jobs (the task's own `job_id` is
+    only used for logging), predict them with one model call and store
+    each result. Returns how many jobs were claimed.
+    """
+    storage = storage or get_storage()
+    batch_size = batch_size or settings.INFERENCE_JOB_BATCH_SIZE
+    db = session_factory()
+    try:
+        jobs = claim_jobs(db, DISEASE, batch_size, settings.INFERENCE_JOB_STALE_SECONDS)
+        if not jobs:
+            logger.debug("inference task %s: nothing left to claim", job_id)
+            return 0
+
+        # Decode per job so one unreadable image fails only its own job
+        features = np.empty((len(jobs), FEATURES), dtype=np.float32)
+        ready, failed = [], {}
+        for job in jobs:
+            try:
+                preprocess_into(_load_image(job, storage), features[len(ready)])
+                ready.append(job)
+            except Exception as e:
+                logger.warning("inference job %s: unusable input: %s", job.id, e)
+                failed[job.id] = "Could not load image"
+
+        results = {}
+        if ready:
+            try:
+                loaded = registry.get(DISEASE)
+                labels = loaded.model.predict(features[:len(ready)]).tolist()
+                results = {job.id: {"disease": str(label), "model_version": loaded.version}
+                           for job, label in zip(ready, labels)}
+            except Exception:
+                logger.exception("disease batch of %d jobs failed", len(ready))
+                failed.update({job.id: "Inference failed" for job in ready})
+
+        now = datetime.utcnow()
+        for job in jobs:
+            job.finished_at = now
+            if job.id in results:
+                job.status, job.result = DONE, results[job.id]
+                db.add(PredictionLog(model_type=DISEASE, input_ref=job.input_key or job.input_url,
+                                     output=job.result, created_at=now))
+            else:
+                job.status, job.error = FAILED, failed[job.id]
+        db.commit()
+        logger.info("disease jobs batch size=%d done=%d failed=%d", len(jobs), len(results), len(failed))
+        return len(jobs)
+    finally:
+        db.close()
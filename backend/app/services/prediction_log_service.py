@@ -0,0 +1,322 @@
+"""
+PredictionLog persistence.
+
+`log_prediction` writes one row synchronously. Request handlers use
+`prediction_sink.record(...)` instead: records go into an in-memory ring
+buffer and a background task bulk-inserts them every `flush_size`
+records or `flush_interval_ms`, whichever comes first. If the database
+is unavailable the batch is appended to a local JSONL spool, which is
+replayed on the next successful flush.
+
+The spool is shared by every worker process on the host: appends and the
+rename to `.replaying` hold an exclusive flock on `<spool>.lock`, and
+only one process replays at a time (`<spool>.replay.lock`, non-blocking).
+A `.replaying` file left behind by a crash is finished first.
+"""
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import register_queue
+from app.core.loops import rebind_loop
+from app.models.db_models import PredictionLog
+from app.services.database import SessionLocal
+
+logger = logging.getLogger("agromind")
+
+
+def log_prediction(
+    db: Session,
+    model_type: str,
+    input_ref: str,
+    output: dict,
+    user_id: Optional[int] = None,
+    field_id: Optional[int] = None,
+    confidence: Optional[float] = None,
+):
+    """
+    Persist one inference result for analytics / retraining.
+    """
+    entry = PredictionLog(
+        user_id=user_id,
+        field_id=field_id,
+        model_type=model_type,
+        input_ref=input_ref,
+        output=output,
+        confidence=confidence,
+    )
+    db.add(entry)
+    db.commit()
+    return entry
+
+
+class PredictionLogSink:
+    """
+    Ring buffer + batched bulk insert for PredictionLog rows.
+
+    `record()` is O(1) and never blocks; when more than `capacity` records
+    are waiting (DB far behind), the oldest are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        capacity: int = 10_000,
+        flush_size: int = 200,
+        flush_interval_ms: float = 500.0,
+        spool_path: Optional[str] = None,
+    ):
+        self.session_factory = session_factory
+        self.capacity = capacity
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.spool_path = Path(spool_path) if spool_path else None
+        self._buffer: deque = deque(maxlen=capacity)
+        self._flush_lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.recorded = 0
+        self.inserted = 0
+        self.dropped = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.flushes = 0
+        self.db_errors = 0
+        self.last_flush_ms = 0.0
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def record(
+        self,
+        model_type: str,
+        input_ref: str,
+        output: dict,
+        user_id: Optional[int] = None,
+        field_id: Optional[int] = None,
+        confidence: Optional[float] = None,
+    ):
+        """
+        Queue one PredictionLog row (same fields as log_prediction).
+        """
+        if len(self._buffer) == self.capacity:
+            self.dropped += 1
+        self._buffer.append(dict(
+            model_type=model_type, input_ref=input_ref, output=output,
+            user_id=user_id, field_id=field_id, confidence=confidence,
+            created_at=datetime.utcnow(),
+        ))
+        self.recorded += 1
+        self._ensure_worker()
+        if len(self._buffer) >= self.flush_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self):
+        """
+        Write everything buffered so far (DB, or spool if the DB fails).
+        """
+        while self._buffer:
+            await asyncio.to_thread(self._flush_once)
+
+    async def stop(self):
+        """
+        Stop the background task and flush what is left (app shutdown).
+        """
+        worker, self._worker = self._worker, None
+        if worker is not None and not worker.done():
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    def metrics(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "capacity": self.capacity,
+            "recorded": self.recorded,
+            "inserted": self.inserted,
+            "dropped": self.dropped,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "flushes": self.flushes,
+            "db_errors": self.db_errors,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+        }
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    def _ensure_worker(self):
+        try:
+            loop, moved = rebind_loop(self._loop)
+        except RuntimeError:
+            return  # called outside the event loop; next flush picks it up
+        if moved or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._buffer:
+                await asyncio.to_thread(self._flush_once)
+
+    def _take(self) -> List[dict]:
+        rows = []
+        while self._buffer and len(rows) < self.flush_size:
+            rows.append(self._buffer.popleft())
+        return rows
+
+    def _flush_once(self):
+        # one flusher at a time (background task vs. explicit flush/stop)
+        with self._flush_lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        rows = self._take()
+        if not rows:
+            return
+        started = time.perf_counter()
+        try:
+            self._insert(rows)
+            self.inserted += len(rows)
+        except Exception:
+            self.db_errors += 1
+            logger.exception("prediction log insert of %d rows failed; spooling", len(rows))
+            self._spool(rows)
+        else:
+            self._replay_spool()
+        self.flushes += 1
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def _insert(self, rows: List[dict]):
+        db = self.session_factory()
+        try:
+            # executemany: one round trip + one commit per batch
+            db.execute(insert(PredictionLog), rows)
+            db.commit()
+        finally:
+            db.close()
+
+    def _spool(self, rows: List[dict]):
+        if self.spool_path is None:
+            self.dropped += len(rows)
+            return
+        self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._file_lock(".lock"), open(self.spool_path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps({**row, "created_at": row["created_at"].isoformat()}, default=str) + "\n")
+        self.spooled += len(rows)
+
+    @contextlib.contextmanager
+    def _file_lock(self, suffix: str, blocking: bool = True):
+        """
+        Exclusive flock on `<spool><suffix>`; yields False if `blocking` is
+        off and another process holds it.
+        """
+        with open(f"{self.spool_path}{suffix}", "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _replay_spool(self):
+        if self.spool_path is None:
+            return
+        replaying = self.spool_path.with_suffix(".replaying")
+        if not self.spool_path.exists() and not replaying.exists():
+            return
+        with self._file_lock(".replay.lock", blocking=False) as owned:
+            if not owned:
+                return  # another worker is replaying
+            # a crash mid-replay leaves .replaying behind: finish it first
+            if replaying.exists() and not self._replay_file(replaying):
+                return
+            with self._file_lock(".lock"):
+                if not self.spool_path.exists():
+                    return
+                os.replace(self.spool_path, replaying)
+            self._replay_file(replaying)
+
+    def _replay_file(self, replaying: Path) -> bool:
+        """
+        Insert `replaying` flush_size rows at a time (a large spool is never
+        held in memory); on failure the rest goes back to the spool.
+        """
+        replayed, ok = 0, True
+        with open(replaying, encoding="utf-8") as f:
+            for rows in self._spooled_chunks(f):
+                try:
+                    self._insert(rows)
+                except Exception:
+                    self.db_errors += 1
+                    logger.exception("prediction log spool replay failed; keeping spool")
+                    self._respool(rows, f)  # the part not yet inserted
+                    ok = False
+                    break
+                replayed += len(rows)
+            else:
+                logger.info("replayed %d spooled prediction logs", replayed)
+        replaying.unlink()
+        self.inserted += replayed
+        self.replayed += replayed
+        return ok
+
+    def _spooled_chunks(self, f) -> Iterator[List[dict]]:
+        rows = []
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            row["created_at"] = datetime.fromisoformat(row["created_at"])
+            rows.append(row)
+            if len(rows) >= self.flush_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+    def _respool(self, rows: List[dict], rest):
+        # rows were counted as spooled the first time round
+        with self._file_lock(".lock"), open(self.spool_path, "a", encoding="utf-8") as out:
+            for row in rows:
+                out.write(json.dumps({**row, "created_at": row["created_at"].isoformat()}, default=str) + "\n")
+            for line in rest:
+                out.write(line)
+
+
+prediction_sink = PredictionLogSink(
+    capacity=settings.PREDICTION_LOG_BUFFER_SIZE,
+    flush_size=settings.PREDICTION_LOG_FLUSH_SIZE,
+    flush_interval_ms=settings.PREDICTION_LOG_FLUSH_INTERVAL_MS,
+    spool_path=settings.PREDICTION_LOG_SPOOL_PATH,
+)
+register_queue("prediction_log", lambda: len(prediction_sink._buffer))
@@ -1,13 +1,150 @@
-from fastapi import Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.services.database import get_db
-from app.models.db_models import User
-from app.core.security import verify_password, create_jwt_token
-
-def login(db: Session, email: str, password: str):
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.password_hash):
-        raise HTTPException(status_code=401, detail="Invalid email or password")
-
-    token = create_jwt_token({"user_id": user.id})
-    return {"access_token": token, "token_type": "bearer", "username": user.username}
+# backend/app/services/s3_client.py
+"""
+S3 (or any S3-compatible endpoint: MinIO, DigitalOcean Spaces) storage.
+
+One boto3 client per process, shared by all requests and threads: botocore
+clients are thread-safe and keep a pool of up to S3_MAX_POOL_CONNECTIONS
+keep-alive connections, so we pay TLS setup once instead of per upload.
+"""
+import os
+import threading
+from typing import BinaryIO, Iterator, Optional
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from app.core.config import settings
+from app.services.storage import INGEST_CHUNK_SIZE, BufferReader, StorageBackend
+
+_client_lock = threading.Lock()
+_clients: dict = {}
+
+MB = 1024 * 1024
+
+
+def get_s3_client():
+    """
+    Shared, connection-pooled S3 client for this process (recreated after fork).
+    """
+    pid = os.getpid()
+    client = _clients.get(pid)
+    if client is None:
+        with _client_lock:
+            client = _clients.get(pid)
+            if client is None:
+                client = boto3.session.Session().client(
+                    "s3",
+                    endpoint_url=settings.S3_ENDPOINT,
+                    region_name=settings.S3_REGION,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    config=Config(
+                        max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                        retries={"max_attempts": 3, "mode": "standard"},
+                    ),
+                )
+                _clients.clear()
+                _clients[pid] = client
+    return client
+
+
+class S3Storage(StorageBackend):
+    """
+    Objects in `bucket`. Uploads above `multipart_threshold` are sent as
+    parallel multipart uploads (`max_concurrency` parts in flight);
+    downloads are streamed in chunks.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        client=None,
+        multipart_threshold: int = 8 * MB,
+        multipart_chunksize: int = 8 * MB,
+        max_concurrency: int = 4,
+        presign_expires: int = 900,
+    ):
+        if not bucket:
+            raise ValueError("S3_BUCKET is not configured")
+        self.bucket = bucket
+        self._client = client
+        self.presign_expires = presign_expires
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency,
+            use_threads=max_concurrency > 1,
+        )
+
+    @classmethod
+    def from_settings(cls) -> "S3Storage":
+        return cls(
+            settings.S3_BUCKET,
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * MB,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNK_MB * MB,
+            max_concurrency=settings.S3_MULTIPART_CONCURRENCY,
+            presign_expires=settings.S3_PRESIGN_EXPIRES_SECONDS,
+        )
+
+    @property
+    def client(self):
+        return self._client or get_s3_client()
+
+    def save(self, key: str, data) -> str:
+        # BufferReader: upload straight from the request buffer, no copy
+        return self.save_stream(key, BufferReader(data))
+
+    def save_stream(self, key: str, fileobj: BinaryIO) -> str:
+        self.client.upload_fileobj(fileobj, self.bucket, key, Config=self.transfer_config)
+        return self.ref(key)
+
+    def open_stream(self, key: str, chunk_size: int = INGEST_CHUNK_SIZE) -> Iterator[bytes]:
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                raise FileNotFoundError(key) from e
+            raise
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def delete(self, key: str) -> bool:
+        if not self.exists(key):
+            return False
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+        return True
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404", "NotFound"):
+                return False
+            raise
+
+    def ref(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def presigned_put_url(self, key: str, content_type: str = "application/octet-stream",
+                          expires_in: Optional[int] = None) -> dict:
+        expires_in = expires_in or self.presign_expires
+        url = self.client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": self.bucket, "Key": key, "ContentType": content_type},
+            ExpiresIn=expires_in,
+        )
+        return {
+            "url": url,
+            "method": "PUT",
+            "headers": {"Content-Type": content_type},
+            "key": key,
+            "ref": self.ref(key),
+            "expires_in": expires_in,
+        }
@@ -1,8 +1,18 @@
+import hashlib
+import io
 import os
+import posixpath
 import uuid
-from typing import Optional
-from fastapi import UploadFile
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterator, Optional
+from urllib.parse import urlparse
+import requests
+from fastapi import HTTPException, UploadFile
 from pathlib import Path
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
 
 # Base directory for all uploaded files (configure anytime)
 UPLOAD_DIR = Path("app/static/uploads")
@@ -31,7 +41,8 @@ def save_file(file: UploadFile, subfolder: str = "") -> str:
 
     filepath = folder / new_filename
 
-    # Save file content
+    # Save file content (rewind: the route may already have read the stream)
+    file.file.seek(0)
     with open(filepath, "wb") as buffer:
         buffer.write(file.file.read())
 
@@ -54,6 +65,199 @@ def save_bytes(content: bytes, subfolder: str = "", extension: str = "jpg") -> s
     return str(filepath)
 
 
+# -------------------------
+# Streaming image ingest
+# -------------------------
+INGEST_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# leading bytes -> extension; WEBP is RIFF....WEBP
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "jpg",
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"BM": "bmp",
+}
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """
+    Image type from magic bytes (None if not a supported image).
+    """
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def normalize_key(key: str) -> str:
+    """
+    Canonical storage key; raises ValueError for absolute keys, backslashes
+    or `..` segments (so a prefix check on the result cannot be escaped).
+    """
+    if not key or key.startswith("/") or "\\" in key or "\x00" in key:
+        raise ValueError("invalid storage key")
+    if ".." in key.split("/"):
+        raise ValueError("storage key may not contain '..'")
+    return posixpath.normpath(key)
+
+
+def download_image(url: str, max_bytes: Optional[int] = None, timeout: float = 15) -> bytes:
+    """
+    Fetch an image by URL for background work: http(s) only, at most
+    `max_bytes` (UPLOAD_MAX_BYTES), and it must look like an image.
+    Raises ValueError otherwise (requests errors pass through).
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    if urlparse(url).scheme not in ("http", "https"):
+        raise ValueError("image_url must be http(s)")
+    with requests.get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise ValueError(f"Image larger than {max_bytes} bytes")
+        content = bytearray()
+        for chunk in response.iter_content(INGEST_CHUNK_SIZE):
+            content += chunk
+            if len(content) > max_bytes:
+                raise ValueError(f"Image larger than {max_bytes} bytes")
+    if sniff_image_type(bytes(content[:12])) is None:
+        raise ValueError("URL did not return a supported image")
+    return bytes(content)
+
+
+class IngestedUpload:
+    """
+    Result of ingest_upload: the stored path plus the bytes/sha256 gathered
+    in the same pass (`content` is handed to preprocessing as-is).
+    """
+
+    def __init__(self, path: str, content: bytearray, sha256: str, extension: str, key: str = ""):
+        self.path = path
+        self.key = key  # storage key, e.g. "disease_inputs/<uuid>.jpg"
+        self.content = content
+        self.sha256 = sha256
+        self.extension = extension
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+
+async def ingest_upload(
+    file: UploadFile,
+    subfolder: str = "",
+    max_bytes: Optional[int] = None,
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    persist: bool = True,
+) -> IngestedUpload:
+    """
+    Read an image upload once, in chunks: hash it, enforce `max_bytes`,
+    check magic bytes and (if `persist`) write it to static/uploads as it
+    arrives. Memory per request is bounded by `max_bytes` (UPLOAD_MAX_BYTES).
+
+    With persist=False nothing touches the disk; the caller stores
+    `content` under `key` itself (e.g. via the write-behind queue) and
+    `path` is that key's reference in the configured storage backend.
+
+    Raises HTTPException 413 (too large) / 400 (not an image); a partial
+    file is removed in both cases.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    folder = UPLOAD_DIR / subfolder
+    folder.mkdir(parents=True, exist_ok=True)
+    tmp_path = folder / f"{uuid.uuid4().hex}.part"
+
+    digest = hashlib.sha256()
+    content = bytearray()
+    extension = None
+    out = open(tmp_path, "wb") if persist else None
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            if len(content) + len(chunk) > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Image larger than {max_bytes} bytes")
+            content += chunk
+            if extension is None and len(content) >= 12:
+                extension = sniff_image_type(content[:12])
+                if extension is None:
+                    raise HTTPException(status_code=400, detail="Uploaded file is not a supported image")
+            digest.update(chunk)
+            if out is not None:
+                await run_in_threadpool(out.write, chunk)
+        if extension is None:
+            raise HTTPException(status_code=400, detail="Uploaded file is not a supported image")
+        if out is not None:
+            out.close()
+            # Header check from disk (no extra in-memory copy)
+            await run_in_threadpool(_verify_image_header, tmp_path)
+        else:
+            _verify_image_header(BufferReader(content))
+    except BaseException:
+        if out is not None:
+            out.close()
+            tmp_path.unlink(missing_ok=True)
+        raise
+
+    final_path = tmp_path.with_suffix(f".{extension}")
+    key = final_path.relative_to(UPLOAD_DIR).as_posix()
+    if persist:
+        os.replace(tmp_path, final_path)
+        return IngestedUpload(str(final_path), content, digest.hexdigest(), extension, key)
+    return IngestedUpload(get_storage().ref(key), content, digest.hexdigest(), extension, key)
+
+
+def _verify_image_header(source):
+    try:
+        with Image.open(source):
+            pass
+    except Exception:
+        raise HTTPException(status_code=400, detail="Uploaded file is not a valid image")
+
+
+class BufferReader(io.RawIOBase):
+    """
+    Read-only file object over a bytes-like buffer without copying it
+    (BytesIO would duplicate the whole upload just to parse or send it).
+    """
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        data = self._view[self._pos:self._pos + len(target)]
+        target[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def write_bytes(path: str, content) -> str:
+    """
+    Write a bytes-like object to `path` (creating parent folders).
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as buffer:
+        buffer.write(content)
+    return path
+
+
 def read_file(path: str) -> Optional[bytes]:
     """
     Reads a file from disk and returns its bytes.
@@ -75,3 +279,110 @@ def delete_file(path: str) -> bool:
         path_obj.unlink()
         return True
     return False
+
+
+# -------------------------
+# Storage backends
+# -------------------------
+class StorageBackend(ABC):
+    """
+    Object storage used for uploads. Keys are "/"-separated relative paths
+    ("disease_inputs/<uuid>.jpg"); `ref(key)` is what gets logged/returned.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def save(self, key: str, data) -> str:
+        """Store a bytes-like object under `key`, return its ref."""
+
+    @abstractmethod
+    def save_stream(self, key: str, fileobj: BinaryIO) -> str:
+        """Store everything readable from `fileobj` under `key`, return its ref."""
+
+    @abstractmethod
+    def open_stream(self, key: str, chunk_size: int = INGEST_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the object's bytes in chunks (raises FileNotFoundError)."""
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Delete `key`; False if it did not exist."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def ref(self, key: str) -> str:
+        ...
+
+    def read(self, key: str) -> Optional[bytes]:
+        try:
+            return b"".join(self.open_stream(key))
+        except FileNotFoundError:
+            return None
+
+    def presigned_put_url(self, key: str, content_type: str = "application/octet-stream",
+                          expires_in: int = 900) -> dict:
+        """
+        {"url", "method", "headers", "key"} for a direct client upload.
+        """
+        raise NotImplementedError(f"{self.name} storage does not support presigned uploads")
+
+
+class LocalStorage(StorageBackend):
+    """
+    Files under `root` (static/uploads by default).
+    """
+
+    name = "local"
+
+    def __init__(self, root: Path = UPLOAD_DIR):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"key escapes storage root: {key!r}")
+        return path
+
+    def save(self, key: str, data) -> str:
+        return write_bytes(str(self._path(key)), data)
+
+    def save_stream(self, key: str, fileobj: BinaryIO) -> str:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as out:
+            for chunk in iter(lambda: fileobj.read(INGEST_CHUNK_SIZE), b""):
+                out.write(chunk)
+        return str(path)
+
+    def open_stream(self, key: str, chunk_size: int = INGEST_CHUNK_SIZE) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            yield from iter(lambda: f.read(chunk_size), b"")
+
+    def delete(self, key: str) -> bool:
+        return delete_file(str(self._path(key)))
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def ref(self, key: str) -> str:
+        return str(self.root / key)
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """
+    Process-wide backend chosen by settings.STORAGE_BACKEND ("local" / "s3").
+    """
+    global _storage
+    if _storage is None:
+        if settings.STORAGE_BACKEND == "s3":
+            from app.services.s3_client import S3Storage
+            _storage = S3Storage.from_settings()
+        else:
+            _storage = LocalStorage(UPLOAD_DIR)
+    return _storage
@@ -0,0 +1,288 @@
+# backend/app/services/telemetry_store.py
+"""
+Time-series storage for device telemetry.
+
+Raw readings live in `telemetry` (indexed by device, sensor, time). Every
+ingest also folds its readings into 1-minute, 1-hour and 1-day rollup
+tables (count / sum / min / max per bucket) in the same transaction, via
+an upsert that adds to existing buckets, so rollups are always current.
+
+`query_series` answers chart queries from the coarsest rollup whose
+bucket divides the requested resolution; raw rows are never scanned.
+`resolve_resolution` keeps resolutions on rollup multiples and off
+rollups already pruned for the range.
+`prune_telemetry` deletes raw rows (and fine rollups) past retention,
+in small batches.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.models.db_models import Telemetry, TelemetryRollup1d, TelemetryRollup1h, TelemetryRollup1m
+from app.services.database import SessionLocal
+
+logger = logging.getLogger("agromind")
+
+EPOCH = datetime(1970, 1, 1)
+
+# (bucket seconds, table, name), finest first
+ROLLUPS = [
+    (60, TelemetryRollup1m, "1m"),
+    (3600, TelemetryRollup1h, "1h"),
+    (86400, TelemetryRollup1d, "1d"),
+]
+ROLLUP_TABLES = {seconds: model.__table__ for seconds, model, _ in ROLLUPS}
+
+_TRUNCATE = {
+    60: lambda ts: ts.replace(second=0, microsecond=0),
+    3600: lambda ts: ts.replace(minute=0, second=0, microsecond=0),
+    86400: lambda ts: ts.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+
+
+def utc_naive(value: datetime) -> datetime:
+    # Stored as naive UTC, like every other DateTime column
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def bucket_floor(ts: datetime, seconds: int) -> datetime:
+    if seconds in _TRUNCATE:
+        return _TRUNCATE[seconds](ts)
+    offset = int((ts - EPOCH).total_seconds()) // seconds * seconds
+    return EPOCH + timedelta(seconds=offset)
+
+
+# ─────────────────────────────────────────────
+# Ingest
+# ─────────────────────────────────────────────
+def _merge(aggregates: Dict[tuple, list], key: tuple, count: int, total: float, low: float, high: float):
+    agg = aggregates.get(key)
+    if agg is None:
+        aggregates[key] = [count, total, low, high]
+    else:
+        agg[0] += count
+        agg[1] += total
+        if low < agg[2]:
+            agg[2] = low
+        if high > agg[3]:
+            agg[3] = high
+
+
+def compute_rollups(rows: List[dict]) -> Dict[int, Dict[tuple, list]]:
+    """
+    {bucket seconds: {(device_id, sensor, bucket_start): [count, sum, min, max]}}.
+    Coarser levels are folded from the finer ones, not from the raw rows.
+    """
+    levels: Dict[int, Dict[tuple, list]] = {}
+    minute: Dict[tuple, list] = {}
+    truncate = _TRUNCATE[60]
+    for row in rows:
+        value = row["value"]
+        _merge(minute, (row["device_id"], row["sensor"], truncate(row["recorded_at"])), 1, value, value, value)
+    levels[60] = minute
+    finer = minute
+    for seconds, _, _ in ROLLUPS[1:]:
+        truncate = _TRUNCATE[seconds]
+        level: Dict[tuple, list] = {}
+        for (device_id, sensor, bucket), (count, total, low, high) in finer.items():
+            _merge(level, (device_id, sensor, truncate(bucket)), count, total, low, high)
+        levels[seconds] = level
+        finer = level
+    return levels
+
+
+def _upsert(conn: Connection, table, rows: List[dict]):
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(table)
+        least, greatest = func.least, func.greatest
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table)
+        least, greatest = func.min, func.max  # scalar min()/max() with two args
+    else:
+        raise NotImplementedError(f"Telemetry rollups need an upsert-capable database, not {dialect}")
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["device_id", "sensor", "bucket_start"],
+        set_={
+            "count": table.c.count + excluded.count,
+            "sum": table.c.sum + excluded.sum,
+            "min": least(table.c.min, excluded.min),
+            "max": greatest(table.c.max, excluded.max),
+        },
+    )
+    conn.execute(stmt, rows)
+
+
+def apply_rollups(conn: Connection, rows: List[dict]):
+    """
+    Fold raw telemetry rows into every rollup table (call inside the raw insert's transaction).
+    """
+    if not rows:
+        return
+    for seconds, aggregates in compute_rollups(rows).items():
+        table = ROLLUP_TABLES[seconds]
+        _upsert(conn, table, [
+            {"device_id": device_id, "sensor": sensor, "bucket_start": bucket,
+             "count": count, "sum": total, "min": low, "max": high}
+            for (device_id, sensor, bucket), (count, total, low, high) in aggregates.items()
+        ])
+
+
+# ─────────────────────────────────────────────
+# Range queries
+# ─────────────────────────────────────────────
+def pick_rollup(resolution: int) -> Tuple[int, type, str]:
+    """
+    Coarsest rollup whose bucket evenly divides `resolution` (seconds, >= 60).
+    """
+    chosen = ROLLUPS[0]
+    for rollup in ROLLUPS:
+        if rollup[0] <= resolution and resolution % rollup[0] == 0:
+            chosen = rollup
+    return chosen
+
+
+def _retention_days(seconds: int) -> int:
+    # 0 = kept forever (the 1d rollup is never pruned)
+    return {
+        60: settings.TELEMETRY_1M_RETENTION_DAYS,
+        3600: settings.TELEMETRY_1H_RETENTION_DAYS,
+    }.get(seconds, 0)
+
+
+def usable_rollups(start: datetime, now: Optional[datetime] = None) -> List[int]:
+    """
+    Bucket sizes of the rollups that still hold data back to `start`, finest first.
+    """
+    now = now or datetime.utcnow()
+    usable = []
+    for seconds, _, _ in ROLLUPS:
+        days = _retention_days(seconds)
+        if days <= 0 or start >= now - timedelta(days=days):
+            usable.append(seconds)
+    return usable or [ROLLUPS[-1][0]]
+
+
+def resolve_resolution(
+    start: datetime, end: datetime, resolution: Optional[int], max_points: int, now: Optional[datetime] = None,
+) -> int:
+    """
+    Seconds per point for a chart over [start, end).
+
+    Only rollups whose retention still covers `start` are considered. If
+    omitted, the resolution is the coarsest such rollup that still gives
+    at least half of `max_points` (or the finest, when none does), raised
+    to what fits the range in `max_points`. Either way the result is
+    rounded up to a multiple of the coarsest usable rollup not above it,
+    so the series is read from that rollup and not a finer one.
+    Raises ValueError when the range would need more than `max_points`.
+    """
+    if end <= start:
+        raise ValueError("end must be after start")
+    span = (end - start).total_seconds()
+    usable = usable_rollups(start, now)
+    if resolution is None:
+        preferred = usable[0]
+        for seconds in usable:
+            if span / seconds >= max_points / 2:
+                preferred = seconds
+        resolution = max(preferred, -(-span // max_points))
+    grain = usable[0]
+    for seconds in usable:
+        if seconds <= resolution:
+            grain = seconds
+    resolution = max(grain, int(-(-resolution // grain)) * grain)
+    if span / resolution > max_points:
+        raise ValueError(f"Range needs more than {max_points} points at {resolution}s resolution")
+    return resolution
+
+
+def query_series(db, device_pk: int, sensor: str, start: datetime, end: datetime, resolution: int) -> dict:
+    """
+    Points {"ts", "count", "avg", "min", "max"} over [start, end) at `resolution` seconds.
+    """
+    seconds, model, name = pick_rollup(resolution)
+    rows = db.execute(
+        select(model.bucket_start, model.count, model.sum, model.min, model.max)
+        .where(
+            model.device_id == device_pk,
+            model.sensor == sensor,
+            model.bucket_start >= bucket_floor(start, seconds),
+            model.bucket_start < end,
+        )
+        .order_by(model.bucket_start)
+    ).all()
+
+    buckets: Dict[datetime, list] = {}
+    for bucket_start, count, total, low, high in rows:
+        _merge(buckets, bucket_floor(bucket_start, resolution), count, total, low, high)
+    points = [
+        {"ts": ts, "count": count, "avg": total / count, "min": low, "max": high}
+        for ts, (count, total, low, high) in buckets.items()
+    ]
+    return {"sensor": sensor, "resolution": resolution, "source": name, "points": points}
+
+
+# ─────────────────────────────────────────────
+# Retention
+# ─────────────────────────────────────────────
+def _prune_table(session_factory: Callable, model, column, cutoff: datetime, batch_size: int) -> int:
+    """
+    Delete rows older than `cutoff`, `batch_size` per transaction so
+    ingest is never blocked behind one long delete.
+    """
+    pk = tuple_(*model.__table__.primary_key.columns)
+    removed = 0
+    while True:
+        db = session_factory()
+        try:
+            doomed = select(*model.__table__.primary_key.columns).where(column < cutoff).limit(batch_size)
+            count = db.execute(delete(model).where(pk.in_(doomed))).rowcount
+            db.commit()
+        finally:
+            db.close()
+        removed += count
+        if count < batch_size:
+            return removed
+
+
+def prune_telemetry(session_factory: Callable = SessionLocal, now: Optional[datetime] = None) -> dict:
+    """
+    Apply TELEMETRY_*_RETENTION_DAYS to raw rows and the 1m / 1h rollups.
+    """
+    now = now or datetime.utcnow()
+    policies = [
+        ("raw", Telemetry, Telemetry.recorded_at, settings.TELEMETRY_RAW_RETENTION_DAYS),
+        ("1m", TelemetryRollup1m, TelemetryRollup1m.bucket_start, settings.TELEMETRY_1M_RETENTION_DAYS),
+        ("1h", TelemetryRollup1h, TelemetryRollup1h.bucket_start, settings.TELEMETRY_1H_RETENTION_DAYS),
+    ]
+    removed = {}
+    for name, model, column, days in policies:
+        if days > 0:
+            removed[name] = _prune_table(
+                session_factory, model, column, now - timedelta(days=days), settings.TELEMETRY_PRUNE_BATCH_SIZE,
+            )
+    return removed
+
+
+async def prune_periodically(interval: float):
+    """
+    Background task: enforce telemetry retention every `interval` seconds.
+    """
+    while True:
+        try:
+            removed = await asyncio.to_thread(prune_telemetry)
+            if any(removed.values()):
+                logger.info("telemetry retention pruned %s", removed)
+        except Exception:
+            logger.exception("telemetry retention run failed")
+        await asyncio.sleep(interval)
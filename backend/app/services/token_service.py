@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.models.db_models import TokenBlocklist
+from app.services.auth_cache import revoked_tokens
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
@@ -43,14 +44,18 @@ def create_refresh_token(subject: Dict[str, Any], expires_days: Optional[int] =
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return {"token": token, "jti": jti, "expires": expire}
 
-def revoke_token(db: Session, jti: str, token_type: str = "refresh"):
+def revoke_token(db: Session, jti: str, token_type: str = "refresh", expires_at=None):
     """
-    Add token jti to blocklist (revoke).
+    Add token jti to blocklist (revoke). Pass the token's `exp` (datetime
+    or epoch seconds) so the entry can be forgotten once the token expires.
     """
-    tb = TokenBlocklist(jti=jti, token_type=token_type)
+    if isinstance(expires_at, (int, float)):
+        expires_at = datetime.utcfromtimestamp(expires_at)
+    tb = TokenBlocklist(jti=jti, token_type=token_type, expires_at=expires_at)
     db.add(tb)
     db.commit()
     db.refresh(tb)
+    revoked_tokens.add(jti, (expires_at - datetime(1970, 1, 1)).total_seconds() if expires_at else None)
     return tb
 
 def is_token_revoked(db: Session, jti: str) -> bool:
@@ -59,12 +64,17 @@ def is_token_revoked(db: Session, jti: str) -> bool:
     """
     if not jti:
         return True
-    exists = db.query(TokenBlocklist).filter(TokenBlocklist.jti == jti).first()
+    exists = (
+        db.query(TokenBlocklist.id)
+        .filter(TokenBlocklist.jti == jti, TokenBlocklist.revoked.isnot(False))
+        .first()
+    )
     return exists is not None
 
 def decode_token(token: str) -> Dict[str, Any]:
     """
     Decode token and return payload; raises JWTError on failure.
     """
-    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    # `sub` is a dict ({"user_id": ...}), not the string the JWT spec expects
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_sub": False})
     return payload
@@ -1,29 +1,55 @@
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.models.db_models import User
-from app.core.security import hash_password, verify_password, create_jwt_token
+from app.services.pagination import Page, keyset_page
+from app.core.security import password_hasher
+from app.services.token_service import create_access_token
 from fastapi import HTTPException
 
-def create_user(db: Session, username: str, email: str, password: str):
-    existing = db.query(User).filter(User.email == email).first()
+
+def _find_user(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+
+def _add_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+async def create_user(db: Session, username: str, email: str, password: str):
+    existing = await run_in_threadpool(_find_user, db, email)
     if existing:
         raise HTTPException(status_code=400, detail="User already exists")
 
     user = User(
         username=username,
         email=email,
-        password_hash=hash_password(password)
+        password_hash=await password_hasher.hash(password)
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await run_in_threadpool(_add_user, db, user)
 
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.password_hash):
+async def authenticate_user(db: Session, email: str, password: str):
+    user = await run_in_threadpool(_find_user, db, email)
+    if not user or not await password_hasher.verify(password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    token = create_jwt_token({"user_id": user.id})
+    token = create_access_token({"user_id": user.id})["token"]
     return token, user
 
+
+# Public profile columns for listings / exports (never password_hash)
+USER_COLUMNS = (User.id, User.username, User.email, User.created_at)
+
+
+async def list_users_page(db: AsyncSession, limit: int, cursor: Optional[str] = None) -> Page:
+    return await keyset_page(db, select(*USER_COLUMNS), User, limit, cursor)
+
+
+def user_export_query():
+    return select(*USER_COLUMNS)
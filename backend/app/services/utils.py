@@ -3,19 +3,15 @@ import uuid
 import logging
 from urllib.parse import urlparse
 
+import numpy as np
 from fastapi import HTTPException
 from PIL import Image
 from io import BytesIO
 
 # ---------------------------------------------------
-# Logger Setup
+# Logger (handlers are configured once in app.core.logger)
 # ---------------------------------------------------
 logger = logging.getLogger("agromind")
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-formatter = logging.Formatter("[%(levelname)s] %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
 
 
 # ---------------------------------------------------
@@ -76,19 +72,39 @@ def error(message: str):
 # ---------------------------------------------------
 # Sanity Checks for Crop Model Inputs
 # ---------------------------------------------------
+# (field, low, high, error message) — shared by the single and batch checks
+CROP_INPUT_RANGES = (
+    ("temperature", 0, 60, "Temperature out of valid range (0–60°C)"),
+    ("humidity", 0, 100, "Humidity out of valid range (0–100%)"),
+    ("rainfall", 0, 1000, "Rainfall must be between 0–1000 mm"),
+)
+
+
 def validate_crop_inputs(temperature: float, humidity: float, rainfall: float):
     """
     Ensures values are within realistic Indian agricultural ranges.
     Prevents garbage input from breaking your ML model.
     """
-    if not (0 <= temperature <= 60):
-        raise HTTPException(status_code=400, detail="Temperature out of valid range (0–60°C)")
+    values = {"temperature": temperature, "humidity": humidity, "rainfall": rainfall}
+    for field, low, high, message in CROP_INPUT_RANGES:
+        if not (low <= values[field] <= high):
+            raise HTTPException(status_code=400, detail=message)
 
-    if not (0 <= humidity <= 100):
-        raise HTTPException(status_code=400, detail="Humidity out of valid range (0–100%)")
 
-    if not (0 <= rainfall <= 1000):
-        raise HTTPException(status_code=400, detail="Rainfall must be between 0–1000 mm")
+def validate_crop_inputs_batch(temperature: np.ndarray, humidity: np.ndarray, rainfall: np.ndarray) -> np.ndarray:
+    """
+    Vectorized validate_crop_inputs for whole columns.
+    Returns an object array with the first error message per row ("" when valid).
+    NaN (missing / non-numeric) values fail their range check.
+    """
+    values = {"temperature": temperature, "humidity": humidity, "rainfall": rainfall}
+    errors = np.full(len(temperature), "", dtype=object)
+    # Walk the checks in reverse so the first failing check wins, as in the scalar version
+    for field, low, high, message in reversed(CROP_INPUT_RANGES):
+        column = values[field]
+        bad = ~((column >= low) & (column <= high))
+        errors[bad] = message
+    return errors
 
 
 # ---------------------------------------------------
@@ -97,5 +113,6 @@ def validate_crop_inputs(temperature: float, humidity: float, rainfall: float):
 def log_event(event: str, **meta):
     """
     Unified logging for all events: predictions, feedback, errors, etc.
+    Formatted lazily by the logging listener thread.
     """
-    logger.info(f"{event} | {meta}")
+    logger.info("%s | %s", event, meta)
@@ -0,0 +1,174 @@
+# backend/app/services/write_behind.py
+"""
+Write-behind persistence for uploaded files.
+
+Handlers enqueue uploaded image bytes and return; a background task
+stores them through the storage backend in batches, so response latency
+no longer includes disk / object-store time. (PredictionLog rows go
+through app.services.prediction_log_service.prediction_sink.)
+
+The queue is bounded by item count and by bytes: when the writer falls
+`max_queue` items or `max_bytes` of file content behind, `enqueue_file`
+waits for room (backpressure) instead of growing memory. Bytes count
+until written; a single file larger than `max_bytes` still goes through
+once nothing else is buffered.
+`stop()` drains everything still queued (called on app shutdown).
+"""
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.loops import rebind_loop
+from app.core.metrics import register_queue
+from app.services.storage import StorageBackend, get_storage
+
+logger = logging.getLogger("agromind")
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        max_queue: int = 1000,
+        batch_size: int = 100,
+        storage: Optional[StorageBackend] = None,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self._storage = storage
+        self.max_queue = max_queue
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._room: Optional[asyncio.Condition] = None
+        self._bytes = 0  # content enqueued and not yet written
+
+        self.enqueued = 0
+        self.files_written = 0
+        self.batches = 0
+        self.errors = 0
+        self.backpressure_waits = 0
+        self.last_batch_ms = 0.0
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    async def enqueue_file(self, key: str, content):
+        """
+        Store `content` (bytes / bytearray) under `key` in the storage
+        backend in the background.
+        """
+        await self._put(("file", key, content), len(content))
+
+    async def flush(self):
+        """
+        Wait until everything enqueued so far has been written.
+        """
+        if self._queue is not None and self._worker is not None and not self._worker.done():
+            await self._queue.join()
+
+    async def stop(self):
+        """
+        Flush pending writes, then stop the worker.
+        """
+        await self.flush()
+        worker, self._worker = self._worker, None
+        if worker is not None and not worker.done():
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def queued_bytes(self) -> int:
+        return self._bytes
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth(),
+            "max_queue": self.max_queue,
+            "queued_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "enqueued": self.enqueued,
+            "files_written": self.files_written,
+            "batches": self.batches,
+            "errors": self.errors,
+            "backpressure_waits": self.backpressure_waits,
+            "last_batch_ms": round(self.last_batch_ms, 3),
+        }
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    def _fits(self, size: int) -> bool:
+        return self._bytes == 0 or self._bytes + size <= self.max_bytes
+
+    async def _put(self, item: tuple, size: int):
+        self._ensure_worker()
+        if self._queue.full() or not self._fits(size):
+            self.backpressure_waits += 1
+        async with self._room:
+            await self._room.wait_for(lambda: self._fits(size))
+            self._bytes += size
+        try:
+            await self._queue.put(item)
+        except BaseException:
+            await self._release(size)
+            raise
+        self.enqueued += 1
+
+    async def _release(self, size: int):
+        async with self._room:
+            self._bytes -= size
+            self._room.notify_all()
+
+    def _ensure_worker(self):
+        loop, moved = rebind_loop(self._loop)
+        if moved or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._room = asyncio.Condition()
+            self._bytes = 0
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception:
+                self.errors += 1
+                logger.exception("write-behind batch of %d failed", len(batch))
+            finally:
+                await self._release(sum(len(content) for _, _, content in batch))
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: List[tuple]):
+        started = time.perf_counter()
+        storage = self._storage or get_storage()
+        for _, key, content in batch:
+            try:
+                storage.save(key, content)
+                self.files_written += 1
+            except Exception:
+                self.errors += 1
+                logger.exception("write-behind could not write %s", key)
+        self.batches += 1
+        self.last_batch_ms = (time.perf_counter() - started) * 1000
+
+
+write_behind = WriteBehindQueue(
+    max_queue=settings.WRITE_BEHIND_MAX_QUEUE,
+    max_bytes=settings.WRITE_BEHIND_MAX_BYTES,
+    batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+)
+register_queue("write_behind", write_behind.queue_depth)
@@ -0,0 +1,109 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.api.deps import get_current_user
+from app.models.db_models import TokenBlocklist, User
+from app.services.auth_cache import RevocationSet, TTLCache, clear_auth_caches, revoked_tokens
+from app.services.database import Base
+from app.services.token_service import create_access_token, revoke_token
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'auth.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, username="asha", email="asha@example.com", password_hash="x"))
+    session.commit()
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    clear_auth_caches()
+    session.queries = queries
+    yield session
+    session.close()
+    clear_auth_caches()
+
+
+def test_warm_request_does_no_queries(db):
+    token = create_access_token({"user_id": 1})["token"]
+    assert get_current_user(token, db).username == "asha"
+    cold = len(db.queries)
+    assert cold >= 2  # blocklist sync + user row
+
+    for _ in range(5):
+        assert get_current_user(token, db).id == 1
+    assert len(db.queries) == cold
+
+
+def test_logout_revokes_immediately(db):
+    access = create_access_token({"user_id": 1})
+    get_current_user(access["token"], db)
+
+    revoke_token(db, access["jti"], token_type="access")
+    with pytest.raises(HTTPException) as exc:
+        get_current_user(access["token"], db)
+    assert exc.value.status_code == 401
+
+
+def test_revocation_from_another_worker_is_synced(db):
+    access = create_access_token({"user_id": 1})
+    get_current_user(access["token"], db)
+
+    revoke_token(db, access["jti"], token_type="access", expires_at=access["expires"])
+    revoked_tokens.clear()  # simulate a worker that did not see the logout
+    revoked_tokens.sync(db, force=True)
+    assert access["jti"] in revoked_tokens
+
+
+def test_revocations_expire_and_late_commits_are_seen(db):
+    now = datetime.utcnow()
+    revocations = RevocationSet(sync_interval=0, overlap=60, reload_interval=3600)
+    db.add_all([
+        TokenBlocklist(jti="live", created_at=now, expires_at=now + timedelta(hours=1)),
+        TokenBlocklist(jti="expired", created_at=now - timedelta(days=2), expires_at=now - timedelta(days=1)),
+        TokenBlocklist(jti="unrevoked", created_at=now, expires_at=now + timedelta(hours=1), revoked=False),
+    ])
+    db.commit()
+    revocations.sync(db)
+    assert "live" in revocations
+    assert "expired" not in revocations and "unrevoked" not in revocations
+    assert revocations.stats()["revoked"] == 1
+
+    # committed after a newer row was synced, with an older created_at
+    db.add(TokenBlocklist(jti="newer", created_at=now + timedelta(seconds=5), expires_at=now + timedelta(hours=1)))
+    db.commit()
+    revocations.sync(db)
+    db.add(TokenBlocklist(jti="late", created_at=now + timedelta(seconds=1), expires_at=now + timedelta(hours=1)))
+    db.commit()
+    revocations.sync(db)
+    assert "newer" in revocations and "late" in revocations
+
+    # un-revoking is picked up too
+    db.query(TokenBlocklist).filter(TokenBlocklist.jti == "late").update({"revoked": False})
+    db.commit()
+    revocations.sync(db)
+    assert "late" not in revocations
+
+
+def test_invalid_and_expired_tokens_rejected(db):
+    with pytest.raises(HTTPException):
+        get_current_user("not-a-jwt", db)
+    expired = create_access_token({"user_id": 1}, expires_minutes=-1)["token"]
+    with pytest.raises(HTTPException):
+        get_current_user(expired, db)
+
+
+def test_ttl_cache_expiry_and_lru():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, expires_at=time.time() - 1)  # already expired: not stored
+    assert cache.get("b") is None
+    cache.set("c", 3)
+    cache.set("d", 4)  # evicts a
+    assert cache.get("a") is None
+    assert cache.get("d") == 4
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.ml.batching import MicroBatcher
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+
+    def predict_batch(items):
+        calls.append(list(items))
+        return [x * 2 for x in items]
+
+    batcher = MicroBatcher(predict_batch, max_batch_size=8, max_wait_ms=20)
+
+    async def run():
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(run()) == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+
+    metrics = batcher.metrics()
+    assert metrics["batches"] == 1
+    assert metrics["requests"] == 5
+    assert metrics["batch_size_histogram"]["8"] == 1
+
+
+def test_max_batch_size_splits_batches():
+    sizes = []
+
+    def predict_batch(items):
+        sizes.append(len(items))
+        return items
+
+    batcher = MicroBatcher(predict_batch, max_batch_size=3, max_wait_ms=20)
+
+    async def run():
+        await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+        await batcher.stop()
+
+    asyncio.run(run())
+    assert sizes == [3, 3, 1]
+
+
+def test_errors_propagate_to_every_caller():
+    def predict_batch(items):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(predict_batch, max_batch_size=4, max_wait_ms=5)
+
+    async def run():
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert batcher.metrics()["errors"] == 1
+
+
+def test_invalid_batch_size():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda items: items, max_batch_size=0)
+
+
+def test_exception_result_fails_only_its_caller():
+    def predict_batch(items):
+        return [ValueError("bad item") if x < 0 else x * 2 for x in items]
+
+    batcher = MicroBatcher(predict_batch, max_batch_size=8, max_wait_ms=20)
+
+    async def run():
+        results = await asyncio.gather(*(batcher.submit(i) for i in (1, -1, 2)), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    ok, bad, ok2 = asyncio.run(run())
+    assert (ok, ok2) == (2, 4)
+    assert isinstance(bad, ValueError)
+    assert batcher.metrics()["errors"] == 1
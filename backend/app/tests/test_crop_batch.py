@@ -0,0 +1,115 @@
+import asyncio
+
+import numpy as np
+
+from app.ml_services import crop_services
+from app.models import ml_crop_model
+from app.services.utils import validate_crop_inputs_batch
+
+
+def _body(*chunks):
+    async def gen():
+        for chunk in chunks:
+            yield chunk
+    return gen()
+
+
+def _run(body, fmt, chunk_size=2):
+    async def collect():
+        return [line async for line in crop_services.stream_batch_recommendations(body, fmt, chunk_size)]
+    return "".join(asyncio.run(collect())).splitlines()
+
+
+class _Sink:
+    def __init__(self):
+        self.records = []
+
+    def record(self, *args, **kwargs):
+        self.records.append(args)
+
+
+def _fake_model(monkeypatch):
+    async def fake_batch(features):
+        # label encodes the soil code so row alignment is checked
+        return [f"crop-{int(code)}" for code in features[:, 0]], "v1"
+    monkeypatch.setattr(ml_crop_model, "model_available", lambda: True)
+    monkeypatch.setattr(ml_crop_model, "recommend_crops_batch", fake_batch)
+    sink = _Sink()
+    monkeypatch.setattr(crop_services, "prediction_sink", sink)
+    return sink
+
+
+def test_encode_soil_types_vectorized():
+    codes = ml_crop_model.encode_soil_types(["Loamy", " clay ", "peat", "sandy"])
+    assert codes.tolist() == [1, 4, -1, 0]
+
+
+def test_validate_batch_matches_scalar_priority():
+    errors = validate_crop_inputs_batch(
+        np.array([25.0, 70.0, 25.0, np.nan]),
+        np.array([50.0, 150.0, 50.0, 50.0]),
+        np.array([100.0, 100.0, 5000.0, 100.0]),
+    )
+    assert errors[0] == ""
+    assert errors[1].startswith("Temperature")
+    assert errors[2].startswith("Rainfall")
+    assert errors[3].startswith("Temperature")
+
+
+def test_ndjson_stream_split_across_chunks(monkeypatch):
+    sink = _fake_model(monkeypatch)
+    lines = _run(_body(
+        b'{"soil_type": "loamy", "temperature": 28, "humidity": 60, "rainfall": 140}\n{"soil_ty',
+        b'pe": "peat", "temperature": 28, "humidity": 60, "rainfall": 140}\nnot json\n',
+        b'{"soil_type": "clay", "temperature": 20, "humidity": 70, "rainfall": 90}',
+    ), "ndjson")
+    assert lines[0] == '{"row": 0, "recommended_crop": "crop-1", "model_version": "v1"}'
+    assert '"Invalid soil type"' in lines[1]
+    assert '"Invalid JSON line"' in lines[2]
+    assert lines[3] == '{"row": 3, "recommended_crop": "crop-4", "model_version": "v1"}'
+    assert lines[4] == '{"summary": {"rows": 4, "ok": 2, "errors": 2}}'
+    assert sink.records == [("crop_batch", "ndjson", {"rows": 4, "ok": 2, "errors": 2})]
+
+
+def test_csv_and_json_array(monkeypatch):
+    _fake_model(monkeypatch)
+    csv_lines = _run(_body(b"soil_type,temperature,humidity,rainfall\nred,30,40,200\nblack,abc,40,200\n"), "csv")
+    assert csv_lines[0] == '{"row": 0, "recommended_crop": "crop-3", "model_version": "v1"}'
+    assert "Temperature" in csv_lines[1]
+
+    json_lines = _run(_body(b'[{"soil_type": "sandy", "temperature": 1, "humidity": 2, "rainfall": 3}]'), "json")
+    assert json_lines[0] == '{"row": 0, "recommended_crop": "crop-0", "model_version": "v1"}'
+
+
+def test_detect_batch_format():
+    assert crop_services.detect_batch_format("text/csv; charset=utf-8") == "csv"
+    assert crop_services.detect_batch_format("application/x-ndjson") == "ndjson"
+    assert crop_services.detect_batch_format(None) == "json"
+    assert crop_services.detect_batch_format("text/plain") is None
+
+
+def test_invalid_utf8_rows_are_reported_not_raised(monkeypatch):
+    _fake_model(monkeypatch)
+    good = '{"soil_type": "loamy", "temperature": 28, "humidity": 60, "rainfall": 140}\n'.encode()
+    # multi-byte character split across chunks stays intact; a bad byte only fails its row
+    lines = _run(_body(good, b'{"soil_type": "clay", "note": "\xc3', b'\xa9", "temperature": 20, '
+                       b'"humidity": 70, "rainfall": 90}\n\xff\xfe\n', good), "ndjson")
+    assert lines[0].endswith('"crop-1", "model_version": "v1"}')
+    assert lines[1] == '{"row": 1, "recommended_crop": "crop-4", "model_version": "v1"}'
+    assert lines[2] == '{"row": 2, "error": "Invalid UTF-8"}'
+    assert lines[3].startswith('{"row": 3, "recommended_crop"')
+
+    csv_lines = _run(_body(b"soil_type,temperature,humidity,rainfall\nred,30,40,200\n\xffred,30,40,200\n"), "csv")
+    assert csv_lines[1] == '{"row": 1, "error": "Invalid UTF-8"}'
+
+
+def test_json_array_body_is_capped(monkeypatch):
+    _fake_model(monkeypatch)
+
+    async def collect():
+        body = _body(b'[{"soil_type": "sandy", ', b'"temperature": 1, "humidity": 2, "rainfall": 3}]')
+        return [line async for line in crop_services.stream_batch_recommendations(body, "json", 2, max_json_bytes=30)]
+
+    lines = "".join(asyncio.run(collect())).splitlines()
+    assert "JSON body over 30 bytes" in lines[0]
+    assert lines[1] == '{"summary": {"rows": 1, "ok": 0, "errors": 1}}'
@@ -0,0 +1,87 @@
+import asyncio
+
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+
+from app.ml.crop_memo import CropLookupTable, QuantizedMemo
+from app.ml.executor import rank_with_model
+from app.models import ml_crop_model
+
+
+def test_quantize_groups_sensor_noise():
+    memo = QuantizedMemo(steps=(0.5, 1.0, 5.0))
+    key_a, snapped_a = memo.quantize(1, 28.1, 60.4, 141.0)
+    key_b, _ = memo.quantize(1, 27.9, 59.6, 139.0)
+    key_c, _ = memo.quantize(2, 28.1, 60.4, 141.0)
+    assert key_a == key_b != key_c
+    assert snapped_a == (28.0, 60.0, 140.0)
+
+
+def test_memo_lru_and_hit_rate():
+    memo = QuantizedMemo(max_entries=1)
+    memo.set((0, 1, 1, 1), [("rice", 0.9)])
+    assert memo.get((0, 1, 1, 1)) == [("rice", 0.9)]
+    memo.set((0, 2, 2, 2), [("wheat", 0.8)])
+    assert memo.get((0, 1, 1, 1)) is None
+    assert memo.stats()["hit_rate"] == 0.5
+
+
+def test_lookup_table_matches_model():
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.integers(0, 2, 200), rng.uniform(0, 4, 200), rng.uniform(0, 4, 200), rng.uniform(0, 10, 200)])
+    y = np.where(X[:, 1] > 2, "rice", np.where(X[:, 3] > 5, "maize", "wheat"))
+    model = DecisionTreeClassifier(random_state=0).fit(X, y)
+
+    memo = QuantizedMemo(steps=(1.0, 1.0, 5.0))
+    lut = CropLookupTable(memo, n_soils=2, ranges=[(0, 4), (0, 4), (0, 10)], k=2)
+    lut.build(list(model.classes_), model.predict_proba)
+    assert lut.ready
+
+    key, snapped = memo.quantize(1, 3.2, 1.0, 9.0)
+    expected = rank_with_model(model, np.array([[1, *snapped]]), 2)[0]
+    assert [label for label, _ in lut.lookup(key)] == [label for label, _ in expected]
+    # out of range -> fall back to memo/model
+    assert lut.lookup(memo.quantize(1, 50.0, 1.0, 9.0)[0]) is None
+
+
+def test_top_k_reuses_memo(monkeypatch):
+    calls = []
+
+    class FakeExecutor:
+        async def rank_features(self, name, features, k):
+            calls.append(features.tolist())
+            return [[("rice", 0.7), ("maize", 0.2), ("wheat", 0.1)]], "v1"
+
+    monkeypatch.setattr(ml_crop_model, "model_available", lambda: True)
+    monkeypatch.setattr(ml_crop_model, "model_version", lambda: "v1")
+    monkeypatch.setattr(ml_crop_model, "get_inference_executor", lambda: FakeExecutor())
+    ml_crop_model.crop_memo._entries.clear()
+
+    async def run():
+        first = await ml_crop_model.recommend_crop_top_k("loamy", 28.1, 60.2, 141.0, k=2)
+        second = await ml_crop_model.recommend_crop_top_k("Loamy", 27.9, 59.8, 139.0, k=3)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["candidates"] == [{"crop": "rice", "probability": 0.7}, {"crop": "maize", "probability": 0.2}]
+    assert first["model_version"] == "v1"
+    assert len(second["candidates"]) == 3
+    assert calls == [[[1.0, 28.0, 60.0, 140.0]]]
+
+
+def test_batch_scores_the_same_snapped_inputs(monkeypatch):
+    calls = []
+
+    class FakeExecutor:
+        async def predict_features(self, name, features):
+            calls.append(features.tolist())
+            return ["rice"] * len(features), "v1"
+
+    monkeypatch.setattr(ml_crop_model, "model_available", lambda: True)
+    monkeypatch.setattr(ml_crop_model, "get_inference_executor", lambda: FakeExecutor())
+
+    features = np.array([[1, 28.1, 60.2, 141.0], [2, 27.9, 59.8, 139.0]])
+    labels, version = asyncio.run(ml_crop_model.recommend_crops_batch(features))
+    assert (labels, version) == (["rice", "rice"], "v1")
+    snapped = [list(ml_crop_model.crop_memo.quantize(int(row[0]), *row[1:])[1]) for row in features]
+    assert [row[1:] for row in calls[0]] == snapped == [[28.0, 60.0, 140.0]] * 2
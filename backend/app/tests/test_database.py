@@ -0,0 +1,65 @@
+import asyncio
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.services.database import (
+    Base, async_url, engine_options, install_sqlite_pragmas,
+)
+from app.services.feedback_service import create_feedback, list_feedback_page
+
+
+def test_async_url_maps_drivers():
+    assert async_url("sqlite:///./agromind.db") == "sqlite+aiosqlite:///./agromind.db"
+    assert async_url("postgresql://u:p@db:5432/agro") == "postgresql+asyncpg://u:p@db:5432/agro"
+    assert async_url("postgresql+psycopg2://u:p@db/agro") == "postgresql+asyncpg://u:p@db/agro"
+    assert async_url("mysql+pymysql://u@db/agro") == "mysql+pymysql://u@db/agro"
+
+
+def test_engine_options_pool_settings():
+    pg = engine_options("postgresql+asyncpg://u:p@db/agro")
+    assert pg["pool_pre_ping"] is True and pg["pool_size"] > 0 and pg["pool_recycle"] > 0
+    # aiosqlite would otherwise open a connection (and thread) per session
+    assert engine_options("sqlite+aiosqlite:///x.db")["poolclass"] is AsyncAdaptedQueuePool
+    assert "pool_size" not in engine_options("sqlite://")
+
+
+def test_sqlite_pragmas_on_sync_and_async_engines(tmp_path):
+    url = f"sqlite:///{tmp_path / 'pragmas.db'}"
+    engine = create_engine(url, **engine_options(url))
+    install_sqlite_pragmas(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+    async def check_async():
+        aengine = create_async_engine(async_url(url), **engine_options(async_url(url)))
+        install_sqlite_pragmas(aengine.sync_engine)
+        async with aengine.connect() as conn:
+            sync_mode = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+        await aengine.dispose()
+        return sync_mode
+
+    assert asyncio.run(check_async()) == 1
+
+
+def test_feedback_service_on_async_session(tmp_path):
+    url = f"sqlite:///{tmp_path / 'feedback.db'}"
+    Base.metadata.create_all(create_engine(url))
+
+    async def run():
+        aengine = create_async_engine(async_url(url), **engine_options(async_url(url)))
+        install_sqlite_pragmas(aengine.sync_engine)
+        sessions = async_sessionmaker(aengine, expire_on_commit=False)
+        async with sessions() as db:
+            first = await create_feedback(db, 1, "first", "Healthy")
+            await create_feedback(db, 1, "second")
+            # attributes stay loaded after commit (no lazy refresh in async)
+            assert first.id == 1 and first.message == "first"
+        async with sessions() as db:
+            messages = [row.message for row in (await list_feedback_page(db, 10)).items]
+        await aengine.dispose()
+        return messages
+
+    assert sorted(asyncio.run(run())) == ["first", "second"]
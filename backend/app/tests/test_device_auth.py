@@ -0,0 +1,82 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.api.deps import get_current_device
+from app.models.db_models import Device
+from app.services.database import Base
+from app.services.device_auth import (
+    device_cache, hash_device_token, issue_device_token, rotate_device_token,
+)
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'devices.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    device_cache.clear()
+    session.queries = queries
+    session.engine = engine
+    yield session
+    session.close()
+    device_cache.clear()
+
+
+def _register(db, device_id="soil-01"):
+    token, token_hash = issue_device_token()
+    db.add(Device(device_id=device_id, name="probe", cred_token_hash=token_hash))
+    db.commit()
+    return token
+
+
+def test_only_the_hash_is_stored_under_a_unique_index(db):
+    token = _register(db)
+    stored = db.query(Device).one().cred_token_hash
+    assert stored == hash_device_token(token) and token not in stored
+    indexes = {ix["name"]: ix for ix in inspect(db.engine).get_indexes("devices")}
+    assert any(ix["column_names"] == ["cred_token_hash"] and ix["unique"] for ix in indexes.values())
+
+
+def test_warm_lookup_does_no_queries(db):
+    token = _register(db)
+    assert get_current_device(token, db).device_id == "soil-01"
+    cold = len(db.queries)
+    for _ in range(5):
+        assert get_current_device(token, db).device_id == "soil-01"
+    assert len(db.queries) == cold
+
+
+def test_missing_or_unknown_token_is_401(db):
+    _register(db)
+    for token in (None, "", "not-a-token"):
+        with pytest.raises(HTTPException) as exc:
+            get_current_device(token, db)
+        assert exc.value.status_code == 401
+
+
+def test_rotation_evicts_old_token_immediately(db):
+    old = _register(db)
+    get_current_device(old, db)  # cached
+
+    device = db.query(Device).filter(Device.device_id == "soil-01").one()
+    new = rotate_device_token(db, device)
+
+    with pytest.raises(HTTPException):
+        get_current_device(old, db)
+    assert get_current_device(new, db).device_id == "soil-01"
+
+
+def test_cache_entries_expire(db, monkeypatch):
+    token = _register(db)
+    get_current_device(token, db)
+    cold = len(db.queries)
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + device_cache.ttl + 1)
+    get_current_device(token, db)
+    assert len(db.queries) > cold
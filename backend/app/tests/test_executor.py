@@ -0,0 +1,70 @@
+import asyncio
+import io
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import joblib
+import numpy as np
+import pytest
+from PIL import Image
+from sklearn.dummy import DummyClassifier
+
+from app.ml.executor import InferenceExecutor
+from app.ml.preprocessing import ImageDecodeError
+from app.ml.registry import ModelRegistry
+
+
+def _jpeg(color, size=(200, 150)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_process_pool_predicts_images_and_features(tmp_path):
+    disease = DummyClassifier(strategy="constant", constant="healthy")
+    disease.fit(np.zeros((2, 128 * 128 * 3)), ["healthy", "rust"])
+    crop = DummyClassifier(strategy="constant", constant="rice")
+    crop.fit(np.zeros((2, 4)), ["rice", "wheat"])
+    joblib.dump(disease, tmp_path / "disease.pkl")
+    joblib.dump(crop, tmp_path / "crop.pkl")
+
+    registry = ModelRegistry()
+    registry.register("disease", str(tmp_path / "disease.pkl"))
+    registry.register("crop", str(tmp_path / "crop.pkl"))
+    registry.refresh()  # as the app's startup hook does, off the event loop
+    executor = InferenceExecutor(registry, ["disease", "crop"], max_workers=1, max_in_flight=2)
+
+    async def run():
+        labels = await executor.predict_images([_jpeg("green"), _jpeg("brown", (640, 480))])
+        crops = await executor.predict_features("crop", np.array([[1, 28.0, 60.0, 140.0]]))
+        # a truncated upload fails alone; the rest of the batch is predicted
+        mixed = await executor.predict_images([_jpeg("green"), _jpeg("brown")[:200], _jpeg("red")])
+        return labels, crops, mixed
+
+    try:
+        labels, crops, mixed = asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    assert labels == (["healthy", "healthy"], registry.version("disease"))
+    assert crops == (["rice"], registry.version("crop"))
+    assert executor.metrics()["in_flight"] == 0
+    good, bad, good2 = mixed[0]
+    assert (good, good2) == ("healthy", "healthy")
+    assert isinstance(bad, ImageDecodeError)
+
+
+def test_broken_pool_is_respawned(tmp_path):
+    registry = ModelRegistry()
+    executor = InferenceExecutor(registry, [], max_workers=1)
+
+    async def run():
+        with pytest.raises(BrokenProcessPool):
+            await executor._submit(os._exit, 1)  # worker dies mid-call
+        return await executor._submit(abs, -3)
+
+    try:
+        assert asyncio.run(run()) == 3
+    finally:
+        executor.shutdown()
+    assert executor.metrics()["respawns"] == 1
@@ -0,0 +1,156 @@
+import asyncio
+import io
+from datetime import datetime, timedelta
+
+import joblib
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from sklearn.dummy import DummyClassifier
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.ml.registry import ModelRegistry, model_registry
+from app.models.db_models import InferenceJob, PredictionLog
+from app.services import inference_jobs, storage as storage_module
+from app.services.database import Base
+from app.services.inference_jobs import DISEASE, create_job, dispatch_job, process_disease_jobs
+from app.services.storage import LocalStorage
+from app.workers import tasks
+from app.workers.celery_app import celery_app
+
+
+def _jpeg(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, features):
+        self.calls.append(len(features))
+        return np.array(["rust"] * len(features))
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    store = LocalStorage(tmp_path / "uploads")
+    for i in range(6):
+        store.save(f"disease_inputs/{i}.jpg", _jpeg("green"))
+    return store
+
+
+def _registry(tmp_path, model):
+    joblib.dump(model, tmp_path / "disease.pkl")
+    registry = ModelRegistry(mmap_mode=None)
+    registry.register(DISEASE, str(tmp_path / "disease.pkl"))
+    return registry
+
+
+def _job(sessions, key):
+    with sessions() as db:
+        return create_job(db, DISEASE, input_key=key)
+
+
+def test_eager_mode_runs_the_whole_flow(sessions, storage, tmp_path, monkeypatch):
+    model = DummyClassifier(strategy="constant", constant="healthy").fit(np.zeros((2, 4)), ["healthy", "rust"])
+    joblib.dump(model, tmp_path / "disease.pkl")
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+    monkeypatch.setattr(tasks, "SessionLocal", sessions)
+    monkeypatch.setattr(storage_module, "_storage", storage)
+    model_registry.register(DISEASE, str(tmp_path / "disease.pkl"))
+    try:
+        job = _job(sessions, "disease_inputs/0.jpg")
+        assert job.status == "queued"
+        asyncio.run(dispatch_job(job, sessions))
+    finally:
+        model_registry.register(DISEASE, settings.MODEL_PATH)
+
+    with sessions() as db:
+        stored = db.get(InferenceJob, job.id)
+        assert stored.status == "done" and stored.finished_at is not None
+        assert stored.result == {"disease": "healthy", "model_version": stored.result["model_version"]}
+        assert db.query(PredictionLog).one().input_ref == "disease_inputs/0.jpg"
+
+
+def test_worker_claims_queued_jobs_as_one_batch(sessions, storage, tmp_path, monkeypatch):
+    model = CountingModel()
+    registry = _registry(tmp_path, model)
+    jobs = [_job(sessions, f"disease_inputs/{i}.jpg") for i in range(4)]
+    missing = _job(sessions, "disease_inputs/missing.jpg")
+    extra = _job(sessions, "disease_inputs/5.jpg")
+
+    loaded = registry.get(DISEASE)
+    assert process_disease_jobs(jobs[2].id, sessions, storage, registry, batch_size=5) == 5
+    assert loaded.model.calls == [4]  # one predict for the four readable images
+    with sessions() as db:
+        assert db.get(InferenceJob, extra.id).status == "queued"  # past the batch size
+
+    # the task of an answered job still picks up whatever is queued
+    assert process_disease_jobs(jobs[0].id, sessions, storage, registry, batch_size=5) == 1
+    assert process_disease_jobs(extra.id, sessions, storage, registry, batch_size=5) == 0
+    assert loaded.model.calls == [4, 1]
+
+    with sessions() as db:
+        statuses = {job.id: db.get(InferenceJob, job.id) for job in jobs + [missing, extra]}
+        assert all(statuses[job.id].result["disease"] == "rust" for job in jobs)
+        assert (statuses[missing.id].status, statuses[missing.id].error) == ("failed", "Could not load image")
+        assert statuses[extra.id].status == "done"
+
+
+def test_stale_running_job_is_claimed_again(sessions, storage, tmp_path):
+    registry = _registry(tmp_path, CountingModel())
+    job = _job(sessions, "disease_inputs/1.jpg")
+    with sessions() as db:
+        row = db.get(InferenceJob, job.id)
+        row.status, row.started_at = "running", datetime.utcnow()
+        db.commit()
+    assert process_disease_jobs(job.id, sessions, storage, registry) == 0
+
+    with sessions() as db:
+        db.get(InferenceJob, job.id).started_at = datetime.utcnow() - timedelta(hours=1)
+        db.commit()
+    assert process_disease_jobs(job.id, sessions, storage, registry) == 1
+    with sessions() as db:
+        assert db.get(InferenceJob, job.id).status == "done"
+
+
+def test_unreachable_broker_fails_the_job(sessions, monkeypatch):
+    def broken(job):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr(inference_jobs, "enqueue_job", broken)
+    job = _job(sessions, "disease_inputs/0.jpg")
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(dispatch_job(job, sessions))
+    assert exc.value.status_code == 503
+    with sessions() as db:
+        assert db.get(InferenceJob, job.id).status == "failed"
+
+
+def test_claim_is_fair_across_classes_and_devices(sessions, storage, tmp_path):
+    registry = _registry(tmp_path, CountingModel())
+    def job(key, priority, tenant):
+        with sessions() as db:
+            return create_job(db, DISEASE, input_key=key, priority=priority, tenant=tenant).id
+
+    burst = [job("disease_inputs/0.jpg", "device", "device:1") for _ in range(10)]
+    other = job("disease_inputs/1.jpg", "device", "device:2")
+    user = job("disease_inputs/2.jpg", "interactive", "user:7")
+
+    assert process_disease_jobs(burst[5], sessions, storage, registry, batch_size=3) == 3
+    with sessions() as db:
+        done = {row.id for row in db.query(InferenceJob).filter(InferenceJob.status == "done")}
+    assert done == {user, burst[0], other}
@@ -0,0 +1,75 @@
+import asyncio
+import subprocess
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+
+
+def _sample(name, labels):
+    from prometheus_client import REGISTRY
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_route_latency_uses_route_template():
+    app = FastAPI()
+    app.add_middleware(metrics.PrometheusMiddleware)
+
+    @app.get("/users/{user_id}")
+    def get_user(user_id: int):
+        return {"id": user_id}
+
+    labels = {"method": "GET", "route": "/users/{user_id}", "status": "200"}
+    before = _sample("agromind_http_request_duration_seconds_count", labels)
+    client = TestClient(app)
+    client.get("/users/1")
+    client.get("/users/2")
+    assert _sample("agromind_http_request_duration_seconds_count", labels) == before + 2
+    client.get("/nope")
+    assert _sample("agromind_http_request_duration_seconds_count",
+                   {"method": "GET", "route": "unmatched", "status": "404"}) >= 1
+
+
+def test_runtime_sources_feed_gauges_and_counters():
+    stats = {"hits": 3, "misses": 1}
+    metrics.register_queue("test_queue", lambda: 7)
+    metrics.register_cache("test_cache", lambda: dict(stats))
+    versions = {"test_model": "aaa"}
+    metrics.register_model_versions(lambda: dict(versions))
+
+    metrics.refresh_runtime_metrics()
+    stats["hits"] = 5
+    versions["test_model"] = "bbb"
+    metrics.refresh_runtime_metrics()
+
+    assert _sample("agromind_queue_depth", {"queue": "test_queue"}) == 7
+    assert _sample("agromind_cache_requests_total", {"cache": "test_cache", "result": "hit"}) == 5
+    assert _sample("agromind_cache_requests_total", {"cache": "test_cache", "result": "miss"}) == 1
+    assert _sample("agromind_model_info", {"model": "test_model", "version": "aaa"}) == 0
+    assert _sample("agromind_model_info", {"model": "test_model", "version": "bbb"}) == 1
+    payload, content_type = metrics.render_metrics()
+    assert b"agromind_queue_depth" in payload and content_type.startswith("text/plain")
+
+
+WORKER = """
+import sys
+from app.core import metrics
+metrics.HTTP_REQUEST_SECONDS.labels("GET", "/health/", "200").observe(0.01)
+metrics.QUEUE_DEPTH.labels("disease_batcher").set(int(sys.argv[1]))
+"""
+
+
+def test_multiprocess_aggregation(tmp_path):
+    env = {"PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "SECRET_KEY": "x", "PATH": ""}
+    for depth in ("2", "3"):  # two "gunicorn workers"
+        subprocess.run([sys.executable, "-c", WORKER, depth], env=env, check=True)
+    render = subprocess.run(
+        [sys.executable, "-c", "from app.core import metrics; print(metrics.render_metrics()[0].decode())"],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    assert 'agromind_http_request_duration_seconds_count{method="GET",route="/health/",status="200"} 2.0' in render
+    # livesum only counts live processes; these workers have exited but
+    # were not marked dead, so both still contribute
+    assert 'agromind_queue_depth{queue="disease_batcher"} 5.0' in render
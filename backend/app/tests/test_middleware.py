@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import threading
+
+import pytest
+
+from app.core import logger as logger_module
+from app.core.middleware import RequestLoggingMiddleware
+
+
+def _app(status=200, exc=None):
+    async def app(scope, receive, send):
+        if exc is not None:
+            raise exc
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+def _call(middleware, headers=()):
+    scope = {"type": "http", "method": "GET", "path": "/health/", "headers": list(headers)}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+
+def test_successes_are_sampled_errors_always_logged(caplog):
+    caplog.set_level(logging.INFO, logger="agromind")
+    sent = _call(RequestLoggingMiddleware(_app(200), sample_rate=0.0, slow_ms=1e9))
+    assert sent[0]["status"] == 200
+    assert caplog.records == []
+
+    _call(RequestLoggingMiddleware(_app(404), sample_rate=0.0, slow_ms=1e9))
+    assert [r.getMessage() for r in caplog.records][0].startswith("REQUEST GET /health/ status=404")
+
+    caplog.clear()
+    _call(RequestLoggingMiddleware(_app(200), sample_rate=1.0, slow_ms=1e9))
+    assert len(caplog.records) == 1
+
+
+def test_exceptions_logged_and_reraised(caplog):
+    with pytest.raises(RuntimeError):
+        _call(RequestLoggingMiddleware(_app(exc=RuntimeError("boom")), sample_rate=0.0))
+    assert "REQUEST ERROR" in caplog.records[0].getMessage()
+
+
+def test_headers_masked_at_debug(caplog):
+    caplog.set_level(logging.DEBUG, logger="agromind")
+    _call(RequestLoggingMiddleware(_app(200), sample_rate=1.0),
+          headers=[(b"authorization", b"Bearer secret"), (b"user-agent", b"curl")])
+    message = caplog.records[-1].getMessage()
+    assert "secret" not in message and "****" in message and "curl" in message
+
+
+def test_queue_pipeline_formats_off_thread(tmp_path):
+    log = logging.getLogger("agromind")
+    saved = (list(log.handlers), log.level, log.propagate)
+    try:
+        logger_module.setup_logging("INFO", log_file=tmp_path / "app.log")
+        assert isinstance(log.handlers[0], logger_module.DeferredQueueHandler)
+
+        class Lazy:
+            formatted_in = None
+
+            def __repr__(self):
+                Lazy.formatted_in = threading.current_thread()
+                return "lazy"
+
+        log.info("value=%r", Lazy())
+        logger_module.shutdown_logging()
+        assert Lazy.formatted_in is not None
+        assert Lazy.formatted_in is not threading.main_thread()
+        assert "value=lazy" in (tmp_path / "app.log").read_text()
+    finally:
+        logger_module.shutdown_logging()
+        log.handlers[:] = saved[0]
+        log.setLevel(saved[1])
+        log.propagate = saved[2]
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.db_models import Device, Telemetry, TelemetryRollup1m
+from app.services.database import Base
+from app.services.device_auth import device_cache, issue_device_token
+from app.workers import webhook_consumer
+from app.workers.webhook_consumer import MQTTTelemetryConsumer, telemetry_topic
+
+
+class FakeSubscription:
+    """
+    One connected client: a bounded receive buffer that drops on overflow,
+    and a broker-side backlog for what is not sent while the client
+    does not read its connection (paused).
+    """
+
+    def __init__(self, pattern, buffer_size):
+        self.pattern = pattern
+        self.buffer = asyncio.Queue(buffer_size)
+        self.held = deque()
+        self.paused = False
+
+    def deliver(self, message) -> bool:
+        if self.paused:
+            self.held.append(message)
+            return True
+        self._refill()
+        if self.held or self.buffer.full():
+            return False
+        self.buffer.put_nowait(message)
+        return True
+
+    def _refill(self):
+        while self.held and not self.paused and not self.buffer.full():
+            self.buffer.put_nowait(self.held.popleft())
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        self._refill()
+
+    async def _stream(self):
+        while True:
+            self._refill()
+            yield await self.buffer.get()
+
+    def __aiter__(self):
+        return self._stream()
+
+
+class FakeBroker:
+    """
+    In-process MQTT stand-in: `+` wildcard subscriptions, bounded client
+    buffers that drop on overflow, and pause / resume of delivery.
+    """
+
+    def __init__(self, client_queue_size=100):
+        self.client_queue_size = client_queue_size
+        self.subscribers = []
+        self.dropped = 0
+        self.connects = 0
+        self.fail_next_connects = 0
+
+    @staticmethod
+    def matches(pattern, topic):
+        p, t = pattern.split("/"), topic.split("/")
+        return len(p) == len(t) and all(a in ("+", b) for a, b in zip(p, t))
+
+    async def publish(self, topic, payload):
+        message = (topic, json.dumps(payload).encode() if isinstance(payload, dict) else payload)
+        for subscription in self.subscribers:
+            if self.matches(subscription.pattern, topic) and not subscription.deliver(message):
+                self.dropped += 1
+        await asyncio.sleep(0)
+
+    @asynccontextmanager
+    async def source(self, topic):
+        self.connects += 1
+        if self.fail_next_connects:
+            self.fail_next_connects -= 1
+            raise ConnectionError("broker unavailable")
+        subscription = FakeSubscription(topic, self.client_queue_size)
+        self.subscribers.append(subscription)
+        try:
+            yield subscription
+        finally:
+            self.subscribers.remove(subscription)
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mqtt.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    tokens = {}
+    with factory() as db:
+        for device_id in ("field-1", "field-2"):
+            token, token_hash = issue_device_token()
+            db.add(Device(device_id=device_id, cred_token_hash=token_hash))
+            tokens[device_id] = token
+        db.commit()
+    factory.tokens = tokens
+    device_cache.clear()
+    yield factory
+    device_cache.clear()
+
+
+def _count(sessions, model=Telemetry):
+    with sessions() as db:
+        return db.execute(select(func.count()).select_from(model)).scalar()
+
+
+async def _until(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_topic_helpers():
+    assert telemetry_topic("agromind/") == "agromind/+/telemetry"
+    assert telemetry_topic("agromind", shared_group="ingest") == "$share/ingest/agromind/+/telemetry"
+
+
+def test_authenticated_messages_are_batched_into_storage(sessions):
+    broker = FakeBroker()
+    consumer = MQTTTelemetryConsumer(broker.source, sessions, "agromind/+/telemetry",
+                                     batch_size=50, max_wait_ms=20, reconnect_seconds=0.01)
+    token1, token2 = sessions.tokens["field-1"], sessions.tokens["field-2"]
+
+    async def scenario():
+        task = asyncio.create_task(consumer.run())
+        await _until(lambda: broker.subscribers)
+        for i in range(30):
+            await broker.publish("agromind/field-1/telemetry", {"token": token1, "readings": [
+                {"sensor": "moisture", "value": i, "ts": 1717236000 + i},
+                {"sensor": "ph", "value": 6.5},
+            ]})
+        await broker.publish("agromind/field-2/telemetry", {"token": token2, "sensor": "temp", "value": 21.0})
+        # rejected: wrong token, token used on another device's topic, junk, bad reading
+        await broker.publish("agromind/field-1/telemetry", {"token": "nope", "sensor": "temp", "value": 1})
+        await broker.publish("agromind/field-2/telemetry", {"token": token1, "sensor": "temp", "value": 1})
+        await broker.publish("agromind/field-1/telemetry", b"not json")
+        await broker.publish("agromind/field-1/telemetry", {"token": token1, "sensor": "temp", "value": "hot"})
+        await broker.publish("agromind/field-1/status", {"token": token1, "sensor": "temp", "value": 1})
+        await _until(lambda: consumer.readings_stored == 61)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert _count(sessions) == 61 and _count(sessions, TelemetryRollup1m) > 0
+    assert consumer.rejected_messages == 3 and consumer.rejected_readings == 1
+    assert consumer.batches < 61  # readings were grouped
+
+
+def test_slow_database_pauses_the_connection_without_dropping(sessions, monkeypatch):
+    # client buffer far smaller than the burst: without pausing, most would be dropped
+    broker = FakeBroker(client_queue_size=5)
+    consumer = MQTTTelemetryConsumer(broker.source, sessions, "agromind/+/telemetry",
+                                     queue_size=10, batch_size=1, max_wait_ms=1)
+    gate = threading.Event()
+    real_insert = webhook_consumer.insert_readings
+
+    def slow_insert(session_factory, rows):
+        gate.wait(5)
+        real_insert(session_factory, rows)
+
+    monkeypatch.setattr(webhook_consumer, "insert_readings", slow_insert)
+    token = sessions.tokens["field-1"]
+
+    async def scenario():
+        task = asyncio.create_task(consumer.run())
+        await _until(lambda: broker.subscribers)
+        for i in range(200):
+            await broker.publish("agromind/field-1/telemetry", {"token": token, "sensor": "moisture", "value": i})
+        # database stuck: ingest queue full, connection paused, broker holds the rest
+        subscription = broker.subscribers[0]
+        assert consumer.queue_depth() == 10
+        assert consumer.received <= 10 + 1 + 1  # queue + batch in flight + blocked put
+        assert subscription.paused and len(subscription.held) > 150
+        assert consumer.pauses >= 1
+        gate.set()
+        await _until(lambda: consumer.readings_stored == 200)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert broker.dropped == 0
+    assert _count(sessions) == consumer.received == 200
+
+
+def test_reconnects_after_broker_failure(sessions):
+    broker = FakeBroker()
+    broker.fail_next_connects = 2
+    consumer = MQTTTelemetryConsumer(broker.source, sessions, "agromind/+/telemetry",
+                                     max_wait_ms=5, reconnect_seconds=0.01)
+    token = sessions.tokens["field-2"]
+
+    async def scenario():
+        task = asyncio.create_task(consumer.run())
+        await _until(lambda: broker.subscribers)
+        await broker.publish("agromind/field-2/telemetry", {"token": token, "sensor": "temp", "value": 20.5})
+        await _until(lambda: consumer.readings_stored == 1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert broker.connects == 3 and consumer.reconnects == 2
@@ -0,0 +1,128 @@
+import asyncio
+import csv
+import io
+import json
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.db_models import Feedback
+from app.services.database import Base, async_url, engine_options
+from app.services.feedback_service import feedback_export_query, list_feedback_page
+from app.services.pagination import decode_cursor, encode_cursor, stream_export
+
+START = datetime(2024, 1, 1)
+
+
+def _make_db(tmp_path, rows):
+    url = f"sqlite:///{tmp_path / 'feedback.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    if not rows:
+        return engine, url
+    with engine.begin() as conn:
+        # pairs of rows share a timestamp: the id tiebreak must keep pages exact
+        conn.execute(insert(Feedback), [
+            {"user_id": 1, "message": f"m{i}", "prediction_result": "Healthy",
+             "created_at": START + timedelta(seconds=i // 2)}
+            for i in range(rows)
+        ])
+    return engine, url
+
+
+def _sessions(url):
+    aengine = create_async_engine(async_url(url), **engine_options(async_url(url)))
+    return aengine, async_sessionmaker(aengine, expire_on_commit=False)
+
+
+def test_keyset_pages_cover_every_row_once(tmp_path):
+    _, url = _make_db(tmp_path, 25)
+
+    async def walk():
+        aengine, sessions = _sessions(url)
+        ids, cursor, pages = [], None, 0
+        async with sessions() as db:
+            while True:
+                page = await list_feedback_page(db, 10, cursor)
+                ids += [row.id for row in page.items]
+                pages += 1
+                if page.next_cursor is None:
+                    break
+                cursor = page.next_cursor
+        await aengine.dispose()
+        return ids, pages
+
+    ids, pages = asyncio.run(walk())
+    assert ids == list(range(25, 0, -1))
+    assert pages == 3
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    assert decode_cursor(encode_cursor(START, 7)) == (START, 7)
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor")
+    assert exc.value.status_code == 400
+
+
+def test_listing_uses_composite_index(tmp_path):
+    engine, _ = _make_db(tmp_path, 1)
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM feedback WHERE (created_at, id) < ('2024-01-02', 5) "
+            "ORDER BY created_at DESC, id DESC LIMIT 51"
+        )).all()
+    assert "ix_feedback_created_at_id" in " ".join(str(row) for row in plan)
+
+
+def _export(url, fmt, fetch_size=100):
+    async def run():
+        aengine, sessions = _sessions(url)
+        chunks = []
+        async for chunk in stream_export(feedback_export_query(), Feedback, fmt, sessions, fetch_size):
+            chunks.append(chunk)
+        await aengine.dispose()
+        return chunks
+    return asyncio.run(run())
+
+
+def test_export_ndjson_and_csv(tmp_path):
+    _, url = _make_db(tmp_path, 250)
+
+    chunks = _export(url, "ndjson")
+    assert len(chunks) == 3  # one per server-side fetch
+    rows = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert [r["id"] for r in rows] == list(range(1, 251))
+    assert rows[0]["created_at"] == "2024-01-01T00:00:00" and rows[0]["message"] == "m0"
+
+    records = list(csv.DictReader(io.StringIO("".join(_export(url, "csv")))))
+    assert len(records) == 250 and records[-1]["message"] == "m249"
+
+
+def test_export_empty_table_csv_has_header(tmp_path):
+    _, url = _make_db(tmp_path, 0)
+    assert "".join(_export(url, "csv")).strip() == "id,user_id,message,prediction_result,created_at"
+
+
+def test_export_memory_is_flat(tmp_path):
+    def peak(rows):
+        _, url = _make_db(tmp_path / str(rows), rows)
+
+        async def drain():
+            aengine, sessions = _sessions(url)
+            tracemalloc.start()
+            async for _ in stream_export(feedback_export_query(), Feedback, "ndjson", sessions, 500):
+                pass
+            _, high = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            await aengine.dispose()
+            return high
+        return asyncio.run(drain())
+
+    for sub in ("2000", "20000"):
+        (tmp_path / sub).mkdir()
+    small, large = peak(2000), peak(20000)
+    assert large < small * 2
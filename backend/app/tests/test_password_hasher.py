@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import PasswordHasher, password_hasher
+
+
+def test_hash_and_verify_on_dedicated_pool():
+    async def run():
+        hashed = await password_hasher.hash("s3cret")
+        assert await password_hasher.verify("s3cret", hashed)
+        assert not await password_hasher.verify("wrong", hashed)
+
+    asyncio.run(run())
+    metrics = password_hasher.metrics()
+    assert metrics["completed"] >= 3
+    assert metrics["avg_hash_ms"] > 0
+
+
+def test_full_queue_rejects_with_retry_after():
+    hasher = PasswordHasher(max_workers=1, queue_limit=1, retry_after=2)
+    release = threading.Event()
+
+    async def run():
+        blocked = [asyncio.ensure_future(hasher.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert hasher.metrics()["queue_depth"] == 1
+        with pytest.raises(HTTPException) as exc:
+            await hasher.run(release.wait)
+        release.set()
+        await asyncio.gather(*blocked)
+        return exc.value
+
+    error = asyncio.run(run())
+    hasher.shutdown()
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "2"
+    assert hasher.metrics()["rejected"] == 1
+    assert hasher.metrics()["queue_depth"] == 0
+
+
+def test_cancelled_caller_keeps_slot_until_thread_finishes():
+    hasher = PasswordHasher(max_workers=1, queue_limit=0)
+    release = threading.Event()
+
+    async def run():
+        task = asyncio.ensure_future(hasher.run(release.wait))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        # bcrypt thread still busy: the slot is not handed to a new caller
+        with pytest.raises(HTTPException):
+            await hasher.run(release.wait)
+        release.set()
+        for _ in range(100):
+            if hasher.metrics()["running"] == 0 and hasher._pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        return await hasher.run(lambda: "ok")
+
+    assert asyncio.run(run()) == "ok"
+    hasher.shutdown()
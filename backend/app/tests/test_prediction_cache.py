@@ -0,0 +1,30 @@
+import asyncio
+
+from app.ml_services.prediction_cache import PredictionCache, make_key
+
+
+def test_key_depends_on_bytes_and_model_version():
+    assert make_key(b"leaf", "v1") == make_key(b"leaf", "v1")
+    assert make_key(b"leaf", "v1") != make_key(b"leaf", "v2")
+    assert make_key(b"leaf", "v1") != make_key(b"leaf2", "v1")
+
+
+def test_lru_hits_misses_and_eviction():
+    cache = PredictionCache(max_entries=2)
+
+    async def run():
+        assert await cache.get("a") is None
+        await cache.set("a", {"disease": "rust"})
+        await cache.set("b", {"disease": "blight"})
+        assert await cache.get("a") == {"disease": "rust"}  # a is now most recent
+        await cache.set("c", {"disease": "healthy"})       # evicts b
+        assert await cache.get("b") is None
+        assert await cache.get("c") == {"disease": "healthy"}
+
+    asyncio.run(run())
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["hit_ratio"] == 0.5
+    assert stats["redis_enabled"] is False
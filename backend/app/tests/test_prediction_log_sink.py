@@ -0,0 +1,153 @@
+import asyncio
+import json
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.db_models import PredictionLog
+from app.services.database import Base
+from app.services.prediction_log_service import PredictionLogSink
+
+
+def _session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def _count(factory):
+    with factory() as db:
+        return db.query(PredictionLog).count()
+
+
+def test_flushes_by_size_and_interval(tmp_path):
+    factory = _session_factory(tmp_path)
+    sink = PredictionLogSink(factory, capacity=100, flush_size=5, flush_interval_ms=50)
+
+    async def run():
+        for i in range(5):
+            sink.record("disease", f"{i}.jpg", {"disease": "rust"})
+        await asyncio.sleep(0.02)  # size trigger, well before the interval
+        by_size = _count(factory)
+        sink.record("crop", "loamy,28,60,140", {"candidates": []}, confidence=0.7)
+        await asyncio.sleep(0.15)  # interval trigger
+        return by_size
+
+    assert asyncio.run(run()) == 5
+    assert _count(factory) == 6
+    assert sink.metrics()["inserted"] == 6
+    with factory() as db:
+        row = db.query(PredictionLog).filter(PredictionLog.model_type == "crop").one()
+        assert row.confidence == 0.7 and row.created_at is not None
+
+
+def test_ring_buffer_drops_oldest_when_full(tmp_path):
+    sink = PredictionLogSink(_session_factory(tmp_path), capacity=3, flush_size=10)
+    for i in range(5):
+        sink.record("disease", str(i), {})  # no loop: nothing flushes
+    assert [r["input_ref"] for r in sink._buffer] == ["2", "3", "4"]
+    assert sink.metrics()["dropped"] == 2
+
+
+def test_spools_when_db_down_and_replays(tmp_path):
+    factory = _session_factory(tmp_path)
+    spool = tmp_path / "spool.jsonl"
+    state = {"down": True}
+
+    def flaky_factory():
+        if state["down"]:
+            raise RuntimeError("database unavailable")
+        return factory()
+
+    sink = PredictionLogSink(flaky_factory, flush_size=10, spool_path=str(spool))
+
+    async def run():
+        for i in range(3):
+            sink.record("disease", str(i), {"disease": "rust"})
+        await sink.flush()
+        assert [json.loads(line)["input_ref"] for line in spool.read_text().splitlines()] == ["0", "1", "2"]
+
+        state["down"] = False
+        sink.record("disease", "3", {"disease": "blight"})
+        await sink.stop()
+
+    asyncio.run(run())
+    assert not spool.exists()
+    assert _count(factory) == 4
+    metrics = sink.metrics()
+    assert metrics["spooled"] == 3 and metrics["replayed"] == 3 and metrics["db_errors"] == 1
+
+
+
+
+def test_spool_replays_in_chunks_and_keeps_the_rest(tmp_path):
+    factory = _session_factory(tmp_path)
+    spool = tmp_path / "spool.jsonl"
+    inserts = []
+    state = {"fail_after": 2}
+
+    class Session:
+        def __init__(self):
+            self.db = factory()
+
+        def execute(self, stmt, rows):
+            if len(inserts) >= state["fail_after"]:
+                raise RuntimeError("database unavailable")
+            inserts.append(len(rows))
+            return self.db.execute(stmt, rows)
+
+        def commit(self):
+            self.db.commit()
+
+        def close(self):
+            self.db.close()
+
+    sink = PredictionLogSink(Session, flush_size=4, spool_path=str(spool))
+    sink._spool([{"model_type": "disease", "input_ref": str(i), "output": {}, "user_id": 7,
+                  "field_id": None, "confidence": None, "created_at": datetime.utcnow()} for i in range(10)])
+
+    # first chunk (4 rows) is the live flush, second is replayed, the third fails
+    state["fail_after"] = 2
+    sink.record("disease", "live", {})
+    sink._flush_once()
+    assert inserts == [1, 4]
+    assert [json.loads(line)["input_ref"] for line in spool.read_text().splitlines()] == [str(i) for i in range(4, 10)]
+    assert sink.metrics()["replayed"] == 4
+
+    state["fail_after"] = 100
+    sink.record("disease", "live2", {})
+    sink._flush_once()
+    assert inserts == [1, 4, 1, 4, 2]
+    assert not spool.exists()
+    assert _count(factory) == 12
+    assert sink.metrics()["replayed"] == 10
+
+
+def test_replay_finishes_leftover_file_and_respects_other_replayers(tmp_path):
+    import fcntl
+
+    factory = _session_factory(tmp_path)
+    spool = tmp_path / "spool.jsonl"
+    sink = PredictionLogSink(factory, flush_size=4, spool_path=str(spool))
+
+    def rows(prefix, n):
+        return [{"model_type": "disease", "input_ref": f"{prefix}{i}", "output": {}, "user_id": None,
+                 "field_id": None, "confidence": None, "created_at": datetime.utcnow()} for i in range(n)]
+
+    # a worker crashed mid-replay, then more rows were spooled
+    sink._spool(rows("old", 3))
+    spool.rename(spool.with_suffix(".replaying"))
+    sink._spool(rows("new", 2))
+
+    # another process holds the replay lock: nothing is touched
+    with open(f"{spool}.replay.lock", "a") as other:
+        fcntl.flock(other, fcntl.LOCK_EX)
+        sink._replay_spool()
+        assert spool.exists() and spool.with_suffix(".replaying").exists()
+        fcntl.flock(other, fcntl.LOCK_UN)
+
+    sink._replay_spool()
+    assert not spool.exists() and not spool.with_suffix(".replaying").exists()
+    assert _count(factory) == 5
+    assert sink.metrics()["replayed"] == 5
@@ -0,0 +1,68 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.ml.preprocessing import FEATURES, BatchBuffer, preprocess_batch, preprocess_valid
+
+
+def _encode(img, fmt):
+    buf = io.BytesIO()
+    img.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def test_batch_shape_and_dtype():
+    images = [
+        _encode(Image.new("RGB", (3000, 4000), (255, 0, 0)), "JPEG"),
+        _encode(Image.new("RGBA", (300, 200), (0, 255, 0, 128)), "PNG"),
+        _encode(Image.new("L", (64, 64), 255), "PNG"),
+    ]
+    batch = preprocess_batch(images)
+    assert batch.shape == (3, FEATURES)
+    assert batch.dtype == np.float32
+    assert 0.0 <= batch.min() and batch.max() <= 1.0
+    # grayscale is expanded to three channels
+    assert np.allclose(batch[2], 1.0)
+
+
+def test_matches_legacy_normalization():
+    rng = np.random.default_rng(0)
+    img = Image.fromarray(rng.integers(0, 255, (128, 128, 3), dtype=np.uint8))
+    data = _encode(img, "PNG")
+
+    legacy = (np.array(Image.open(io.BytesIO(data)).resize((128, 128))) / 255.0).reshape(-1)
+    assert np.allclose(preprocess_batch([data])[0], legacy, atol=1e-6)
+
+
+def test_writes_into_caller_buffer():
+    data = _encode(Image.new("RGB", (256, 256), (0, 0, 255)), "JPEG")
+    out = np.zeros((2, FEATURES), dtype=np.float32)
+    result = preprocess_batch([data, data], out=out)
+    assert result is out
+    assert out[:, 2::3].mean() > 0.9
+
+    with pytest.raises(ValueError):
+        preprocess_batch([data], out=out)
+
+
+def test_batch_buffer_grows_only_when_needed():
+    buf = BatchBuffer(capacity=4)
+    first = buf.get(3)
+    assert buf.get(4).base is first.base
+    assert buf.get(9).shape == (9, FEATURES)
+    assert buf.capacity >= 9
+
+
+def test_preprocess_valid_skips_undecodable_images():
+    good = _encode(Image.new("RGB", (300, 200), (0, 0, 255)), "JPEG")
+    truncated = _encode(Image.new("RGB", (300, 200), (255, 0, 0)), "JPEG")[:200]
+    with pytest.raises(OSError):
+        preprocess_batch([good, truncated])
+
+    rows, errors = preprocess_valid([truncated, good, b"not an image", good])
+    assert rows.shape == (2, FEATURES)
+    assert errors[1] is None and errors[3] is None
+    assert errors[0] and errors[2]
+    assert np.allclose(rows[0], rows[1])
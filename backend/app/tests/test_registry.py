@@ -0,0 +1,101 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.dummy import DummyClassifier
+
+from app.ml.registry import ModelRegistry
+
+
+def _dump(path, label):
+    model = DummyClassifier(strategy="constant", constant=label)
+    model.fit(np.zeros((2, 2)), [label, "other"])
+    tmp = f"{path}.tmp"
+    joblib.dump(model, tmp)
+    os.replace(tmp, path)  # atomic deploy
+
+
+def test_lazy_load_and_versions(tmp_path):
+    path = tmp_path / "model.pkl"
+    _dump(path, "rice")
+    registry = ModelRegistry(check_interval=0)
+    registry.register("crop", str(path))
+
+    assert registry.versions()["crop"]["loaded"] is False
+    loaded = registry.get("crop")
+    assert loaded.model.predict(np.zeros((1, 2))).tolist() == ["rice"]
+    assert loaded.version == registry.version("crop")
+    assert len(registry.info("crop").checksum) == 64
+    assert registry.versions()["crop"]["loaded"] is True
+
+
+def test_changed_file_is_swapped_in(tmp_path):
+    path = tmp_path / "model.pkl"
+    _dump(path, "rice")
+    registry = ModelRegistry(check_interval=0)
+    registry.register("crop", str(path))
+    reloaded = []
+    registry.add_reload_listener(lambda info: reloaded.append(info.version))
+
+    old = registry.get("crop")
+    _dump(path, "wheat")
+    new = registry.get("crop")
+
+    assert new.version != old.version
+    assert reloaded == [new.version]
+    # a request holding the old reference keeps working
+    assert old.model.predict(np.zeros((1, 2))).tolist() == ["rice"]
+    assert new.model.predict(np.zeros((1, 2))).tolist() == ["wheat"]
+
+
+def test_missing_or_empty_model(tmp_path):
+    path = tmp_path / "empty.pkl"
+    path.write_bytes(b"")
+    registry = ModelRegistry()
+    registry.register("disease", str(path))
+    assert registry.available("disease") is False
+    assert registry.version("disease") == "unloaded"
+    with pytest.raises(RuntimeError):
+        registry.get("disease")
+    with pytest.raises(KeyError):
+        registry.info("unknown")
+
+
+def test_info_on_event_loop_hashes_in_a_thread(tmp_path, monkeypatch):
+    import asyncio
+    import threading
+    from app.ml import registry as registry_module
+
+    path = tmp_path / "model.pkl"
+    _dump(path, "rice")
+    registry = ModelRegistry(check_interval=0)
+    registry.register("crop", str(path))
+    old = registry.refresh("crop")
+
+    release = threading.Event()
+    hashed_on = []
+    real_checksum = registry_module.file_checksum
+
+    def slow_checksum(p):
+        hashed_on.append(threading.current_thread().name)
+        release.wait(5)
+        return real_checksum(p)
+
+    monkeypatch.setattr(registry_module, "file_checksum", slow_checksum)
+    _dump(path, "wheat")
+
+    async def scenario():
+        # served from the previous identity while the new file is hashed
+        assert registry.info("crop").version == old.version
+        assert registry.info("crop").version == old.version
+        release.set()
+        for _ in range(100):
+            if registry.info("crop").version != old.version:
+                break
+            await asyncio.sleep(0.01)
+        return registry.info("crop")
+
+    new = asyncio.run(scenario())
+    assert new.version != old.version
+    assert hashed_on == ["hash-crop"]
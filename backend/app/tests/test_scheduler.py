@@ -0,0 +1,97 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from app.ml.batching import MicroBatcher
+from app.ml.scheduler import FairQueue, SchedulerFull, fair_pick
+
+
+def _drain(queue, n):
+    return [queue.get_nowait() for _ in range(n)]
+
+
+def test_classes_share_by_weight():
+    queue = FairQueue({"interactive": 3, "bulk": 1})
+    for i in range(100):
+        queue.put_nowait(("bulk", i), "bulk")
+        queue.put_nowait(("interactive", i), "interactive")
+    served = Counter(cls for cls, _ in _drain(queue, 40))
+    assert served == {"interactive": 30, "bulk": 10}
+
+
+def test_tenants_take_turns_within_a_class():
+    queue = FairQueue({"device": 1}, default_class="device")
+    for i in range(5):
+        queue.put_nowait(f"a{i}", tenant="camera-a")
+    queue.put_nowait("b0", tenant="camera-b")
+    queue.put_nowait("b1", tenant="camera-b")
+    assert _drain(queue, 7) == ["a0", "b0", "a1", "b1", "a2", "a3", "a4"]
+
+
+def test_idle_class_does_not_bank_credit():
+    queue = FairQueue({"interactive": 1, "bulk": 1})
+    for i in range(50):
+        queue.put_nowait(("bulk", i), "bulk")
+    _drain(queue, 40)
+    for i in range(10):
+        queue.put_nowait(("interactive", i), "interactive")
+    # roughly alternates instead of serving all 10 interactive items first
+    assert Counter(cls for cls, _ in _drain(queue, 10))["bulk"] >= 4
+
+
+def test_class_limit_rejects_and_counts():
+    queue = FairQueue({"interactive": 1, "bulk": 1}, limits={"bulk": 2})
+    queue.put_nowait(1, "bulk")
+    queue.put_nowait(2, "bulk")
+    with pytest.raises(SchedulerFull) as exc:
+        queue.put_nowait(3, "bulk")
+    assert exc.value.priority == "bulk"
+    queue.put_nowait(4)  # other classes unaffected
+    metrics = queue.metrics()
+    assert metrics["bulk"]["rejected"] == 1 and metrics["bulk"]["queue_depth"] == 2
+    with pytest.raises(ValueError):
+        queue.put_nowait(5, "nope")
+
+
+def test_fair_pick_orders_candidates():
+    candidates = [("device", "cam-1", i) for i in range(10)] + [("device", "cam-2", 99), ("interactive", "u1", "x")]
+    picked = fair_pick(candidates, {"interactive": 8, "device": 1}, 4)
+    assert picked == ["x", 0, 99, 1]
+
+
+def test_interactive_request_overtakes_a_device_burst():
+    started = asyncio.Event()
+    release = asyncio.Event()
+    batches = []
+
+    async def predict_batch(items):
+        batches.append(list(items))
+        if len(batches) == 1:
+            started.set()
+            await release.wait()
+        return items
+
+    batcher = MicroBatcher(
+        predict_batch, max_batch_size=4, max_wait_ms=1, max_concurrency=1,
+        queue_factory=lambda: FairQueue({"interactive": 8, "device": 1}, name="test"),
+    )
+
+    async def run():
+        first = asyncio.ensure_future(batcher.submit("d-first", "device", "cam"))
+        await started.wait()  # the only slot is busy
+        burst = [asyncio.ensure_future(batcher.submit(f"d{i}", "device", "cam")) for i in range(20)]
+        await asyncio.sleep(0)
+        user = asyncio.ensure_future(batcher.submit("u", "interactive", "user:1"))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, user, *burst)
+        metrics = batcher.metrics()
+        await batcher.stop()
+        return metrics
+
+    metrics = asyncio.run(run())
+    assert batches[1][0] == "u"  # first in the very next batch
+    assert metrics["classes"]["device"]["dequeued"] == 21
+    assert metrics["classes"]["interactive"]["dequeued"] == 1
+    assert metrics["classes"]["interactive"]["p95_wait_ms"] <= metrics["classes"]["device"]["p95_wait_ms"]
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from app.integration.soil_client import (
+    SoilClient, SoilStore, SoilUnavailable, cell_of, parse_soilgrids, polygon_cells,
+)
+
+GRID = 0.0025
+
+
+class StubSoilGrids:
+    """
+    Local SoilGrids stand-in: counts requests, tracks peak concurrency;
+    can be made slow or failing.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self.delay = 0.0
+        self.status = 200
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                with stub._lock:
+                    stub.requests.append((url.path, query))
+                    stub.active += 1
+                    stub.peak = max(stub.peak, stub.active)
+                time.sleep(stub.delay)
+                with stub._lock:
+                    stub.active -= 1
+                lat = float(query["lat"][0])
+                body = json.dumps({"properties": {"layers": [
+                    {"name": "phh2o", "unit_measure": {"d_factor": 10},
+                     "depths": [{"label": "0-5cm", "values": {"mean": 65}},
+                                {"label": "5-15cm", "values": {"mean": 70}}]},
+                    {"name": "clay", "unit_measure": {"d_factor": 10},
+                     "depths": [{"label": "0-5cm", "values": {"mean": round(lat * 10)}}]},
+                ]}}).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubSoilGrids()
+    yield server
+    server.close()
+
+
+def _client(stub, path, concurrency=2):
+    return SoilClient(stub.url, SoilStore(str(path), GRID), grid_degrees=GRID, concurrency=concurrency)
+
+
+def _square(lat, lon, cells):
+    # offset a quarter cell so edges never sit on grid lines
+    lat, lon, side = lat + GRID / 4, lon + GRID / 4, cells * GRID
+    ring = [[lon, lat], [lon + side, lat], [lon + side, lat + side], [lon, lat + side], [lon, lat]]
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+def test_polygon_cells_and_parsing():
+    # a square 4 cells wide contains 4x4 cell centres
+    cells = polygon_cells(_square(10.0, 20.0, 4), GRID)
+    assert len(cells) == 16
+    assert cell_of(10.0 + GRID, 20.0 + GRID, GRID) in cells
+
+    # a field smaller than a cell still gets its cell
+    tiny = _square(10.0, 20.0, 0.1)
+    assert polygon_cells({"type": "Feature", "geometry": tiny}, GRID) == [cell_of(10.0 + GRID / 4, 20.0 + GRID / 4, GRID)]
+
+    # holes are excluded
+    outer = _square(10.0, 20.0, 6)["coordinates"][0]
+    hole = _square(10.0 + 2 * GRID, 20.0 + 2 * GRID, 2)["coordinates"][0]
+    holed = polygon_cells({"type": "Polygon", "coordinates": [outer, hole]}, GRID)
+    assert len(holed) == 36 - 4
+    assert cell_of(10.0 + 3 * GRID, 20.0 + 3 * GRID, GRID) not in holed
+
+    with pytest.raises(ValueError):
+        polygon_cells({"type": "Point", "coordinates": [20.0, 10.0]}, GRID)
+    with pytest.raises(ValueError):
+        polygon_cells(_square(10.0, 20.0, 100), GRID, max_cells=50)
+
+    props = parse_soilgrids({"properties": {"layers": [
+        {"name": "phh2o", "unit_measure": {"d_factor": 10}, "depths": [{"label": "0-5cm", "values": {"mean": 62}}]},
+    ]}})
+    assert props == {"ph": 6.2}
+
+
+def test_prefetch_then_lookups_need_no_network(stub, tmp_path):
+    async def scenario():
+        client = _client(stub, tmp_path / "soil.sqlite")
+        result = await client.prefetch_polygon(_square(10.0, 20.0, 3))
+        assert result == {"cells": 9, "fetched": 9, "failed": 0}
+        assert len(stub.requests) == 9
+        assert stub.requests[0][0] == "/properties/query"
+
+        # warm: memory hits, no requests
+        stub.status = 500
+        inside = [(10.0 + k * GRID * 0.7 + GRID / 2, 20.0 + k * GRID * 0.7 + GRID / 2) for k in range(4)]
+        values = await client.lookup_many(inside * 10)
+        assert all(v is not None and v["ph"] == 6.5 for v in values)
+        assert client.cached(*inside[0])["ph"] == 6.5
+        assert len(stub.requests) == 9
+        await client.aclose()
+
+        # a new process reads the same file: disk hits, still no network
+        fresh = _client(stub, tmp_path / "soil.sqlite")
+        assert fresh.cached(*inside[0]) is None
+        assert (await fresh.lookup(*inside[0]))["ph"] == 6.5
+        assert fresh.stats()["disk_hits"] == 1
+        assert len(stub.requests) == 9
+        await fresh.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_lookup_many_dedupes_and_bounds_concurrency(stub, tmp_path):
+    stub.delay = 0.05
+
+    async def scenario():
+        client = _client(stub, tmp_path / "soil.sqlite", concurrency=2)
+        # 6 distinct cells, each asked for by many points and concurrent callers
+        points = [(12.0 + c * GRID + GRID / 3, 30.0 + GRID / 3) for c in range(6)] * 5
+        results = await asyncio.gather(*(client.lookup_many(points) for _ in range(5)))
+        assert len(stub.requests) == 6
+        assert stub.peak <= 2
+        assert all(v is not None for batch in results for v in batch)
+        assert client.store.count() == 6
+        await client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_failed_cells_are_not_cached(stub, tmp_path):
+    async def scenario():
+        client = _client(stub, tmp_path / "soil.sqlite")
+        stub.status = 503
+        assert await client.lookup_many([(5.0, 5.0)]) == [None]
+        with pytest.raises(SoilUnavailable):
+            await client.lookup(5.0, 5.0)
+        assert client.store.count() == 0
+
+        stub.status = 200
+        assert (await client.lookup(5.0, 5.0))["ph"] == 6.5
+        assert client.stats()["upstream_errors"] == 2
+        await client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_grid_change_clears_store(tmp_path):
+    path = str(tmp_path / "soil.sqlite")
+    store = SoilStore(path, GRID)
+    store.put_many({(1, 2): {"ph": 7.0}})
+    assert store.get_many([(1, 2), (3, 4)]) == {(1, 2): {"ph": 7.0}}
+    store.close()
+
+    assert SoilStore(path, GRID).get_many([(1, 2)]) == {(1, 2): {"ph": 7.0}}
+    assert SoilStore(path, GRID * 2).count() == 0
+
+
+def test_cells_summary_never_fetches(stub, tmp_path):
+    async def scenario():
+        client = _client(stub, tmp_path / "soil.sqlite")
+        cells = polygon_cells(_square(10.0, 20.0, 3), GRID)
+        await client.prefetch_cells(cells[:4])
+        assert len(stub.requests) == 4
+
+        summary = await client.cells_summary(cells)
+        assert summary["cells"] == 9
+        assert (summary["cells_with_data"], summary["pending"]) == (4, 5)
+        assert summary["properties"]["ph"] == 6.5
+        assert len(stub.requests) == 4
+
+        await client.prefetch_cells(cells)
+        assert len(stub.requests) == 9
+        assert (await client.cells_summary(cells))["pending"] == 0
+        await client.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+import io
+
+import boto3
+import pytest
+import requests
+from moto import mock_aws
+
+from app.services.s3_client import S3Storage
+from app.services.storage import LocalStorage
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="agromind-test")
+        yield S3Storage(
+            "agromind-test", client=client,
+            multipart_threshold=5 * MB, multipart_chunksize=5 * MB, max_concurrency=3,
+        )
+
+
+def test_local_roundtrip(tmp_path):
+    storage = LocalStorage(tmp_path)
+    ref = storage.save("disease_inputs/a.jpg", bytearray(b"leaf"))
+    assert ref == str(tmp_path / "disease_inputs" / "a.jpg")
+    assert storage.exists("disease_inputs/a.jpg")
+    assert list(storage.open_stream("disease_inputs/a.jpg", chunk_size=2)) == [b"le", b"af"]
+    assert storage.delete("disease_inputs/a.jpg") is True
+    assert storage.read("disease_inputs/a.jpg") is None
+    with pytest.raises(ValueError):
+        storage.save("../outside.jpg", b"x")
+    with pytest.raises(NotImplementedError):
+        storage.presigned_put_url("k.jpg")
+
+
+def test_s3_roundtrip_and_streaming(s3):
+    assert s3.save("disease_inputs/a.jpg", bytearray(b"leaf" * 1000)) == "s3://agromind-test/disease_inputs/a.jpg"
+    assert s3.exists("disease_inputs/a.jpg")
+    chunks = list(s3.open_stream("disease_inputs/a.jpg", chunk_size=1024))
+    assert len(chunks) == 4 and b"".join(chunks) == b"leaf" * 1000
+    assert s3.delete("disease_inputs/a.jpg") is True
+    assert s3.delete("disease_inputs/a.jpg") is False
+    assert s3.read("disease_inputs/a.jpg") is None
+
+
+def test_s3_large_objects_use_multipart(s3):
+    data = bytes(range(256)) * (12 * MB // 256)
+    s3.save_stream("big/photo.tif", io.BytesIO(data))
+    head = s3.client.head_object(Bucket="agromind-test", Key="big/photo.tif")
+    assert head["ETag"].strip('"').endswith("-3")  # 3 parts of 5 MB
+    assert s3.read("big/photo.tif") == data
+
+
+def test_presigned_put_uploads_directly(s3):
+    grant = s3.presigned_put_url("device_images/x.jpg", content_type="image/jpeg", expires_in=60)
+    assert grant["method"] == "PUT" and grant["key"] == "device_images/x.jpg"
+    response = requests.put(grant["url"], data=b"\xff\xd8\xffjpeg", headers=grant["headers"])
+    assert response.status_code == 200
+    assert s3.read("device_images/x.jpg") == b"\xff\xd8\xffjpeg"
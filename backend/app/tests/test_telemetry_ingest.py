@@ -0,0 +1,114 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.db_models import Device, Telemetry
+from app.services.database import Base
+from app.services.IOT_services import TelemetryTooLarge, detect_telemetry_format, ingest_telemetry_stream
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'telemetry.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(Device(id=1, device_id="gw-1", cred_token_hash="x"))
+        db.commit()
+    return factory
+
+
+async def _body(data: bytes, piece: int = 7):
+    # deliver in small, line-splitting pieces like a slow gateway upload
+    for start in range(0, len(data), piece):
+        yield data[start:start + piece]
+
+
+def _ingest(sessions, data, fmt, chunk_size=4):
+    device = Device(id=1, device_id="gw-1")
+    return asyncio.run(ingest_telemetry_stream(_body(data), fmt, device, chunk_size, sessions))
+
+
+def test_format_detection():
+    assert detect_telemetry_format("application/x-ndjson; charset=utf-8") == "ndjson"
+    assert detect_telemetry_format(None) == "json"
+    assert detect_telemetry_format("text/csv") is None
+
+
+def test_ndjson_stream_bulk_inserted_with_per_row_errors(sessions):
+    lines = [json.dumps({"sensor": "soil_moisture", "value": i, "unit": "%"}) for i in range(10)]
+    lines[2] = "{not json"
+    lines[5] = json.dumps({"sensor": "soil_moisture", "value": "wet"})
+    lines[7] = json.dumps({"value": 3.0})
+    data = ("\n".join(lines) + "\n\n").encode()
+
+    result = _ingest(sessions, data, "ndjson")
+
+    assert result["received"] == 10 and result["accepted"] == 7 and result["rejected"] == 3
+    assert [e["row"] for e in result["errors"]] == [2, 5, 7]
+    assert result["errors"][0]["error"] == "Invalid JSON line"
+    with sessions() as db:
+        values = sorted(v for (v,) in db.query(Telemetry.value))
+    assert values == [0.0, 1.0, 3.0, 4.0, 6.0, 8.0, 9.0]
+
+
+def test_json_array_and_timestamps(sessions):
+    readings = [
+        {"sensor": "temp", "value": 21.5, "ts": "2024-06-01T10:00:00+05:30"},
+        {"sensor": "temp", "value": 22, "ts": 1717236000},
+        {"sensor": "temp", "value": 23},
+        {"sensor": "temp", "value": 24, "ts": "yesterday"},
+    ]
+    result = _ingest(sessions, json.dumps(readings).encode(), "json")
+    assert result["accepted"] == 3 and [e["row"] for e in result["errors"]] == [3]
+    with sessions() as db:
+        stamps = [r for (r,) in db.query(Telemetry.recorded_at).order_by(Telemetry.id)]
+    assert stamps[0] == datetime(2024, 6, 1, 4, 30)
+    assert stamps[1] == datetime(2024, 6, 1, 10, 0)
+
+
+def test_json_body_must_be_an_array(sessions):
+    with pytest.raises(ValueError):
+        _ingest(sessions, b'{"sensor": "temp", "value": 1}', "json")
+
+
+def test_storage_failure_reported_per_row(sessions):
+    def broken():
+        raise RuntimeError("db down")
+
+    lines = [json.dumps({"sensor": "temp", "value": i}) for i in range(6)]
+    lines[1] = "[]"
+    device = Device(id=1, device_id="gw-1")
+    result = asyncio.run(ingest_telemetry_stream(
+        _body("\n".join(lines).encode()), "ndjson", device, 4, broken,
+    ))
+    assert result["accepted"] == 0 and result["rejected"] == 6
+    assert [(e["row"], e["error"]) for e in result["errors"]][:3] == [
+        (0, "Storage failure"), (1, "Reading must be an object"), (2, "Storage failure"),
+    ]
+
+
+def test_body_and_line_caps(sessions):
+    device = Device(id=1, device_id="gw-1")
+    readings = [{"sensor": "temp", "value": i} for i in range(50)]
+
+    with pytest.raises(TelemetryTooLarge):
+        asyncio.run(ingest_telemetry_stream(
+            _body(json.dumps(readings).encode()), "json", device, 4, sessions, max_bytes=200,
+        ))
+
+    # a gateway that never sends a newline is cut off at the line cap
+    with pytest.raises(TelemetryTooLarge):
+        asyncio.run(ingest_telemetry_stream(
+            _body(b'{"sensor": "temp", "value": ' + b"1" * 500), "ndjson", device, 4, sessions, max_line_bytes=100,
+        ))
+
+    ndjson = "\n".join(json.dumps(r) for r in readings[:8]).encode()
+    result = asyncio.run(ingest_telemetry_stream(
+        _body(ndjson), "ndjson", device, 4, sessions, max_bytes=len(ndjson), max_line_bytes=100,
+    ))
+    assert result["accepted"] == 8
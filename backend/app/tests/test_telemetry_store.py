@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.db_models import Telemetry, TelemetryRollup1d, TelemetryRollup1h, TelemetryRollup1m
+from app.services.database import Base
+from app.services.IOT_services import insert_readings
+from app.services import telemetry_store
+from app.services.telemetry_store import pick_rollup, prune_telemetry, query_series, resolve_resolution
+
+T0 = datetime(2024, 6, 1, 10, 0, 0)
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ts.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    factory.engine = engine
+    return factory
+
+
+def _reading(seconds, value, sensor="moisture"):
+    at = T0 + timedelta(seconds=seconds)
+    return {"device_id": 1, "sensor": sensor, "value": value, "unit": "%", "recorded_at": at, "received_at": at}
+
+
+def test_rollups_updated_incrementally_across_ingests(sessions):
+    insert_readings(sessions, [_reading(0, 10.0), _reading(30, 20.0), _reading(90, 40.0)])
+    insert_readings(sessions, [_reading(45, 5.0), _reading(3600, 7.0, sensor="ph")])
+
+    with sessions() as db:
+        minute = db.get(TelemetryRollup1m, (1, "moisture", T0))
+        assert (minute.count, minute.sum, minute.min, minute.max) == (3, 35.0, 5.0, 20.0)
+        hour = db.get(TelemetryRollup1h, (1, "moisture", T0))
+        assert (hour.count, hour.sum, hour.min, hour.max) == (4, 75.0, 5.0, 40.0)
+        day = db.get(TelemetryRollup1d, (1, "moisture", T0.replace(hour=0)))
+        assert day.count == 4
+        assert db.get(TelemetryRollup1h, (1, "ph", T0 + timedelta(hours=1))).sum == 7.0
+
+
+def test_resolution_picks_coarsest_dividing_rollup():
+    assert pick_rollup(60)[2] == "1m"
+    assert pick_rollup(900)[2] == "1m"
+    assert pick_rollup(7200)[2] == "1h"
+    assert pick_rollup(5400)[2] == "1m"  # 1.5 h is not whole hours
+    assert pick_rollup(7 * 86400)[2] == "1d"
+
+    week = (T0, T0 + timedelta(days=7))
+    now = week[1]
+    assert resolve_resolution(*week, None, 1000, now) == 660  # 604800 / 1000 rounded up to minutes
+    assert resolve_resolution(*week, 90, 100_000, now) == 120
+    assert resolve_resolution(*week, 5400, 1000, now) == 7200  # whole hours, read from 1h
+    with pytest.raises(ValueError):
+        resolve_resolution(*week, 60, 1000, now)
+
+
+def test_long_ranges_use_coarse_rollups(monkeypatch):
+    monkeypatch.setattr(telemetry_store.settings, "TELEMETRY_1M_RETENTION_DAYS", 90)
+    monkeypatch.setattr(telemetry_store.settings, "TELEMETRY_1H_RETENTION_DAYS", 0)
+
+    month = (T0 - timedelta(days=30), T0)
+    resolution = resolve_resolution(*month, None, 1000, now=T0)
+    assert resolution == 3600 and pick_rollup(resolution)[2] == "1h"  # 720 points
+
+    year = (T0 - timedelta(days=365), T0)
+    resolution = resolve_resolution(*year, None, 1000, now=T0)
+    assert resolution % 3600 == 0 and pick_rollup(resolution)[2] == "1h"
+    assert 500 <= 365 * 86400 / resolution <= 1000
+
+    # 1m rollups are gone before the last 90 days, even for a short window
+    old_day = (T0 - timedelta(days=200), T0 - timedelta(days=199))
+    assert resolve_resolution(*old_day, 60, 1000, now=T0) == 3600
+
+
+def test_series_is_served_from_rollups_only(sessions):
+    # one reading per minute for 3 hours: value = minute index
+    insert_readings(sessions, [_reading(m * 60, float(m)) for m in range(180)])
+    statements = []
+    event.listen(sessions.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    with sessions() as db:
+        hourly = query_series(db, 1, "moisture", T0, T0 + timedelta(hours=3), 3600)
+        quarter = query_series(db, 1, "moisture", T0, T0 + timedelta(hours=1), 900)
+
+    assert hourly["source"] == "1h" and len(hourly["points"]) == 3
+    assert hourly["points"][1] == {"ts": T0 + timedelta(hours=1), "count": 60, "avg": 89.5, "min": 60.0, "max": 119.0}
+    assert quarter["source"] == "1m" and [p["count"] for p in quarter["points"]] == [15, 15, 15, 15]
+    assert not any("FROM telemetry " in s or s.rstrip().endswith("FROM telemetry") for s in statements)
+
+
+def test_retention_prunes_in_batches(sessions, monkeypatch):
+    insert_readings(sessions, [_reading(m * 60, 1.0) for m in range(50)])
+    monkeypatch.setattr(telemetry_store.settings, "TELEMETRY_PRUNE_BATCH_SIZE", 7)
+    monkeypatch.setattr(telemetry_store.settings, "TELEMETRY_RAW_RETENTION_DAYS", 14)
+    monkeypatch.setattr(telemetry_store.settings, "TELEMETRY_1M_RETENTION_DAYS", 90)
+
+    # 20 days later: raw is past retention, minute rollups are not
+    removed = prune_telemetry(sessions, now=T0 + timedelta(days=20))
+    assert removed["raw"] == 50 and removed["1m"] == 0
+    with sessions() as db:
+        assert db.execute(select(func.count()).select_from(Telemetry)).scalar() == 0
+        assert db.execute(select(func.count()).select_from(TelemetryRollup1m)).scalar() == 50
+        # charts still work from rollups
+        series = query_series(db, 1, "moisture", T0, T0 + timedelta(hours=1), 3600)
+    assert series["points"][0]["count"] == 50
+
+    removed = prune_telemetry(sessions, now=T0 + timedelta(days=100))
+    assert removed["1m"] == 50
@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+
+from app.services import storage
+
+
+def _jpeg(size=(64, 48)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (30, 120, 40)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def _ingest(data, tmp_path, monkeypatch, **kwargs):
+    monkeypatch.setattr(storage, "UPLOAD_DIR", tmp_path)
+    upload = UploadFile(io.BytesIO(data), filename="leaf.bin")
+    return asyncio.run(storage.ingest_upload(upload, subfolder="disease_inputs", **kwargs))
+
+
+def test_single_pass_hashes_and_saves(tmp_path, monkeypatch):
+    data = _jpeg()
+    result = _ingest(data, tmp_path, monkeypatch, chunk_size=100)
+
+    assert result.sha256 == hashlib.sha256(data).hexdigest()
+    assert bytes(result.content) == data
+    assert result.extension == "jpg"
+    assert result.path.endswith(".jpg")
+    with open(result.path, "rb") as f:
+        assert f.read() == data
+
+
+def test_oversized_upload_rejected_without_leftovers(tmp_path, monkeypatch):
+    with pytest.raises(HTTPException) as exc:
+        _ingest(_jpeg((400, 400)), tmp_path, monkeypatch, max_bytes=500, chunk_size=128)
+    assert exc.value.status_code == 413
+    assert list((tmp_path / "disease_inputs").iterdir()) == []
+
+
+@pytest.mark.parametrize("data", [b"%PDF-1.4 definitely not a photo", b"\xff\xd8\xff" + b"\x00" * 64])
+def test_non_images_rejected(tmp_path, monkeypatch, data):
+    with pytest.raises(HTTPException) as exc:
+        _ingest(data, tmp_path, monkeypatch)
+    assert exc.value.status_code == 400
+    assert list((tmp_path / "disease_inputs").iterdir()) == []
+
+
+def test_sniff_image_type():
+    assert storage.sniff_image_type(b"\x89PNG\r\n\x1a\n\x00\x00\x00\x0d") == "png"
+    assert storage.sniff_image_type(b"RIFF\x00\x00\x00\x00WEBP") == "webp"
+    assert storage.sniff_image_type(b"GIF89a......") is None
+
+
+def test_ingest_without_persisting(tmp_path, monkeypatch):
+    data = _jpeg()
+    result = _ingest(data, tmp_path, monkeypatch, persist=False)
+
+    assert bytes(result.content) == data
+    assert result.path.endswith(".jpg")
+    assert list((tmp_path / "disease_inputs").iterdir()) == []
+
+
+def test_normalize_key_blocks_traversal():
+    assert storage.normalize_key("device_images/dev1/./a.jpg") == "device_images/dev1/a.jpg"
+    for key in ("device_images/dev1/../dev2/x.jpg", "/etc/passwd", "device_images\\dev1\\x.jpg", "", "../x"):
+        with pytest.raises(ValueError):
+            storage.normalize_key(key)
+
+
+def test_download_image_checks_scheme_size_and_type():
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    bodies = {"/leaf.jpg": _jpeg(), "/big.jpg": _jpeg((800, 800)), "/page.html": b"<html>hello</html>"}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = bodies[self.path]
+            self.send_response(200)
+            self.end_headers()  # no Content-Length: the cap must hold while streaming
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        assert storage.download_image(f"{base}/leaf.jpg") == bodies["/leaf.jpg"]
+        with pytest.raises(ValueError):
+            storage.download_image(f"{base}/big.jpg", max_bytes=2000)
+        with pytest.raises(ValueError):
+            storage.download_image(f"{base}/page.html")
+        with pytest.raises(ValueError):
+            storage.download_image("file:///etc/passwd")
+    finally:
+        server.shutdown()
+        server.server_close()
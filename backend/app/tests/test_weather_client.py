@@ -0,0 +1,183 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from app.integration.weather_client import (
+    CircuitBreaker, WeatherClient, WeatherUnavailable, geohash_center, geohash_encode,
+)
+
+
+class StubWeather:
+    """
+    Local OpenWeather stand-in: counts requests and connections; can be
+    made slow or failing.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.connections = 0
+        self.delay = 0.0
+        self.status = 200
+        self.temperature = 25.0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def setup(self):
+                super().setup()
+                stub.connections += 1
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                stub.requests.append((url.path, parse_qs(url.query)))
+                time.sleep(stub.delay)
+                body = json.dumps({
+                    "main": {"temp": stub.temperature, "humidity": 70},
+                    "rain": {"1h": 1.5},
+                    "weather": [{"main": "Rain"}],
+                    "dt": 1717236000,
+                }).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def stub():
+    server = StubWeather()
+    yield server
+    server.close()
+
+
+def _client(stub, clock=None, reset_timeout=30.0):
+    clock = clock or Clock()
+    return WeatherClient(stub.url, "key", precision=5, ttl=600, stale_ttl=3600, clock=clock,
+                         breaker=CircuitBreaker(3, reset_timeout, clock=clock))
+
+
+def test_geohash_roundtrip():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    lat, lon = geohash_center("u4pru")
+    assert geohash_encode(lat, lon, 5) == "u4pru"
+
+
+def test_concurrent_requests_for_one_cell_share_one_call(stub):
+    stub.delay = 0.1
+    client = _client(stub)
+
+    async def run():
+        # farms a few hundred metres apart fall in the same ~5 km cell
+        farms = [(18.5204 + i * 0.0001, 73.8567 + i * 0.0001) for i in range(50)]
+        results = await asyncio.gather(*(client.current(lat, lon) for lat, lon in farms))
+        await client.aclose()
+        return results
+
+    results = asyncio.run(run())
+    assert len(stub.requests) == 1
+    assert {r["cell"] for r in results} == {results[0]["cell"]}
+    assert results[0]["temperature"] == 25.0 and results[0]["rainfall"] == 1.5
+    path, query = stub.requests[0]
+    assert path == "/data/2.5/weather" and query["units"] == ["metric"]
+    assert client.stats()["coalesced"] == 49 and client.stats()["misses"] == 50
+
+
+def test_cache_is_fresh_then_stale_while_revalidating(stub):
+    clock = Clock()
+    client = _client(stub, clock)
+
+    async def run():
+        first = await client.current(18.52, 73.85)
+        cached = await client.current(18.52, 73.85)
+        stub.temperature = 30.0
+        clock.now += 700  # past the TTL, inside the stale window
+        stale = await client.current(18.52, 73.85)
+        await asyncio.sleep(0.2)  # background refresh lands
+        fresh = await client.current(18.52, 73.85)
+        # the pooled client kept one connection for every call
+        await client.current(-33.86, 151.2)
+        await client.aclose()
+        return first, cached, stale, fresh
+
+    first, cached, stale, fresh = asyncio.run(run())
+    assert (first["stale"], cached["stale"]) == (False, False)
+    assert stale["stale"] is True and stale["temperature"] == 25.0
+    assert fresh["stale"] is False and fresh["temperature"] == 30.0
+    assert len(stub.requests) == 3
+    assert stub.connections == 1
+    assert client.stats()["hits"] == 2 and client.stats()["stale_hits"] == 1
+
+
+def test_circuit_breaker_opens_serves_stale_and_recovers(stub):
+    clock = Clock()
+    client = _client(stub, clock, reset_timeout=20_000)
+
+    async def run():
+        await client.current(18.52, 73.85)  # cached cell
+        stub.status = 500
+        for i in range(3):
+            with pytest.raises(WeatherUnavailable):
+                await client.current(10.0 + i, 10.0)
+        assert client.breaker.state == "open"
+        calls = len(stub.requests)
+
+        # open: upstream is not called at all
+        with pytest.raises(WeatherUnavailable):
+            await client.current(40.0, 40.0)
+        assert len(stub.requests) == calls
+
+        # an expired entry is still served while the breaker is open
+        clock.now += 10_000
+        expired = await client.current(18.52, 73.85)
+        assert expired["stale"] is True and len(stub.requests) == calls
+
+        # after the reset timeout one probe goes through and closes it
+        stub.status = 200
+        clock.now += 10_001
+        probe = await client.current(40.0, 40.0)
+        await client.aclose()
+        return probe
+
+    probe = asyncio.run(run())
+    assert probe["stale"] is False
+    assert client.breaker.state == "closed"
+    assert client.stats()["short_circuited"] >= 2
+
+
+def test_missing_api_key_is_unavailable(stub):
+    client = WeatherClient(stub.url, None)
+
+    async def run():
+        with pytest.raises(WeatherUnavailable):
+            await client.current(18.52, 73.85)
+        with pytest.raises(ValueError):
+            await client.current(95.0, 0.0)
+
+    asyncio.run(run())
+    assert stub.requests == []
@@ -0,0 +1,58 @@
+import asyncio
+
+from app.services.storage import LocalStorage
+from app.services.write_behind import WriteBehindQueue
+
+
+def test_files_written_in_batches(tmp_path):
+    queue = WriteBehindQueue(max_queue=100, batch_size=50, storage=LocalStorage(tmp_path))
+
+    async def run():
+        for i in range(10):
+            await queue.enqueue_file(f"img/{i}.jpg", bytearray(b"x" * i))
+        await queue.stop()
+
+    asyncio.run(run())
+    assert sorted(p.name for p in (tmp_path / "img").iterdir()) == sorted(f"{i}.jpg" for i in range(10))
+    assert (tmp_path / "img" / "3.jpg").read_bytes() == b"xxx"
+    metrics = queue.metrics()
+    assert metrics["files_written"] == 10
+    assert metrics["batches"] < 10
+    assert metrics["queue_depth"] == 0
+
+
+def test_bounded_queue_applies_backpressure(tmp_path):
+    queue = WriteBehindQueue(max_queue=2, batch_size=1, storage=LocalStorage(tmp_path))
+
+    async def run():
+        await asyncio.gather(*[queue.enqueue_file(f"{i}.jpg", b"x") for i in range(20)])
+        await queue.stop()
+
+    asyncio.run(run())
+    assert queue.metrics()["files_written"] == 20
+    assert queue.metrics()["backpressure_waits"] > 0
+
+
+def test_buffered_bytes_are_bounded(tmp_path):
+    storage = LocalStorage(tmp_path)
+    peak = []
+    real_save = storage.save
+
+    def slow_save(key, content):
+        peak.append(queue.queued_bytes())
+        real_save(key, content)
+
+    storage.save = slow_save
+    queue = WriteBehindQueue(max_queue=1000, max_bytes=10_000, batch_size=1, storage=storage)
+
+    async def run():
+        await asyncio.gather(*[queue.enqueue_file(f"{i}.jpg", b"x" * 4000) for i in range(20)])
+        # larger than the whole budget: still written once the queue is empty
+        await queue.enqueue_file("huge.jpg", b"x" * 50_000)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert queue.metrics()["files_written"] == 21
+    assert max(peak[:-1]) <= 10_000
+    assert queue.metrics()["backpressure_waits"] > 0
+    assert queue.queued_bytes() == 0
@@ -0,0 +1,33 @@
+# backend/app/workers/celery_app.py
+"""
+Celery application for background jobs.
+
+Without CELERY_BROKER_URL the in-memory broker is used (one process
+only); with CELERY_TASK_ALWAYS_EAGER tasks run inline where they are
+enqueued, so the whole flow works without Redis.
+
+Run a worker from backend/:
+    celery -A app.workers.celery_app worker -Q inference --concurrency 2
+"""
+from celery import Celery
+
+from app.core.config import settings
+
+celery_app = Celery(
+    "agromind",
+    broker=settings.CELERY_BROKER_URL or "memory://",
+    backend=settings.CELERY_BACKEND_URL,
+    include=["app.workers.tasks"],
+)
+celery_app.conf.update(
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    task_serializer="json",
+    accept_content=["json"],
+    # job state and results are kept in inference_jobs
+    task_ignore_result=True,
+    # a job whose worker died is redelivered (and re-claimed once stale)
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=settings.CELERY_WORKER_PREFETCH,
+    task_routes={"agromind.inference.*": {"queue": "inference"}},
+)
@@ -0,0 +1,34 @@
+# backend/app/workers/tasks.py
+"""
+Celery tasks. Each worker process loads the disease model once (at
+process start) and keeps it resident; see services/inference_jobs for
+how queued jobs are batched.
+"""
+import logging
+
+from celery.signals import worker_process_init
+
+from app.ml.registry import model_registry
+from app.models import ml_model
+from app.services.database import SessionLocal
+from app.services.inference_jobs import DISEASE, process_disease_jobs
+from app.workers.celery_app import celery_app
+
+logger = logging.getLogger("agromind")
+
+
+@worker_process_init.connect
+def preload_models(**_):
+    try:
+        model_registry.get(ml_model.MODEL_NAME)
+    except Exception as e:
+        logger.warning("celery worker could not preload the disease model: %s", e)
+
+
+@celery_app.task(name="agromind.inference.disease")
+def run_disease_job(job_id: str) -> int:
+    return process_disease_jobs(job_id, SessionLocal)
+
+
+# job kind -> task
+TASKS = {DISEASE: run_disease_job}
@@ -0,0 +1,333 @@
+# backend/app/workers/webhook_consumer.py
+"""
+MQTT -> telemetry ingestion bridge.
+
+Sensors publish to `agromind/<device_id>/telemetry` (MQTT_TOPIC_PREFIX)
+with a JSON payload carrying their credential token and one or more
+readings:
+
+    {"token": "<cred token>", "readings": [{"sensor": "moisture", "value": 31.2, "ts": 1717236000}, ...]}
+    {"token": "<cred token>", "sensor": "moisture", "value": 31.2}
+
+Pipeline (one process, one event loop):
+
+    broker -> reader --(bounded queue)--> batcher -> insert_readings (thread)
+
+The batcher awaits each bulk insert, and while the queue is full the
+reader pauses the connection itself (stops reading the socket), so a
+slow database slows consumption down instead of growing memory. The
+client acknowledges a QoS 1 message as soon as it reads it, so nothing
+read is ever discarded: the client's own buffer is unbounded, and only
+holds what was read before a pause. Unread messages stay unacknowledged
+at the broker (TCP flow control) and arrive after the reader resumes.
+A pause longer than the keepalive drops the connection; with a
+persistent session (MQTT_CLIENT_ID set) the broker redelivers whatever
+was not acknowledged.
+
+Run:
+    python -m app.workers.webhook_consumer
+"""
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import register_queue
+from app.models.db_models import Device
+from app.services.database import SessionLocal
+from app.services.device_auth import authenticate_device, device_cache, hash_device_token
+from app.services.IOT_services import insert_readings, validate_readings
+
+logger = logging.getLogger("agromind")
+
+# (topic, payload)
+Message = Tuple[str, bytes]
+
+
+def telemetry_topic(prefix: str = settings.MQTT_TOPIC_PREFIX, shared_group: Optional[str] = None) -> str:
+    topic = f"{prefix.rstrip('/')}/+/telemetry"
+    return f"$share/{shared_group}/{topic}" if shared_group else topic
+
+
+def device_id_from_topic(topic: str) -> Optional[str]:
+    parts = topic.split("/")
+    return parts[-2] if len(parts) >= 3 and parts[-1] == "telemetry" else None
+
+
+class MQTTMessageStream:
+    """
+    Subscribed message stream that can stop reading its connection.
+
+    asyncio-mqtt reads the socket from an event loop reader callback;
+    pause() removes that reader and resume() puts it back.
+    """
+
+    def __init__(self, client, messages):
+        self._client = client
+        self._messages = messages
+        self.paused = False
+
+    def __aiter__(self):
+        return self._stream()
+
+    async def _stream(self):
+        async for message in self._messages:
+            yield message.topic.value, message.payload
+
+    def _socket(self):
+        # paho client under asyncio-mqtt; socket() is None once disconnected
+        return self._client._client.socket()
+
+    def pause(self):
+        sock = self._socket()
+        if not self.paused and sock is not None:
+            asyncio.get_running_loop().remove_reader(sock)
+            self.paused = True
+
+    def resume(self):
+        sock = self._socket()
+        if self.paused and sock is not None:
+            asyncio.get_running_loop().add_reader(sock, self._client._client.loop_read)
+        self.paused = False
+
+
+@asynccontextmanager
+async def asyncio_mqtt_source(topic: str) -> AsyncIterator[MQTTMessageStream]:
+    """
+    Subscribed message stream from the broker in Settings (asyncio-mqtt).
+    """
+    import asyncio_mqtt
+
+    async with asyncio_mqtt.Client(
+        hostname=settings.MQTT_HOST,
+        port=settings.MQTT_PORT,
+        username=settings.MQTT_USER,
+        password=settings.MQTT_PASS,
+        client_id=settings.MQTT_CLIENT_ID,
+        clean_session=settings.MQTT_CLIENT_ID is None,
+    ) as client:
+        # unbounded: a bounded queue drops messages that were already acknowledged
+        async with client.messages(queue_maxsize=0) as messages:
+            await client.subscribe(topic, qos=1)
+            yield MQTTMessageStream(client, messages)
+
+
+class MQTTTelemetryConsumer:
+    """
+    Subscribes to device telemetry, authenticates each message and
+    bulk-inserts readings in batches of up to `batch_size` (or whatever
+    arrived within `max_wait_ms`).
+
+    `source_factory(topic)` is an async context manager yielding an async
+    iterator of (topic, payload) with pause() / resume(), like
+    MQTTMessageStream.
+    """
+
+    def __init__(
+        self,
+        source_factory: Callable = asyncio_mqtt_source,
+        session_factory: Callable = SessionLocal,
+        topic: Optional[str] = None,
+        queue_size: int = 5000,
+        batch_size: int = 2000,
+        max_wait_ms: float = 250.0,
+        insert_retries: int = 3,
+        reconnect_seconds: float = 5.0,
+    ):
+        self.source_factory = source_factory
+        self.session_factory = session_factory
+        self.topic = topic or telemetry_topic()
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.insert_retries = insert_retries
+        self.reconnect_seconds = reconnect_seconds
+        self._queue: Optional[asyncio.Queue] = None
+
+        self.received = 0
+        self.readings_stored = 0
+        self.rejected_messages = 0
+        self.rejected_readings = 0
+        self.failed_readings = 0
+        self.batches = 0
+        self.reconnects = 0
+        self.pauses = 0
+        self.last_insert_ms = 0.0
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    async def run(self):
+        """
+        Consume until cancelled, reconnecting after broker errors.
+        """
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        batcher = asyncio.create_task(self._batch_loop())
+        try:
+            while True:
+                try:
+                    async with self.source_factory(self.topic) as messages:
+                        logger.info("mqtt consumer subscribed to %s", self.topic)
+                        async for message in messages:
+                            if self._queue.full():
+                                # batcher is behind: stop reading the connection, so
+                                # the broker holds (and does not count as delivered)
+                                # everything not yet read
+                                messages.pause()
+                                self.pauses += 1
+                                try:
+                                    await self._queue.put(message)
+                                finally:
+                                    messages.resume()
+                            else:
+                                self._queue.put_nowait(message)
+                            self.received += 1
+                    logger.warning("mqtt message stream ended; reconnecting")
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("mqtt consumer connection failed")
+                self.reconnects += 1
+                await asyncio.sleep(self.reconnect_seconds)
+        finally:
+            batcher.cancel()
+            try:
+                await batcher
+            except asyncio.CancelledError:
+                pass
+            await self._drain()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth(),
+            "queue_size": self.queue_size,
+            "received": self.received,
+            "readings_stored": self.readings_stored,
+            "rejected_messages": self.rejected_messages,
+            "rejected_readings": self.rejected_readings,
+            "failed_readings": self.failed_readings,
+            "batches": self.batches,
+            "reconnects": self.reconnects,
+            "pauses": self.pauses,
+            "last_insert_ms": round(self.last_insert_ms, 3),
+        }
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    async def _batch_loop(self):
+        while True:
+            first = await self._queue.get()
+            rows = await self._decode(first)
+            deadline = time.monotonic() + self.max_wait
+            while len(rows) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                rows.extend(await self._decode(message))
+            if rows:
+                await self._store(rows)
+
+    async def _drain(self):
+        # messages already taken off the broker are stored before exiting
+        rows: List[dict] = []
+        while not self._queue.empty():
+            rows.extend(await self._decode(self._queue.get_nowait()))
+        if rows:
+            await self._store(rows)
+
+    async def _decode(self, message: Message) -> List[dict]:
+        topic, payload = message
+        try:
+            body = json.loads(payload)
+            token = body.pop("token")
+            readings = body["readings"] if "readings" in body else [body]
+            if not isinstance(readings, list):
+                raise ValueError
+        except (ValueError, TypeError, KeyError, AttributeError):
+            self.rejected_messages += 1
+            return []
+
+        device = await self._authenticate(token)
+        if device is None or device.device_id != device_id_from_topic(topic):
+            # a token may only publish to its own device's topic
+            self.rejected_messages += 1
+            return []
+
+        rows, errors = validate_readings(readings, device.id, datetime.utcnow())
+        self.rejected_readings += len(errors)
+        return rows
+
+    async def _authenticate(self, token) -> Optional[Device]:
+        if not isinstance(token, str) or not token:
+            return None
+        device = device_cache.get(hash_device_token(token))
+        if device is not None:
+            return device
+        return await asyncio.to_thread(self._authenticate_sync, token)
+
+    def _authenticate_sync(self, token: str) -> Optional[Device]:
+        db = self.session_factory()
+        try:
+            return authenticate_device(db, token)
+        except HTTPException:
+            return None
+        finally:
+            db.close()
+
+    async def _store(self, rows: List[dict]):
+        for attempt in range(self.insert_retries + 1):
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(insert_readings, self.session_factory, rows)
+            except Exception:
+                logger.exception("mqtt telemetry insert of %d readings failed (attempt %d)", len(rows), attempt + 1)
+                if attempt < self.insert_retries:
+                    # hold the batch (and so the queue) while the database recovers
+                    await asyncio.sleep(min(2 ** attempt, 30))
+                continue
+            self.last_insert_ms = (time.perf_counter() - started) * 1000
+            self.readings_stored += len(rows)
+            self.batches += 1
+            return
+        self.failed_readings += len(rows)
+
+
+mqtt_consumer = MQTTTelemetryConsumer(
+    topic=telemetry_topic(shared_group=settings.MQTT_SHARED_GROUP),
+    queue_size=settings.MQTT_INGEST_QUEUE_SIZE,
+    batch_size=settings.MQTT_BATCH_MAX_READINGS,
+    max_wait_ms=settings.MQTT_BATCH_MAX_WAIT_MS,
+    insert_retries=settings.MQTT_INSERT_RETRIES,
+    reconnect_seconds=settings.MQTT_RECONNECT_SECONDS,
+)
+register_queue("mqtt_ingest", mqtt_consumer.queue_depth)
+
+
+def main():
+    from app.core.logger import setup_logging, shutdown_logging
+
+    setup_logging(settings.LOG_LEVEL)
+    try:
+        asyncio.run(mqtt_consumer.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
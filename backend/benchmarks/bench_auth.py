@@ -0,0 +1,94 @@
+"""
+Benchmark: authenticated request rate, uncached vs cached get_current_user.
+
+"uncached" is the previous dependency (JWT decode + TokenBlocklist query +
+User query on every request); "cached" is app.api.deps.get_current_user.
+Both serve the same protected route through a TestClient against a
+file-backed SQLite database.
+
+Run from backend/:
+    SECRET_KEY=bench python -m benchmarks.bench_auth [--requests 2000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.deps import get_current_user, oauth2_scheme
+from app.models.db_models import User
+from app.services.auth_cache import clear_auth_caches
+from app.services.database import Base, get_db
+from app.services.token_service import create_access_token, decode_token, is_token_revoked
+
+
+def uncached_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_db)):
+    """The pre-cache dependency: two round trips per request."""
+    try:
+        payload = decode_token(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if is_token_revoked(db, payload.get("jti")):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    user = db.query(User).filter(User.id == payload["sub"]["user_id"]).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+def build_app(dependency, session_factory) -> FastAPI:
+    app = FastAPI()
+
+    def _db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/me")
+    def me(user=Depends(dependency)):
+        return {"id": user.id}
+
+    app.dependency_overrides[get_db] = _db
+    return app
+
+
+def run(name, dependency, session_factory, token, requests):
+    clear_auth_caches()
+    client = TestClient(build_app(dependency, session_factory))
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(50):  # warm up
+        assert client.get("/me", headers=headers).status_code == 200
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get("/me", headers=headers)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<9} {requests / elapsed:8.0f} req/s  {elapsed / requests * 1e6:7.0f} us/request")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                               connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+        with session_factory() as db:
+            db.add(User(id=1, username="bench", email="bench@example.com", password_hash="x"))
+            db.commit()
+        token = create_access_token({"user_id": 1})["token"]
+
+        run("uncached", uncached_current_user, session_factory, token, args.requests)
+        run("cached", get_current_user, session_factory, token, args.requests)
+
+
+if __name__ == "__main__":
+    main()
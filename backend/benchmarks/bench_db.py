@@ -0,0 +1,138 @@
+"""
+Benchmark: concurrent throughput of DB-backed async routes.
+
+Serves the same feedback workload (one INSERT + one recent-rows SELECT per
+request) from an `async def` route three ways, against a file-backed
+SQLite database, with N requests in flight over ASGI:
+
+- sync      : sync Session on the event loop (the previous get_db pattern),
+              default rollback journal
+- sync+wal  : same, with the WAL / synchronous=NORMAL pragmas
+- async     : AsyncSession from app.services.database (aiosqlite, pragmas)
+
+While requests run, a probe task measures event-loop stalls (how late a
+1 ms sleep wakes up), which is what other requests on the worker feel.
+Keep --concurrency below DB_POOL_SIZE + DB_MAX_OVERFLOW: past that, the
+sync variants block the loop inside pool checkout while the sessions that
+would free a connection wait for the loop to close them (up to
+DB_POOL_TIMEOUT_SECONDS per request).
+
+On SQLite the sync WAL variant has the highest raw throughput (aiosqlite
+adds a thread hop per statement); the async session is what keeps the loop
+responsive, and with asyncpg it also removes the thread hop.
+
+Run from backend/:
+    SECRET_KEY=bench python -m benchmarks.bench_db [--requests 2000] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.db_models import Feedback
+from app.services.database import Base, async_url, engine_options, install_sqlite_pragmas
+
+
+def build_sync_app(session_factory) -> FastAPI:
+    app = FastAPI()
+
+    def _db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.post("/feedback")
+    async def submit(db=Depends(_db)):
+        db.add(Feedback(user_id=1, message="bench", prediction_result="Healthy"))
+        db.commit()
+        rows = db.execute(select(Feedback).order_by(Feedback.id.desc()).limit(20)).scalars().all()
+        return {"n": len(rows)}
+
+    return app
+
+
+def build_async_app(session_factory) -> FastAPI:
+    app = FastAPI()
+
+    async def _db():
+        async with session_factory() as db:
+            yield db
+
+    @app.post("/feedback")
+    async def submit(db=Depends(_db)):
+        db.add(Feedback(user_id=1, message="bench", prediction_result="Healthy"))
+        await db.commit()
+        rows = (await db.execute(select(Feedback).order_by(Feedback.id.desc()).limit(20))).scalars().all()
+        return {"n": len(rows)}
+
+    return app
+
+
+async def drive(app, requests, concurrency, engine):
+    transport = httpx.ASGITransport(app=app)
+    stalls = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stalls.append(time.perf_counter() - started - 0.001)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(20):  # warm up
+            await client.post("/feedback")
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                assert (await client.post("/feedback")).status_code == 200
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+    if hasattr(engine, "sync_engine"):
+        await engine.dispose()  # aiosqlite connection threads keep the process alive
+    else:
+        engine.dispose()
+    stalls.sort()
+    return elapsed, stalls[int(len(stalls) * 0.99)] if stalls else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("sync", "sync+wal", "async"):
+            url = f"sqlite:///{os.path.join(tmp, name.replace('+', '_') + '.db')}"
+            Base.metadata.create_all(create_engine(url))
+            if name == "async":
+                engine = create_async_engine(async_url(url), **engine_options(async_url(url)))
+                install_sqlite_pragmas(engine.sync_engine)
+                app = build_async_app(async_sessionmaker(engine, expire_on_commit=False))
+            else:
+                engine = create_engine(url, **engine_options(url))
+                if name == "sync+wal":
+                    install_sqlite_pragmas(engine)
+                app = build_sync_app(sessionmaker(bind=engine))
+            elapsed, p99_stall = asyncio.run(drive(app, args.requests, args.concurrency, engine))
+            print(f"{name:<9} {args.requests / elapsed:8.0f} req/s  loop stall p99 {p99_stall * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
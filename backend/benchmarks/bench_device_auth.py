@@ -0,0 +1,107 @@
+"""
+Benchmark: device-authenticated ingest requests per second.
+
+A telemetry-shaped route (POST, small JSON body, device resolved from
+X-Device-Token) is served three ways against a file-backed SQLite table of
+--devices devices, with requests spread over 200 of them:
+
+- plaintext : the previous lookup, `cred_token == token` on an unindexed
+              plaintext column, every request
+- hashed    : SHA-256 + unique-index lookup, every request (cache disabled)
+- cached    : app.api.deps.get_current_device (hash + LRU/TTL cache)
+
+Run from backend/:
+    SECRET_KEY=bench python -m benchmarks.bench_device_auth [--requests 5000] [--devices 20000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.deps import get_current_device
+from app.models.db_models import Device
+from app.services.database import Base, get_db
+from app.services.device_auth import device_cache, hash_device_token, issue_device_token
+
+
+def plaintext_device(x_device_token: str = Header(None), db=Depends(get_db)):
+    """The pre-hash lookup: full scan of a plaintext column."""
+    row = db.execute(text("SELECT id, device_id FROM legacy_devices WHERE cred_token = :t"),
+                     {"t": x_device_token}).first()
+    if row is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return row
+
+
+def hashed_device(x_device_token: str = Header(None), db=Depends(get_db)):
+    """Hashed + indexed, no cache."""
+    device = db.query(Device).filter(Device.cred_token_hash == hash_device_token(x_device_token)).first()
+    if device is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return device
+
+
+def build_app(dependency, session_factory) -> FastAPI:
+    app = FastAPI()
+
+    def _db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.post("/iot/telemetry")
+    def ingest(payload: dict, device=Depends(dependency)):
+        return {"status": "ok", "device_id": device.device_id}
+
+    app.dependency_overrides[get_db] = _db
+    return app
+
+
+def run(name, dependency, session_factory, tokens, requests):
+    device_cache.clear()
+    client = TestClient(build_app(dependency, session_factory))
+    body = {"soil_moisture": 31.5, "temperature": 24.1}
+    for token in tokens:  # warm up (and fill the cache)
+        assert client.post("/iot/telemetry", json=body, headers={"X-Device-Token": token}).status_code == 200
+    started = time.perf_counter()
+    for i in range(requests):
+        client.post("/iot/telemetry", json=body, headers={"X-Device-Token": tokens[i % len(tokens)]})
+    elapsed = time.perf_counter() - started
+    print(f"{name:<10} {requests / elapsed:8.0f} req/s  {elapsed / requests * 1e6:7.0f} us/request")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--devices", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                               connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        issued = [issue_device_token() for _ in range(args.devices)]
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE legacy_devices (id INTEGER PRIMARY KEY, device_id TEXT, cred_token TEXT)"))
+            conn.execute(text("INSERT INTO legacy_devices (device_id, cred_token) VALUES (:d, :t)"),
+                         [{"d": f"dev-{i}", "t": token} for i, (token, _) in enumerate(issued)])
+            conn.execute(insert(Device), [{"device_id": f"dev-{i}", "cred_token_hash": token_hash}
+                                          for i, (_, token_hash) in enumerate(issued)])
+        session_factory = sessionmaker(bind=engine)
+        step = max(1, args.devices // 200)
+        tokens = [token for token, _ in issued[::step]]
+
+        run("plaintext", plaintext_device, session_factory, tokens, args.requests)
+        run("hashed", hashed_device, session_factory, tokens, args.requests)
+        run("cached", get_current_device, session_factory, tokens, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark: per-request overhead of request logging middleware.
+
+Drives a bare Starlette app directly through ASGI (no HTTP client) so the
+numbers are middleware cost only:
+
+- none     : no middleware
+- legacy   : the previous BaseHTTPMiddleware (f-string headers, logged
+             twice) writing through a synchronous RotatingFileHandler
+- asgi     : app.core.middleware.RequestLoggingMiddleware + queue pipeline
+- sampled  : same, logging 10% of successful requests
+
+Run from backend/:
+    SECRET_KEY=bench python -m benchmarks.bench_logging_middleware [--requests 20000]
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core import logger as logger_module
+from app.core.middleware import RequestLoggingMiddleware
+
+log = logging.getLogger("agromind")
+
+HEADERS = [
+    (b"host", b"api.agromind.local"), (b"user-agent", b"okhttp/4.12.0"),
+    (b"accept", b"application/json"), (b"authorization", b"Bearer abc.def.ghi"),
+    (b"x-request-id", b"6f1c2d"), (b"accept-encoding", b"gzip"),
+]
+
+
+class LegacyRequestLoggingMiddleware(BaseHTTPMiddleware):
+    """The pre-existing middleware."""
+
+    async def dispatch(self, request, call_next):
+        start = time.time()
+        masked = {k: ("****" if k in ("authorization", "cookie") else v) for k, v in request.headers.items()}
+        log.info(f"REQUEST START -> {request.method} {request.url.path} headers={masked}")
+        response = await call_next(request)
+        process_time = (time.time() - start) * 1000
+        log.info(f"REQUEST END   <- {request.method} {request.url.path} status={response.status_code} time_ms={process_time:.2f}")
+        return response
+
+
+async def ping(request):
+    return PlainTextResponse("ok")
+
+
+def build(middleware):
+    return Starlette(routes=[Route("/ping", ping)], middleware=middleware)
+
+
+async def drive(app, requests):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/ping", "raw_path": b"/ping", "root_path": "", "query_string": b"",
+        "headers": HEADERS, "client": ("127.0.0.1", 5000), "server": ("127.0.0.1", 8000),
+    }
+
+    never = asyncio.Event()
+
+    def make_receive():
+        # body once, then block like a client that stays connected
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await never.wait()
+        return receive
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # warm up
+        await app(dict(scope), make_receive(), send)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), make_receive(), send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def legacy_logging(path: Path):
+    logger_module.shutdown_logging()
+    log.handlers[:] = [RotatingFileHandler(path, maxBytes=2 * 1024 * 1024, backupCount=5)]
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        variants = [
+            ("none", [], None),
+            ("legacy", [Middleware(LegacyRequestLoggingMiddleware)], "legacy"),
+            ("asgi", [Middleware(RequestLoggingMiddleware, sample_rate=1.0)], "queue"),
+            ("sampled", [Middleware(RequestLoggingMiddleware, sample_rate=0.1)], "queue"),
+        ]
+        baseline = None
+        for name, middleware, pipeline in variants:
+            log_file = Path(tmp) / f"{name}.log"
+            if pipeline == "legacy":
+                legacy_logging(log_file)
+            else:
+                logger_module.shutdown_logging()
+                logger_module.setup_logging("INFO", log_file=log_file)
+                # console output would dominate; keep only the file handler
+                logger_module._listener.handlers = logger_module._listener.handlers[1:]
+            us = asyncio.run(drive(build(middleware), args.requests))
+            baseline = baseline if baseline is not None else us
+            print(f"{name:<8} {us:8.1f} us/request  overhead {us - baseline:7.1f} us")
+        logger_module.shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
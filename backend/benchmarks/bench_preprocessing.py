@@ -0,0 +1,106 @@
+"""
+Benchmark: legacy disease preprocessing vs app.ml.preprocessing.
+
+Each variant runs in a fresh process so peak RSS is not polluted by the
+other one. Reports per-image wall time, tracemalloc peak (numpy buffers)
+and the growth of the process max RSS (includes Pillow's decode buffers).
+
+Run from backend/:
+    python -m benchmarks.bench_preprocessing [--images 20] [--size 4032x3024]
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+
+def make_photo(width: int, height: int) -> bytes:
+    """Synthetic phone photo: noisy gradient, JPEG quality 90."""
+    rng = np.random.default_rng(42)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                     np.full((height, width), 96, np.float32)], axis=-1)
+    noisy = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(noisy).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def legacy(images):
+    """The pre-existing path from ml_model.py."""
+    rows = []
+    for data in images:
+        img = Image.open(io.BytesIO(data)).resize((128, 128))
+        arr = np.array(img) / 255.0
+        rows.append(arr.reshape(1, -1))
+    return np.vstack(rows)
+
+
+def optimized(images):
+    from app.ml.preprocessing import preprocess_batch
+    return preprocess_batch(images)
+
+
+def _write_photo(path, width, height):
+    with open(path, "wb") as f:
+        f.write(make_photo(width, height))
+
+
+def _run(name, count, path, queue):
+    fn = {"legacy": legacy, "optimized": optimized}[name]
+    with open(path, "rb") as f:
+        images = [f.read()] * count
+    fn([make_photo(256, 192)])  # warm up imports without a full-size decode
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    batch = fn(images)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        "name": name,
+        "per_image_ms": elapsed * 1000 / len(images),
+        "traced_peak_mb": peak / 2**20,
+        "rss_growth_mb": (rss_after - rss_before) / 1024,
+        "dtype": str(batch.dtype),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--size", default="4032x3024")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.split("x"))
+
+    # ru_maxrss survives fork/exec, so keep the parent small: the photo is
+    # generated in its own process and every variant reads it from disk.
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.NamedTemporaryFile(suffix=".jpg") as f:
+        gen = ctx.Process(target=_write_photo, args=(f.name, width, height))
+        gen.start()
+        gen.join()
+        size_mb = os.path.getsize(f.name) / 2**20
+        print(f"{args.images} JPEGs of {width}x{height} ({size_mb:.1f} MB each)")
+        for name in ("legacy", "optimized"):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run, args=(name, args.images, f.name, queue))
+            proc.start()
+            r = queue.get()
+            proc.join()
+            print(f"{r['name']:>10}: {r['per_image_ms']:8.2f} ms/image | "
+                  f"traced peak {r['traced_peak_mb']:7.2f} MB | RSS growth {r['rss_growth_mb']:7.1f} MB | {r['dtype']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: interactive inference latency during a camera burst.
+
+A MicroBatcher (batch 32, 2 batches in flight) serves a simulated model
+(5 ms + 0.5 ms per image). Interactive requests arrive every 20 ms from
+10 users; after 0.5 s, 4 cameras each dump --frames frames at once.
+
+- fifo, quiet : plain asyncio.Queue, no burst (the target)
+- fifo, burst : plain asyncio.Queue (previous behaviour)
+- fair, burst : FairQueue with the configured class weights
+
+Run from backend/:
+    SECRET_KEY=bench python -m benchmarks.bench_scheduler [--frames 500] [--seconds 3]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.config import settings
+from app.ml.batching import MicroBatcher
+from app.ml.scheduler import DEVICE, INTERACTIVE, FairQueue, SchedulerFull
+
+
+async def predict_batch(items):
+    await asyncio.sleep(0.005 + 0.0005 * len(items))
+    return items
+
+
+async def scenario(queue_factory, frames: int, seconds: float):
+    batcher = MicroBatcher(predict_batch, max_batch_size=32, max_wait_ms=5, max_concurrency=2,
+                           queue_factory=queue_factory)
+    latencies, rejected = [], 0
+
+    async def interactive(i):
+        started = time.perf_counter()
+        await batcher.submit(i, INTERACTIVE, f"user:{i % 10}")
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    async def frame(n, i):
+        nonlocal rejected
+        try:
+            await batcher.submit(i, DEVICE, f"device:{n}")
+        except SchedulerFull:
+            rejected += 1  # the route answers 503 + Retry-After
+
+    async def camera(n):
+        await asyncio.gather(*(frame(n, i) for i in range(frames)))
+
+    requests, cameras = [], []
+    started = time.perf_counter()
+    i = 0
+    while time.perf_counter() - started < seconds:
+        if frames and not cameras and time.perf_counter() - started > 0.5:
+            cameras = [asyncio.ensure_future(camera(n)) for n in range(4)]
+        requests.append(asyncio.ensure_future(interactive(i)))
+        i += 1
+        await asyncio.sleep(0.02)
+    await asyncio.gather(*requests, *cameras)
+    await batcher.stop()
+    return latencies, rejected
+
+
+def report(name, latencies, rejected):
+    ordered = sorted(latencies)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    print(f"{name:<12} interactive p50 {statistics.median(ordered):7.1f} ms  p95 {p95:7.1f} ms  "
+          f"max {ordered[-1]:7.1f} ms  (device frames rejected: {rejected})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    def fair():
+        return FairQueue(settings.INFERENCE_CLASS_WEIGHTS, settings.INFERENCE_CLASS_QUEUE_LIMITS, name="bench")
+
+    report("fifo, quiet", *asyncio.run(scenario(asyncio.Queue, 0, args.seconds)))
+    report("fifo, burst", *asyncio.run(scenario(asyncio.Queue, args.frames, args.seconds)))
+    report("fair, burst", *asyncio.run(scenario(fair, args.frames, args.seconds)))
+
+
+if __name__ == "__main__":
+    main()
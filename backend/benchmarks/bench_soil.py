@@ -0,0 +1,79 @@
+"""
+Benchmark: soil lookups after a farm's cells are cached.
+
+A SoilStore file is filled with --cells cells (as a farm prefetch would),
+then random points inside them are looked up without any network
+(the client points at an unroutable URL):
+
+- memory  : cell already in the in-process LRU (steady state)
+- disk    : fresh client, every cell read from the SQLite file
+- batch   : lookup_many of --batch points on a fresh client (one query)
+
+Run from backend/:
+    SECRET_KEY=bench python -m benchmarks.bench_soil [--cells 2000] [--lookups 100000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from app.integration.soil_client import SoilClient, SoilStore, cell_center
+
+GRID = 0.0025
+
+
+def client(path):
+    return SoilClient("http://127.0.0.1:9", SoilStore(path, GRID), grid_degrees=GRID)
+
+
+async def run(path, cells, lookups, batch):
+    points = []
+    for _ in range(lookups):
+        lat, lon = cell_center(random.choice(cells), GRID)
+        points.append((lat + random.uniform(-0.4, 0.4) * GRID, lon + random.uniform(-0.4, 0.4) * GRID))
+
+    cold = client(path)
+    started = time.perf_counter()
+    for lat, lon in points[:len(cells)]:
+        await cold.lookup(lat, lon)
+    disk = (time.perf_counter() - started) / len(cells)
+    await cold.aclose()
+
+    warm = client(path)
+    await warm.lookup_many([cell_center(cell, GRID) for cell in cells])
+    started = time.perf_counter()
+    for lat, lon in points:
+        await warm.lookup(lat, lon)
+    memory = (time.perf_counter() - started) / lookups
+    assert warm.stats()["upstream_calls"] == 0
+    await warm.aclose()
+
+    fresh = client(path)
+    started = time.perf_counter()
+    await fresh.lookup_many(points[:batch])
+    batched = (time.perf_counter() - started) / batch
+    await fresh.aclose()
+
+    print(f"memory  {memory * 1e6:8.2f} us/lookup")
+    print(f"disk    {disk * 1e6:8.2f} us/lookup")
+    print(f"batch   {batched * 1e6:8.2f} us/point  ({batch} points, one lookup_many)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cells", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "soil.sqlite")
+        cells = [(4000 + i // 50, 8000 + i % 50) for i in range(args.cells)]
+        SoilStore(path, GRID).put_many({cell: {"ph": 6.5, "clay": 24.0, "sand": 41.0} for cell in cells})
+        asyncio.run(run(path, cells, args.lookups, args.batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: telemetry readings ingested per second on one worker.
+
+- single : one POST /iot/telemetry per reading (process_telemetry commit each)
+- batch  : POST /iot/telemetry/batch with the readings as one NDJSON body
+
+Both paths also maintain the 1m / 1h / 1d rollups.
+
+Both go through the real routes' service functions on an ASGI app driven
+by httpx (no network), against a file-backed SQLite database with the
+WAL pragmas. Device auth is stubbed out to isolate ingest cost.
+
+Run from backend/:
+    SECRET_KEY=bench python -m benchmarks.bench_telemetry [--readings 100000] [--single 2000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.db_models import Device, Telemetry
+from app.models.schemas import TelemetryCreate
+from app.services.database import Base, engine_options, install_sqlite_pragmas
+from app.services.IOT_services import detect_telemetry_format, ingest_telemetry_stream, process_telemetry
+
+
+def build_app(session_factory, device) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/iot/telemetry")
+    async def single(payload: TelemetryCreate):
+        db = session_factory()
+        try:
+            record = await run_in_threadpool(process_telemetry, payload.dict(), db, device)
+        finally:
+            db.close()
+        return {"status": "ok", "ingest_id": record.id}
+
+    @app.post("/iot/telemetry/batch")
+    async def batch(request: Request):
+        fmt = detect_telemetry_format(request.headers.get("content-type"))
+        if fmt is None:
+            raise HTTPException(status_code=415)
+        return await ingest_telemetry_stream(
+            request.stream(), fmt, device, settings.TELEMETRY_BATCH_CHUNK_SIZE, session_factory,
+        )
+
+    return app
+
+
+def readings(n):
+    # a gateway with 40 probes x 3 sensors, each sampled every 10 s
+    sensors = [f"probe-{i}/{kind}" for i in range(40) for kind in ("moisture", "temp", "ec")]
+    for i in range(n):
+        yield {"sensor": sensors[i % len(sensors)], "value": round(random.uniform(0, 100), 2),
+               "unit": "%", "ts": 1717236000 + (i // len(sensors)) * 10}
+
+
+async def drive(app, n_batch, n_single):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        started = time.perf_counter()
+        for reading in readings(n_single):
+            assert (await client.post("/iot/telemetry", json=reading)).status_code == 200
+        single = n_single / (time.perf_counter() - started)
+
+        body = "\n".join(json.dumps(r) for r in readings(n_batch)).encode()
+        started = time.perf_counter()
+        response = await client.post("/iot/telemetry/batch", content=body,
+                                     headers={"content-type": "application/x-ndjson"})
+        batch = n_batch / (time.perf_counter() - started)
+        assert response.json()["accepted"] == n_batch
+    return single, batch
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readings", type=int, default=100_000)
+    parser.add_argument("--single", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(url, **engine_options(url))
+        install_sqlite_pragmas(engine)
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+        with session_factory() as db:
+            db.add(Device(id=1, device_id="gateway", cred_token_hash="x"))
+            db.commit()
+        device = Device(id=1, device_id="gateway")
+
+        single, batch = asyncio.run(drive(build_app(session_factory, device), args.readings, args.single))
+        with session_factory() as db:
+            stored = db.execute(select(func.count(Telemetry.id))).scalar()
+        print(f"single  {single:10.0f} readings/s")
+        print(f"batch   {batch:10.0f} readings/s  ({stored} rows stored)")
+
+
+if __name__ == "__main__":
+    main()
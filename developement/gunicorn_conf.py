@@ -0,0 +1,36 @@
+# developement/gunicorn_conf.py
+"""
+Gunicorn settings for the AgroMind API.
+
+Run from backend/:
+    gunicorn -c ../developement/gunicorn_conf.py app.main:app
+
+Prometheus: every worker writes its samples to PROMETHEUS_MULTIPROC_DIR,
+so /metrics (served by any worker) reports totals for the whole server.
+The directory is wiped on master start and dead workers are marked so
+their live gauges disappear.
+"""
+import multiprocessing
+import os
+import shutil
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+keepalive = 5
+
+# Must be set before workers import prometheus_client
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/agromind_prometheus")
+
+
+def on_starting(server):
+    # Stale files from a previous run would be summed into the new totals
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)